@@ -0,0 +1,251 @@
+# pylint: disable=no-member
+from CommonServerPython import *
+from CommonServerUserPython import *
+
+''' IMPORTS '''
+import itertools
+import string
+from html import unescape
+from re import compile as _Re
+
+import spacy
+
+LANGUAGES_TO_MODEL_NAMES = {'English': 'en_core_web_sm',
+                            'German': 'de_core_news_sm',
+                            'French': 'fr_core_news_sm',
+                            'Spanish': 'es_core_news_sm',
+                            'Portuguese': 'pt_core_news_sm',
+                            'Italian': 'it_core_news_sm',
+                            'Dutch': 'nl_core_news_sm'
+                            }
+SPACY_DISABLED_COMPONENTS = ['tagger', 'parser', 'ner', 'textcat']
+# the number of texts which are run through the spaCy pipeline together
+SPACY_BATCH_SIZE = 200
+# the model is reloaded once its string store grew by this many strings, to bound its memory
+SPACY_MAX_NEW_STRINGS = 200000
+SPACY_LOADED_MODELS_CACHE = 'spacy_loaded_models'
+
+
+def load_spacy_model(language):
+    """
+    Loads the spaCy model of the given language once per container.
+
+    :param language: The language of the model, one of LANGUAGES_TO_MODEL_NAMES.
+    :return: The loaded spaCy model.
+    """
+    loaded_models = get_process_cache(SPACY_LOADED_MODELS_CACHE)
+    nlp, loaded_strings_count = loaded_models.get(language, (None, 0))
+    if nlp is None or len(nlp.vocab.strings) - loaded_strings_count > SPACY_MAX_NEW_STRINGS:
+        nlp = spacy.load(LANGUAGES_TO_MODEL_NAMES[language], disable=SPACY_DISABLED_COMPONENTS)
+        loaded_models[language] = (nlp, len(nlp.vocab.strings))
+    return nlp
+
+
+def hash_word(word, hash_seed):
+    return str(hash_djb2(word, int(hash_seed)))
+
+
+def create_text_result(original_text, tokenized_text, original_words_to_tokens, hash_seed=None):
+    text_result = {
+        'originalText': original_text,
+        'tokenizedText': tokenized_text,
+        'originalWordsToTokens': original_words_to_tokens,
+    }
+    if hash_seed is not None:
+        hash_tokenized_text = ' '.join(hash_word(word, hash_seed) for word in tokenized_text.split())
+        words_to_hashed_tokens = {word: [hash_word(t, hash_seed) for t in tokens_list] for word, tokens_list in
+                                  original_words_to_tokens.items()}
+
+        text_result['hashedTokenizedText'] = hash_tokenized_text
+        text_result['wordsToHashedTokens'] = words_to_hashed_tokens
+    return text_result
+
+
+class Tokenizer:
+    def __init__(self, clean_html=True, remove_new_lines=True, hash_seed=None, remove_non_english=True,
+                 remove_stop_words=True, remove_punct=True, remove_non_alpha=True, replace_emails=True,
+                 replace_numbers=True, lemma=True, replace_urls=True, language='English',
+                 tokenization_method='byWords', batch_size=SPACY_BATCH_SIZE):
+        self.number_pattern = "NUMBER_PATTERN"
+        self.url_pattern = "URL_PATTERN"
+        self.email_pattern = "EMAIL_PATTERN"
+        self.reserved_tokens = set([self.number_pattern, self.url_pattern, self.email_pattern])
+        self.clean_html = clean_html
+        self.remove_new_lines = remove_new_lines
+        self.hash_seed = hash_seed
+        self.remove_non_english = remove_non_english
+        self.remove_stop_words = remove_stop_words
+        self.remove_punct = remove_punct
+        self.remove_non_alpha = remove_non_alpha
+        self.replace_emails = replace_emails
+        self.replace_urls = replace_urls
+        self.replace_numbers = replace_numbers
+        self.lemma = lemma
+        self.language = language
+        self.tokenization_method = tokenization_method
+        self.batch_size = batch_size
+        self.max_text_length = 10 ** 5
+        self.html_patterns = [
+            re.compile(r"(?is)<(script|style).*?>.*?(</\1>)"),
+            re.compile(r"(?s)<!--(.*?)-->[\n]?"),
+            re.compile(r"(?s)<.*?>"),
+            re.compile(r"&nbsp;"),
+            re.compile(r" +")
+        ]
+        self.nlp = None
+        self._unicode_chr_splitter = _Re('(?s)((?:[\ud800-\udbff][\udc00-\udfff])|.)').split
+        self.languages_to_model_names = LANGUAGES_TO_MODEL_NAMES
+
+    def handle_long_text(self):
+        return '', ''
+
+    def map_indices_to_words(self, text):
+        original_text_indices_to_words = {}
+        word_start = 0
+        while word_start < len(text) and text[word_start].isspace():
+            word_start += 1
+        for word in text.split():
+            for char_idx, char in enumerate(word):
+                original_text_indices_to_words[word_start + char_idx] = word
+            # find beginning of next word
+            word_start += len(word)
+            while word_start < len(text) and text[word_start].isspace():
+                word_start += 1
+        return original_text_indices_to_words
+
+    def remove_line_breaks(self, text):
+        return text.replace("\r", " ").replace("\n", " ")
+
+    def remove_multiple_whitespaces(self, text):
+        return re.sub(r"\s+", " ", text).strip()
+
+    def clean_html_from_text(self, text):
+        cleaned = text
+        for pattern in self.html_patterns:
+            cleaned = pattern.sub(" ", cleaned)
+        return unescape(cleaned).strip()
+
+    def clean_text(self, text):
+        if self.remove_new_lines:
+            text = self.remove_line_breaks(text)
+        if self.clean_html:
+            text = self.clean_html_from_text(text)
+        return self.remove_multiple_whitespaces(text)
+
+    def is_spacy_language(self):
+        return self.language in self.languages_to_model_names
+
+    def handle_tokenizaion_method(self, text, doc=None):
+        if self.is_spacy_language():
+            tokens_list, original_words_to_tokens = self.tokenize_text_spacy(text, doc)
+        else:
+            tokens_list, original_words_to_tokens = self.tokenize_text_other(text)
+        tokenized_text = ' '.join(tokens_list).strip()
+        return tokenized_text, original_words_to_tokens
+
+    def tokenize_text_other(self, text):
+        tokens_list = []
+        original_words_to_tokens = {}  # type: ignore
+        tokenization_method = self.tokenization_method
+        if tokenization_method == 'byWords':
+            for t in text.split():
+                token_without_punct = ''.join([c for c in t if c not in string.punctuation])
+                if len(token_without_punct) > 0:
+                    tokens_list.append(token_without_punct)
+                    original_words_to_tokens[token_without_punct] = t
+        elif tokenization_method == 'byLetters':
+            for t in text:
+                tokens_list += [chr for chr in self._unicode_chr_splitter(t) if chr and chr != ' ']
+                original_words_to_tokens = {c: t for c in tokens_list}
+        else:
+            return_error('Unsupported tokenization method: when language is "Other" ({})'.format(tokenization_method))
+        return tokens_list, original_words_to_tokens
+
+    def tokenize_text_spacy(self, text, doc=None):
+        if doc is None:
+            self.init_spacy_model(self.language)
+            doc = self.nlp(text)  # type: ignore
+        original_text_indices_to_words = self.map_indices_to_words(text)
+        tokens_list = []
+        original_words_to_tokens = {}  # type: ignore
+        for word in doc:
+            if word.is_space:
+                continue
+            elif self.remove_stop_words and word.is_stop:
+                continue
+            elif self.remove_punct and word.is_punct:
+                continue
+            elif self.replace_emails and '@' in word.text:
+                tokens_list.append(self.email_pattern)
+            elif self.replace_urls and word.like_url:
+                tokens_list.append(self.url_pattern)
+            elif self.replace_numbers and (word.like_num or word.pos_ == 'NUM'):
+                tokens_list.append(self.number_pattern)
+            elif self.remove_non_alpha and not word.is_alpha:
+                continue
+            elif self.remove_non_english and word.text not in self.nlp.vocab:  # type: ignore
+                continue
+            else:
+                if self.lemma and word.lemma_ != '-PRON-':
+                    token_to_add = word.lemma_
+                else:
+                    token_to_add = word.lower_
+                tokens_list.append(token_to_add)
+                original_word = original_text_indices_to_words[word.idx]
+                if original_word not in original_words_to_tokens:
+                    original_words_to_tokens[original_word] = []
+                original_words_to_tokens[original_word].append(token_to_add)
+        return tokens_list, original_words_to_tokens
+
+    def init_spacy_model(self, language):
+        try:
+            self.nlp = load_spacy_model(language)
+        except Exception:
+            return_error("The specified language is not supported in this docker. In order to pre-process text "
+                         "using this language, it's required to change this docker. Please check at the documentation "
+                         "or contact us for help.")
+
+    def tokenize_batch(self, texts):
+        """
+        Tokenizes a batch of texts, running the texts of a spaCy language through the pipeline together.
+
+        :param texts: A list of texts.
+        :return: A list of the text results, in the order of the texts.
+        """
+        cleaned_texts = [self.clean_text(t) for t in texts]
+        docs = iter([])  # type: ignore
+        if self.is_spacy_language():
+            self.init_spacy_model(self.language)
+            docs = self.nlp.pipe([t for t in cleaned_texts if len(t) < self.max_text_length],  # type: ignore
+                                 batch_size=self.batch_size)
+        result = []
+        for original_text, t in zip(texts, cleaned_texts):
+            if len(t) < self.max_text_length:
+                doc = next(docs) if self.is_spacy_language() else None
+                tokenized_text, original_words_to_tokens = self.handle_tokenizaion_method(t, doc)
+            else:
+                tokenized_text, original_words_to_tokens = self.handle_long_text()
+            result.append(create_text_result(original_text, tokenized_text, original_words_to_tokens,
+                                             hash_seed=self.hash_seed))
+        return result
+
+    def tokenize_texts(self, texts):
+        """
+        Tokenizes the texts lazily, one batch at a time, so only the documents of a single batch are kept in memory.
+
+        :param texts: An iterable of texts.
+        :return: A generator of the text results, in the order of the texts.
+        """
+        texts = iter(texts)
+        batch = list(itertools.islice(texts, self.batch_size))
+        while batch:
+            yield from self.tokenize_batch(batch)
+            batch = list(itertools.islice(texts, self.batch_size))
+
+    def word_tokenize(self, text):
+        if not isinstance(text, list):
+            text = [text]
+        result = list(self.tokenize_texts(text))
+        if len(result) == 1:
+            result = result[0]  # type: ignore
+        return result
@@ -0,0 +1,83 @@
+import pytest
+import spacy
+
+from NLPTokenizerApiModule import *
+
+TEXTS = ['Click the link http://www.example.com to verify your account',
+         '<p>Your invoice number 1234 is <b>attached</b></p>',
+         'Send the details to admin@example.com by tomorrow',
+         '']
+
+
+@pytest.fixture(autouse=True)
+def blank_spacy_model(mocker):
+    """
+    Loads a blank English pipeline instead of the model of the language, which is not installed in the tests.
+    """
+    get_process_cache(SPACY_LOADED_MODELS_CACHE).clear()
+    return mocker.patch.object(spacy, 'load', side_effect=lambda name, disable: spacy.blank('en'))
+
+
+def test_load_spacy_model_once(blank_spacy_model):
+    """
+    Given:
+        - Two tokenizers of the same language.
+    When:
+        - Tokenizing texts with both of them.
+    Then:
+        - The spaCy model is loaded only once, with the unused pipeline components disabled.
+    """
+    Tokenizer().word_tokenize(TEXTS)
+    Tokenizer(lemma=False).word_tokenize(TEXTS[0])
+    blank_spacy_model.assert_called_once_with('en_core_web_sm', disable=SPACY_DISABLED_COMPONENTS)
+
+
+def test_load_spacy_model_reload(mocker, blank_spacy_model):
+    """
+    Given:
+        - A loaded spaCy model.
+    When:
+        - Its string store grows beyond the max number of new strings.
+    Then:
+        - The model is reloaded.
+    """
+    nlp = load_spacy_model('English')
+    assert load_spacy_model('English') is nlp
+    mocker.patch('NLPTokenizerApiModule.SPACY_MAX_NEW_STRINGS', 1)
+    nlp.vocab.strings.add('new string 1')
+    nlp.vocab.strings.add('new string 2')
+    assert load_spacy_model('English') is not nlp
+    assert blank_spacy_model.call_count == 2
+
+
+@pytest.mark.parametrize('language, tokenization_method', [('English', 'byWords'), ('Other', 'byWords'),
+                                                           ('Other', 'byLetters')])
+def test_tokenize_texts_batches(language, tokenization_method):
+    """
+    Given:
+        - A tokenizer with a batch size smaller than the number of texts.
+    When:
+        - Tokenizing the texts.
+    Then:
+        - The results are the same, and in the same order, as when tokenizing the texts one by one.
+    """
+    tokenizer = Tokenizer(language=language, tokenization_method=tokenization_method, hash_seed=5381, batch_size=3)
+    expected = [tokenizer.word_tokenize(text) for text in TEXTS]
+    assert list(tokenizer.tokenize_texts(iter(TEXTS))) == expected
+    assert tokenizer.word_tokenize(TEXTS) == expected
+    assert all(result['hashedTokenizedText'] for result in expected[:-1])
+
+
+def test_tokenize_texts_long_text():
+    """
+    Given:
+        - A batch with a text longer than the max text length.
+    When:
+        - Tokenizing the texts.
+    Then:
+        - The long text is not tokenized, and the other texts are matched to their own documents.
+    """
+    tokenizer = Tokenizer(remove_stop_words=False, lemma=False)
+    tokenizer.max_text_length = 20
+    results = tokenizer.word_tokenize(['short text', 'a text longer than twenty characters', 'another word'])
+    assert [r['tokenizedText'] for r in results] == ['short text', '', 'another word']
@@ -12,13 +12,16 @@ import os
 import re
 import socket
 import sys
+import threading
 import time
 import traceback
+import types
 from random import randint
 import xml.etree.cElementTree as ET
 from collections import OrderedDict
 from datetime import datetime, timedelta
 from abc import abstractmethod
+from email.utils import mktime_tz, parsedate_tz
 
 import demistomock as demisto
 import warnings
@@ -1093,17 +1096,25 @@ class IntegrationLogger(object):
       use LOG.print_log(verbose=True/False) to display all records in War-Room (if verbose) and server log.
       use add_replace_strs to add sensitive strings that should be replaced before going to the log.
 
+      The sensitive strings are replaced in a single pass of a compiled pattern, which is rebuilt only when strings
+      are added. The buffered messages are bounded to MAX_BUFFERED_SIZE characters, dropping the oldest messages.
+
       :type message: ``str``
       :param message: The message to be logged
 
       :return: No data returned
       :rtype: ``None``
     """
+    MAX_BUFFERED_SIZE = 10 * 1024 * 1024
 
     def __init__(self, debug_logging=False):
         self.messages = []  # type: list
+        self.messages_size = 0
+        self.dropped_messages_count = 0
         self.write_buf = []  # type: list
         self.replace_strs = []  # type: list
+        self.replace_strs_pattern = None
+        self.replace_strs_pattern_count = 0
         self.curl = []  # type: list
         self.buffering = True
         self.debug_logging = debug_logging
@@ -1128,7 +1139,7 @@ class IntegrationLogger(object):
                     if p in k_lower:
                         self.add_replace_strs(v, b64_encode(v))
 
-    def encode(self, message):
+    def to_str(self, message):
         try:
             res = str(message)
         except UnicodeEncodeError as exception:
@@ -1141,14 +1152,52 @@ class IntegrationLogger(object):
                 res = message.encode('utf-8', 'replace')  # type: ignore
             else:
                 res = "Failed encoding message with error: {}".format(exception)
-        for s in self.replace_strs:
-            res = res.replace(s, '<XX_REPLACED>')
         return res
 
+    def encode(self, message):
+        res = self.to_str(message)
+        if self.replace_strs:
+            res = self.get_replace_strs_pattern().sub('<XX_REPLACED>', res)
+        return res
+
+    def get_replace_strs_pattern(self):
+        """
+        Returns a compiled alternation of the strings to replace, which is rebuilt only when strings were added.
+        Longer strings are matched first, so a string which contains another one is replaced as a whole.
+
+        :return: The compiled pattern.
+        :rtype: ``re.Pattern``
+        """
+        if self.replace_strs_pattern is None or self.replace_strs_pattern_count != len(self.replace_strs):
+            replace_strs = sorted(set(s for s in self.replace_strs if s), key=len, reverse=True)
+            self.replace_strs_pattern = re.compile('|'.join(re.escape(s) for s in replace_strs) or '(?!)')
+            self.replace_strs_pattern_count = len(self.replace_strs)
+        return self.replace_strs_pattern
+
+    def add_message(self, text):
+        """
+        Adds a message to the buffer, and drops the oldest messages once the buffer is larger than MAX_BUFFERED_SIZE.
+
+        :type text: ``str``
+        :param text: The encoded message.
+
+        :return: No data returned
+        :rtype: ``None``
+        """
+        self.messages.append(text)
+        self.messages_size += len(text)
+        if self.messages_size > self.MAX_BUFFERED_SIZE:
+            dropped_count = 0
+            while self.messages_size > self.MAX_BUFFERED_SIZE // 2 and dropped_count < len(self.messages) - 1:
+                self.messages_size -= len(self.messages[dropped_count])
+                dropped_count += 1
+            del self.messages[:dropped_count]
+            self.dropped_messages_count += dropped_count
+
     def __call__(self, message):
         text = self.encode(message)
         if self.buffering:
-            self.messages.append(text)
+            self.add_message(text)
             if self.debug_logging:
                 demisto.debug(text)
         else:
@@ -1179,14 +1228,20 @@ class IntegrationLogger(object):
 
     def print_log(self, verbose=False):
         if self.write_buf:
-            self.messages.append("".join(self.write_buf))
+            self.add_message(self.encode("".join(self.write_buf)))
+            self.write_buf = []
         if self.messages:
-            text = 'Full Integration Log:\n' + '\n'.join(self.messages)
+            text = 'Full Integration Log:\n'
+            if self.dropped_messages_count:
+                text += '({} earlier messages were dropped)\n'.format(self.dropped_messages_count)
+            text += '\n'.join(self.messages)
             if verbose:
                 demisto.log(text)
             if not self.debug_logging:  # we don't print out if in debug_logging as already all message where printed
                 demisto.info(text)
             self.messages = []
+            self.messages_size = 0
+            self.dropped_messages_count = 0
 
     def build_curl(self, text):
         """
@@ -1238,7 +1293,8 @@ class IntegrationLogger(object):
 
     def write(self, msg):
         # same as __call__ but allows IntegrationLogger to act as a File like object.
-        msg = self.encode(msg)
+        # the parts of a line are encoded once the line is complete, so a secret split between them is replaced too
+        msg = self.to_str(msg)
         has_newline = False
         if '\n' in msg:
             has_newline = True
@@ -1247,9 +1303,9 @@ class IntegrationLogger(object):
                 msg = msg[:-1]
         self.write_buf.append(msg)
         if has_newline:
-            text = "".join(self.write_buf)
+            text = self.encode("".join(self.write_buf))
             if self.buffering:
-                self.messages.append(text)
+                self.add_message(text)
             else:
                 demisto.info(text)
                 if is_debug_mode() and text.startswith('send:'):
@@ -1485,6 +1541,124 @@ def appendContext(key, data, dedup=False):
         demisto.setContext(key, data)
 
 
+DT_KEY_FIELD_REGEX = re.compile(r'val\.([\w.]+)\s*===?\s*obj\.\1\b')
+
+
+def parse_dt_key(key):
+    """
+       Splits a context key to its path and the fields its DT compares, for example
+       'File(val.MD5 && val.MD5 == obj.MD5 || val.SHA1 && val.SHA1 == obj.SHA1)' to 'File' and [('MD5',), ('SHA1',)]
+
+       :type key: ``str``
+       :param key: The context key (required)
+
+       :return: The context path, and the fields compared by each of the alternatives of the DT
+       :rtype: ``tuple``
+    """
+    if not key.endswith(')') or '(' not in key:
+        return key, []
+    path, dt = key[:-1].split('(', 1)
+    key_fields = []
+    for alternative in dt.split('||'):
+        fields = tuple(DT_KEY_FIELD_REGEX.findall(alternative))
+        if fields:
+            key_fields.append(fields)
+    return path, key_fields
+
+
+class ContextAppender(object):
+    """
+       Appends batches of items to a context key, and de-duplicates them with an index of the items.
+
+       The items are matched by the fields compared in the DT of the key, such as 'Host(val.ID === obj.ID)',
+       and a matching item is updated with the new item. Without a DT the identical items are skipped.
+       The context is read once, so the appended items are written only by flush.
+
+       :type key: ``str``
+       :param key: The context key, optionally with a DT (required)
+    """
+    def __init__(self, key):
+        self.path, self.key_fields = parse_dt_key(key)
+        existing = demisto.get(demisto.context(), self.path)
+        if existing is None:
+            existing = []
+        elif not isinstance(existing, list):
+            existing = [existing]
+        self.items = []  # type: list
+        self._index = {}  # type: dict
+        self.append(existing)
+
+    @staticmethod
+    def _to_hashable(value):
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return json.dumps(value, sort_keys=True)
+
+    def _get_index_keys(self, item):
+        if not self.key_fields:
+            return [self._to_hashable(item)]
+        if not isinstance(item, dict):
+            return []
+        index_keys = []
+        for i, fields in enumerate(self.key_fields):
+            values = tuple(demisto.get(item, field) for field in fields)
+            if all(value not in (None, '') for value in values):
+                index_keys.append((i, self._to_hashable(values)))
+        return index_keys
+
+    def append(self, items):
+        """
+           Appends the items, updating the existing items they match.
+
+           :type items: ``list``
+           :param items: The items to append (required)
+
+           :return: No data returned
+           :rtype: ``None``
+        """
+        if not isinstance(items, list):
+            items = [items]
+        for item in items:
+            index_keys = self._get_index_keys(item)
+            position = next((self._index[k] for k in index_keys if k in self._index), None)
+            if position is None:
+                position = len(self.items)
+                self.items.append(item)
+            elif self.key_fields:
+                self.items[position].update(item)
+            for k in index_keys:
+                self._index.setdefault(k, position)
+
+    def flush(self):
+        """
+           Sets the context path to all of the items.
+
+           :return: No data returned
+           :rtype: ``None``
+        """
+        demisto.setContext(self.path, self.items)
+
+
+def appendContextBatch(key, items):
+    """
+       Append a batch of items to the investigation context, de-duplicated by the DT of the key
+
+       :type key: ``str``
+       :param key: The context key, optionally with a DT such as 'Host(val.ID === obj.ID)' (required)
+
+       :type items: ``list``
+       :param items: The items to append (required)
+
+       :return: No data returned
+       :rtype: ``None``
+    """
+    appender = ContextAppender(key)
+    appender.append(items)
+    appender.flush()
+
+
 def url_to_clickable_markdown(data, url_keys):
     """
     Turn the given urls fields in to clickable url, used for the markdown table.
@@ -1527,7 +1701,8 @@ def create_clickable_url(url):
     return '[{}]({})'.format(url, url)
 
 
-def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None, url_keys=None):
+def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=False, metadata=None, url_keys=None,
+                    max_rows=None):
     """
        Converts a demisto table in JSON form to a Markdown table
 
@@ -1553,6 +1728,9 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
        :type url_keys: ``list``
        :param url_keys: a list of keys in the given JSON table that should be turned in to clickable
 
+       :type max_rows: ``int``
+       :param max_rows: The max number of rows to present, followed by a note of the total number of rows (optional)
+
        :return: A string representation of the markdown table
        :rtype: ``str``
     """
@@ -1560,16 +1738,16 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
     if url_keys:
         t = url_to_clickable_markdown(t, url_keys)
 
-    mdResult = ''
+    md_parts = []
     if name:
-        mdResult = '### ' + name + '\n'
+        md_parts.append('### ' + name + '\n')
 
     if metadata:
-        mdResult += metadata + '\n'
+        md_parts.append(metadata + '\n')
 
     if not t or len(t) == 0:
-        mdResult += '**No entries.**\n'
-        return mdResult
+        md_parts.append('**No entries.**\n')
+        return ''.join(md_parts)
 
     if not isinstance(t, list):
         t = [t]
@@ -1582,7 +1760,7 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
         # should be only one header
         if headers and len(headers) > 0:
             header = headers[0]
-            t = map(lambda item: dict((h, item) for h in [header]), t)
+            t = [{header: item} for item in t]
         else:
             raise Exception("Missing headers param for tableToMarkdown. Example: headers=['Some Header']")
 
@@ -1599,35 +1777,30 @@ def tableToMarkdown(name, t, headers=None, headerTransform=None, removeNull=Fals
         headers = headers_aux
 
     if t and len(headers) > 0:
-        newHeaders = []
         if headerTransform is None:  # noqa
             def headerTransform(s): return stringEscapeMD(s, True, True)  # noqa
-        for header in headers:
-            newHeaders.append(headerTransform(header))
-        mdResult += '|'
-        if len(newHeaders) == 1:
-            mdResult += newHeaders[0]
-        else:
-            mdResult += '|'.join(newHeaders)
-        mdResult += '|\n'
-        sep = '---'
-        mdResult += '|' + '|'.join([sep] * len(headers)) + '|\n'
-        for entry in t:
-            vals = [stringEscapeMD((formatCell(entry.get(h, ''), False) if entry.get(h) is not None else ''),
-                                   True, True) for h in headers]
+        newHeaders = [headerTransform(header) for header in headers]
+        md_parts.append('|' + '|'.join(newHeaders) + '|\n')
+        md_parts.append('|' + '|'.join(['---'] * len(headers)) + '|\n')
+        rows = t[:max_rows] if max_rows is not None else t
+        for entry in rows:
+            vals = []
+            for h in headers:
+                value = entry.get(h)
+                vals.append(stringEscapeMD(formatCell(value, False), True, True) if value is not None else '')
             # this pipe is optional
-            mdResult += '| '
             try:
-                mdResult += ' | '.join(vals)
+                md_parts.append('| ' + ' | '.join(vals) + ' |\n')
             except UnicodeDecodeError:
                 vals = [str(v) for v in vals]
-                mdResult += ' | '.join(vals)
-            mdResult += ' |\n'
+                md_parts.append('| ' + ' | '.join(vals) + ' |\n')
+        if len(rows) < len(t):
+            md_parts.append('\n**Showing {} out of {} entries.**\n'.format(len(rows), len(t)))
 
     else:
-        mdResult += '**No entries.**\n'
+        md_parts.append('**No entries.**\n')
 
-    return mdResult
+    return ''.join(md_parts)
 
 
 tblToMd = tableToMarkdown
@@ -1811,6 +1984,7 @@ def flattenTable(tableDict):
 
 
 MARKDOWN_CHARS = r"\`*_{}[]()#+-!|"
+MARKDOWN_CHARS_TRANSLATION = {ord(c): u'\\' + c for c in MARKDOWN_CHARS}
 
 
 def stringEscapeMD(st, minimal_escaping=False, escape_multiline=False):
@@ -1835,8 +2009,9 @@ def stringEscapeMD(st, minimal_escaping=False, escape_multiline=False):
         st = st.replace('\n', '<br>')  # Unix
 
     if minimal_escaping:
-        for c in '|':
-            st = st.replace(c, '\\' + c)
+        st = st.replace('|', '\\|')
+    elif IS_PY3 and isinstance(st, str):
+        st = st.translate(MARKDOWN_CHARS_TRANSLATION)
     else:
         st = "".join(["\\" + str(c) if c in MARKDOWN_CHARS else str(c) for c in st])
 
@@ -5271,8 +5446,216 @@ H || val.SSDeep && val.SSDeep == obj.SSDeep)': {'Malicious': {'Vendor': 'Vendor'
                                .format(indicator_type, INDICATOR_TYPE_TO_CONTEXT_KEY.keys()))
 
 
+# the scripts run in new globals on each execution, while the imported modules are kept in the process,
+# so the process caches are kept in a module registered in sys.modules
+PROCESS_CACHE_MODULE = 'demisto_process_cache'
+
+
+def get_process_cache(name):
+    """
+       Gets a cache which is kept between the executions of the scripts and integrations in the same process,
+       for example to reuse loaded models, open connections or built API clients.
+
+       :type name: ``str``
+       :param name: The name of the cache (required)
+
+       :return: The cache of the given name, which is empty when it is first used.
+       :rtype: ``dict``
+    """
+    module = sys.modules.get(PROCESS_CACHE_MODULE)
+    if module is None:
+        module = sys.modules.setdefault(PROCESS_CACHE_MODULE, types.ModuleType(PROCESS_CACHE_MODULE))
+    caches = module.__dict__.setdefault('caches', {})
+    return caches.setdefault(name, {})
+
+
 # Will add only if 'requests' module imported
 if 'requests' in sys.modules:
+    # the status codes of a response which was rejected by the rate limit of the API
+    RATE_LIMIT_STATUS_CODES = (429,)
+    # the longest pause (in seconds) taken from the rate limit headers of a response
+    MAX_RATE_LIMIT_WAIT = 300
+    # the first pause (in seconds) before resending a throttled request without rate limit headers,
+    # which is doubled on each retry
+    RATE_LIMIT_BACKOFF_SECONDS = 1
+    CONCURRENCY_LIMITERS_CACHE = 'concurrency_limiters'
+
+    def get_rate_limit_wait(headers):
+        """
+        Gets the number of seconds to wait before the next request from the rate limit headers of a response,
+        which are the Retry-After header or the X-RateLimit-Remaining and X-RateLimit-Reset headers.
+
+        :type headers: ``dict``
+        :param headers: The headers of the response (required)
+
+        :return: The number of seconds to wait, or 0 if the headers do not ask to wait.
+        :rtype: ``float``
+        """
+        wait = 0.0
+        retry_after = headers.get('Retry-After')
+        if retry_after:
+            try:
+                wait = float(retry_after)
+            except ValueError:
+                retry_date = parsedate_tz(retry_after)
+                if retry_date:
+                    wait = mktime_tz(retry_date) - time.time()
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if reset and remaining is not None:
+            try:
+                if float(remaining) < 1:
+                    reset = float(reset)
+                    # the reset is either an epoch time or the number of seconds until the window is reset
+                    wait = max(wait, reset - time.time() if reset > 10 ** 9 else reset)
+            except ValueError:
+                pass
+        return min(max(wait, 0.0), MAX_RATE_LIMIT_WAIT)
+
+    class TokenBucket(object):
+        """
+           A thread safe token bucket, which limits the rate of the requests of a client.
+
+           Each request takes a token, and the tokens are refilled at the given rate up to the burst size.
+           The bucket can also be paused, for example until the time given by the Retry-After header.
+
+           :type rate: ``float``
+           :param rate: The number of requests per second. If None, only the pauses limit the requests.
+
+           :type burst: ``int``
+           :param burst: The max number of requests which can be sent together. Defaults to the rate.
+        """
+        def __init__(self, rate=None, burst=None):
+            self.rate = float(rate) if rate else None
+            self.capacity = float(burst or max(self.rate or 1, 1))
+            self._clock = getattr(time, 'monotonic', time.time)
+            self._tokens = self.capacity
+            self._last_refill = self._clock()
+            self._paused_until = 0.0
+            self._lock = threading.Lock()
+
+        def _refill(self, now):
+            if self.rate and now > self._last_refill:
+                self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+
+        def acquire(self):
+            """
+            Takes a token, and waits until one is available.
+
+            :return: The number of seconds waited for the token.
+            :rtype: ``float``
+            """
+            waited = 0.0
+            while True:
+                with self._lock:
+                    now = self._clock()
+                    self._refill(now)
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    elif not self.rate:
+                        return waited
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    else:
+                        wait = (1 - self._tokens) / self.rate
+                time.sleep(wait)
+                waited += wait
+
+        def pause(self, seconds):
+            """
+            Stops giving tokens for the given number of seconds. The tokens are refilled only after the pause.
+
+            :type seconds: ``float``
+            :param seconds: The number of seconds to pause (required)
+            """
+            if seconds <= 0:
+                return
+            with self._lock:
+                paused_until = self._clock() + seconds
+                if paused_until > self._paused_until:
+                    self._paused_until = paused_until
+                    self._tokens = 0.0
+                    self._last_refill = paused_until
+
+    class AIMDConcurrencyLimiter(object):
+        """
+           A thread safe limit of the requests which are sent at the same time, which is adapted to the responses
+           by additive increase and multiplicative decrease (AIMD).
+
+           The limit grows by one after a full window of successful requests, and is multiplied by the decrease
+           factor after a request is throttled by the API.
+
+           :type max_concurrency: ``int``
+           :param max_concurrency: The max number of requests which are sent at the same time (required)
+
+           :type decrease_factor: ``float``
+           :param decrease_factor: The factor of the limit after a throttled request.
+        """
+        def __init__(self, max_concurrency, decrease_factor=0.5):
+            self.max_concurrency = max_concurrency
+            self.decrease_factor = decrease_factor
+            self.limit = float(max_concurrency)
+            self.in_flight = 0
+            self._clock = getattr(time, 'monotonic', time.time)
+            self._condition = threading.Condition()
+
+        @staticmethod
+        def get_shared(key, max_concurrency):
+            """
+            Gets the concurrency limiter of the given key, which is shared by all of the threads of the process.
+
+            :type key: ``str``
+            :param key: The key of the limiter, for example the host of the API (required)
+
+            :type max_concurrency: ``int``
+            :param max_concurrency: The max number of requests which are sent at the same time (required)
+
+            :return: The shared concurrency limiter.
+            :rtype: ``AIMDConcurrencyLimiter``
+            """
+            limiters = get_process_cache(CONCURRENCY_LIMITERS_CACHE)
+            limiter = limiters.get(key)
+            if limiter is None:
+                limiter = limiters.setdefault(key, AIMDConcurrencyLimiter(max_concurrency))
+            with limiter._condition:
+                if limiter.max_concurrency != max_concurrency:
+                    limiter.max_concurrency = max_concurrency
+                    limiter.limit = min(limiter.limit, float(max_concurrency))
+            return limiter
+
+        def acquire(self):
+            """
+            Takes a slot for a request, and waits until one is available.
+
+            :return: The number of seconds waited for the slot.
+            :rtype: ``float``
+            """
+            waited = 0.0
+            with self._condition:
+                while self.in_flight >= int(self.limit):
+                    start = self._clock()
+                    self._condition.wait()
+                    waited += self._clock() - start
+                self.in_flight += 1
+            return waited
+
+        def release(self, throttled=False):
+            """
+            Frees the slot of a request, and adapts the limit to its response.
+
+            :type throttled: ``bool``
+            :param throttled: Whether the request was throttled by the API.
+            """
+            with self._condition:
+                self.in_flight -= 1
+                if throttled:
+                    self.limit = max(1.0, self.limit * self.decrease_factor)
+                else:
+                    self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+                self._condition.notify_all()
+
     class BaseClient(object):
         """Client to use in integrations with powerful _http_request
         :type base_url: ``str``
@@ -5299,11 +5682,31 @@ if 'requests' in sys.modules:
             The request authorization, for example: (username, password).
             Can be None.
 
+        :type rate_limit: ``float``
+        :param rate_limit:
+            The max number of requests per second of the client. The client also waits for the time given by
+            the Retry-After and X-RateLimit-* headers of the responses, and resends throttled requests, with an
+            exponential backoff when the headers give no time.
+            If None, the requests are not limited.
+
+        :type rate_limit_burst: ``int``
+        :param rate_limit_burst: The max number of requests which can be sent together. Defaults to the rate limit.
+
+        :type max_concurrency: ``int``
+        :param max_concurrency:
+            The max number of requests which are sent to the API host at the same time, by all of the threads
+            of the process. The limit is decreased when requests are throttled, and grows back as they succeed.
+            If None, the concurrency is not limited.
+
+        :type rate_limit_retries: ``int``
+        :param rate_limit_retries: How many times a throttled request is resent when the requests are limited.
+
         :return: No data returned
         :rtype: ``None``
         """
 
-        def __init__(self, base_url, verify=True, proxy=False, ok_codes=tuple(), headers=None, auth=None):
+        def __init__(self, base_url, verify=True, proxy=False, ok_codes=tuple(), headers=None, auth=None,
+                     rate_limit=None, rate_limit_burst=None, max_concurrency=None, rate_limit_retries=3):
             self._base_url = base_url
             self._verify = verify
             self._ok_codes = ok_codes
@@ -5312,6 +5715,71 @@ if 'requests' in sys.modules:
             self._session = requests.Session()
             if not proxy:
                 self._session.trust_env = False
+            self._rate_limiter = None
+            self._concurrency_limiter = None
+            if rate_limit or max_concurrency:
+                self._rate_limiter = TokenBucket(rate_limit, rate_limit_burst)
+            if max_concurrency:
+                host = requests.compat.urlparse(base_url).netloc
+                self._concurrency_limiter = AIMDConcurrencyLimiter.get_shared(host, max_concurrency)
+            self._rate_limit_retries = rate_limit_retries
+            self._rate_limit_metrics = {'throttled_requests': 0, 'throttled_time': 0.0, 'rate_limited_responses': 0}
+            self._metrics_lock = threading.Lock()
+
+        def get_rate_limit_metrics(self):
+            """
+            Gets the metrics of the rate limiting of the client.
+
+            :return:
+                The number of requests which waited for the rate limit, the total number of seconds they waited,
+                the number of responses which were throttled by the API and the current concurrency limit.
+            :rtype: ``dict``
+            """
+            with self._metrics_lock:
+                metrics = dict(self._rate_limit_metrics)
+            if self._concurrency_limiter:
+                metrics['concurrency_limit'] = int(self._concurrency_limiter.limit)
+            return metrics
+
+        def _update_rate_limit_metrics(self, throttled_time=0.0, rate_limited=False):
+            with self._metrics_lock:
+                if throttled_time > 0:
+                    self._rate_limit_metrics['throttled_requests'] += 1
+                    self._rate_limit_metrics['throttled_time'] += throttled_time
+                if rate_limited:
+                    self._rate_limit_metrics['rate_limited_responses'] += 1
+
+        def _send_request(self, method, address, **kwargs):
+            """
+            Sends the request through the rate and concurrency limiters of the client, and resends it when the API
+            throttles it.
+
+            :return: The response of the request.
+            :rtype: ``requests.Response``
+            """
+            # clients which do not call the BaseClient constructor are not limited
+            if not getattr(self, '_rate_limiter', None):
+                return self._session.request(method, address, **kwargs)
+            attempt = 0
+            while True:
+                throttled_time = self._rate_limiter.acquire()
+                if self._concurrency_limiter:
+                    throttled_time += self._concurrency_limiter.acquire()
+                rate_limited = False
+                try:
+                    res = self._session.request(method, address, **kwargs)
+                    rate_limited = res.status_code in RATE_LIMIT_STATUS_CODES
+                finally:
+                    if self._concurrency_limiter:
+                        self._concurrency_limiter.release(throttled=rate_limited)
+                self._update_rate_limit_metrics(throttled_time, rate_limited)
+                wait = get_rate_limit_wait(res.headers)
+                if not wait and rate_limited:
+                    wait = min(RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt, MAX_RATE_LIMIT_WAIT)
+                self._rate_limiter.pause(wait)
+                if not rate_limited or attempt >= self._rate_limit_retries:
+                    return res
+                attempt += 1
 
         def _implement_retry(self, retries=0,
                              status_list_to_retry=None,
@@ -5481,7 +5949,7 @@ if 'requests' in sys.modules:
                 auth = auth if auth else self._auth
                 self._implement_retry(retries, status_list_to_retry, backoff_factor, raise_on_redirect, raise_on_status)
                 # Execute
-                res = self._session.request(
+                res = self._send_request(
                     method,
                     address,
                     verify=self._verify,
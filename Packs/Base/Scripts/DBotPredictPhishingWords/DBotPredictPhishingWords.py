@@ -34,6 +34,12 @@ def handle_error(message, is_return_error):
         sys.exit(0)
 
 
+def tokenize_text(text, language, tokenization_method, hash_seed):
+    tokenizer = Tokenizer(hash_seed=int(hash_seed) if hash_seed else None, remove_non_english=False,
+                          remove_non_alpha=False, language=language, tokenization_method=tokenization_method)
+    return tokenizer.word_tokenize(text)
+
+
 def predict_phishing_words(model_name, model_store_type, email_subject, email_body, min_text_length, label_threshold,
                            word_threshold, top_word_limit, is_return_error, set_incidents_fields=False):
     model_data = get_model_data(model_name, model_store_type, is_return_error)
@@ -41,13 +47,7 @@ def predict_phishing_words(model_name, model_store_type, email_subject, email_bo
     text = "%s \n%s" % (email_subject, email_body)
     language = demisto.args().get('language', 'English')
     tokenization = demisto.args().get('tokenizationMethod', 'tokenizer')
-    res = demisto.executeCommand('WordTokenizerNLP', {'value': text,
-                                                      'hashWordWithSeed': demisto.args().get('hashSeed'),
-                                                      'language': language,
-                                                      'tokenizationMethod': tokenization})
-    if is_error(res[0]):
-        handle_error(res[0]['Contents'], is_return_error)
-    tokenized_text_result = res[0]['Contents']
+    tokenized_text_result = tokenize_text(text, language, tokenization, demisto.args().get('hashSeed'))
     input_text = tokenized_text_result['hashedTokenizedText'] if tokenized_text_result.get('hashedTokenizedText') else \
         tokenized_text_result['tokenizedText']
     filtered_text, filtered_text_number_of_words = phishing_model.filter_model_words(input_text)
@@ -161,5 +161,7 @@ def main():
     return result
 
 
+from NLPTokenizerApiModule import *  # noqa: E402
+
 if __name__ in ['__main__', '__builtin__', 'builtins']:
     demisto.results(main())
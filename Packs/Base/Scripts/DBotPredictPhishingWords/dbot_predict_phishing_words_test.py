@@ -39,11 +39,6 @@ def executeCommand(command, args=None):
         return [{'Contents': "ModelDataList", 'Type': 'note'}]
     elif command == 'getMLModel':
         return [{'Contents': {'modelData': "ModelDataML"}, 'Type': 'note'}]
-    elif command == 'WordTokenizerNLP':
-        TOKENIZATION_RESULT['originalText'] = args['value']
-        TOKENIZATION_RESULT['tokenizedText'] = args['value']
-        return [{'Contents': TOKENIZATION_RESULT,
-                 'Type': 'note'}]
     elif command == 'HighlightWords':
         text = args['text']
         terms = set(args['terms'].split(','))
@@ -54,6 +49,17 @@ def executeCommand(command, args=None):
         return [{'Contents': ' '.join(words), 'Type': 'note'}]
 
 
+def tokenize_text(text, language, tokenization_method, hash_seed):
+    TOKENIZATION_RESULT['originalText'] = text
+    TOKENIZATION_RESULT['tokenizedText'] = text
+    return TOKENIZATION_RESULT
+
+
+@pytest.fixture(autouse=True)
+def mock_tokenize_text(mocker):
+    mocker.patch('DBotPredictPhishingWords.tokenize_text', side_effect=tokenize_text)
+
+
 def test_get_model_data(mocker):
     mocker.patch.object(demisto, 'executeCommand', side_effect=executeCommand)
     assert "ModelDataList" == get_model_data("test", "list", True)
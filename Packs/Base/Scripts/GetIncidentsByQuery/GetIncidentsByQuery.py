@@ -1,12 +1,19 @@
 from CommonServerPython import *
 
+import hashlib
+import os
 import pickle
+import tempfile
+import time
 import uuid
 from dateutil import parser
 
 PREFIXES_TO_REMOVE = ['incident.']
 PAGE_SIZE = int(demisto.args().get('pageSize', 500))
 PYTHON_MAGIC = "$$##"
+OUTPUT_FORMATS = ['pickle', 'json']
+# the docker container is kept between the executions of the script, so the cached results are kept in its temp dir
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'GetIncidentsByQuery')
 
 
 def parse_datetime(datetime_str):
@@ -157,6 +164,59 @@ def get_incidents(query, time_field, size, from_date, to_date, fields_to_populat
     return incident_list[:size]
 
 
+def get_cache_key(query, time_field, size, from_date, to_date, fields_to_populate, include_context):
+    normalized_query = json.dumps([' '.join(query.split()), time_field, size, from_date, to_date,
+                                   sorted(fields_to_populate or []), include_context])
+    return hashlib.sha256(normalized_query.encode('utf-8')).hexdigest()
+
+
+def get_cached_incidents(cache_key, cache_ttl):
+    """
+    Returns the incidents cached by the given key, if they were cached in the last cache_ttl minutes.
+    """
+    cache_path = os.path.join(CACHE_DIR, cache_key)
+    try:
+        if time.time() - os.path.getmtime(cache_path) < cache_ttl * 60:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+    except Exception as e:
+        demisto.debug("Could not load the cached incidents: {}".format(e))
+    return None
+
+
+def cache_incidents(cache_key, cache_ttl, incidents):
+    """
+    Caches the incidents by the given key, and removes the cached incidents which have expired.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for file_name in os.listdir(CACHE_DIR):
+            file_path = os.path.join(CACHE_DIR, file_name)
+            if time.time() - os.path.getmtime(file_path) >= cache_ttl * 60:
+                os.remove(file_path)
+        temp_path = os.path.join(CACHE_DIR, '{}.{}.tmp'.format(cache_key, uuid.uuid4()))
+        with open(temp_path, 'wb') as f:
+            pickle.dump(incidents, f, protocol=2)
+        os.replace(temp_path, os.path.join(CACHE_DIR, cache_key))
+    except Exception as e:
+        demisto.debug("Could not cache the incidents: {}".format(e))
+
+
+def incidents_file_result(file_name, incidents, output_format):
+    """
+    Writes the incidents straight to the file of the entry, without encoding them to a single string first.
+    """
+    file_id = demisto.uniqueFile()
+    with open(demisto.investigation()['id'] + '_' + file_id, 'wb') as f:
+        if output_format == 'pickle':
+            pickle.dump(incidents, f, protocol=2)
+        else:
+            for chunk in json.JSONEncoder().iterencode(incidents):
+                f.write(chunk.encode('utf-8'))
+    return {'Contents': '', 'ContentsFormat': formats['text'], 'Type': entryTypes['file'], 'File': file_name,
+            'FileID': file_id}
+
+
 def get_comma_sep_list(value):
     return map(lambda x: x.strip(), value.split(","))
 
@@ -192,24 +252,22 @@ def main():
             fields_to_populate.append('id')
             fields_to_populate = set([x for x in fields_to_populate if x])  # type: ignore
         include_context = d_args['includeContext'] == 'true'
-        incidents = get_incidents(query, d_args['timeField'],
-                                  int(d_args['limit']),
-                                  d_args.get('fromDate'),
-                                  d_args.get('toDate'),
-                                  fields_to_populate,
-                                  include_context)
-
-        # output
-        file_name = str(uuid.uuid4())
         output_format = d_args['outputFormat']
-        if output_format == 'pickle':
-            data_encoded = pickle.dumps(incidents, protocol=2)
-        elif output_format == 'json':
-            data_encoded = json.dumps(incidents)  # type: ignore
-        else:
+        if output_format not in OUTPUT_FORMATS:
             raise Exception("Invalid output format: %s" % output_format)
+        cache_ttl = int(d_args.get('cacheTTL') or 0)
+        get_incidents_args = (query, d_args['timeField'], int(d_args['limit']), d_args.get('fromDate'),
+                              d_args.get('toDate'), fields_to_populate, include_context)
+        cache_key = get_cache_key(*get_incidents_args)
+        incidents = get_cached_incidents(cache_key, cache_ttl) if cache_ttl > 0 else None
+        if incidents is None:
+            incidents = get_incidents(*get_incidents_args)
+            if cache_ttl > 0:
+                cache_incidents(cache_key, cache_ttl, incidents)
 
-        entry = fileResult(file_name, data_encoded)
+        # output
+        file_name = str(uuid.uuid4())
+        entry = incidents_file_result(file_name, incidents, output_format)
         entry['Contents'] = incidents
         entry['HumanReadable'] = "Fetched %d incidents successfully by the query: %s" % (len(incidents), query)
         entry['EntryContext'] = {
@@ -3,6 +3,11 @@ from GetIncidentsByQuery import build_incidents_query, get_incidents, parse_rela
 
 from CommonServerPython import *
 
+import os
+import pickle
+
+import pytest
+
 incident1 = {
     'id': 1,
     'name': 'This is incident1',
@@ -169,6 +174,48 @@ def test_skip_python_magic(mocker):
     assert len(entry['Contents']) == 1
 
 
+def test_main_cache(mocker, tmp_path):
+    """
+    Given:
+        - A cache TTL.
+    When:
+        - Running the script twice with the same query, and once with a different one.
+    Then:
+        - The incidents of the same query are fetched once, and the cached incidents are returned.
+    """
+    import GetIncidentsByQuery
+    mocker.patch.object(GetIncidentsByQuery, 'CACHE_DIR', str(tmp_path))
+    args = dict(get_args(), cacheTTL='10')
+    mocker.patch.object(demisto, 'args', return_value=args)
+    execute_command = mocker.patch.object(demisto, 'executeCommand', side_effect=[
+        [{'Type': entryTypes['note'], 'Contents': {'data': [incident1]}}],
+        [{'Type': entryTypes['note'], 'Contents': {'data': None}}]] * 2)
+
+    entry = main()
+    assert entry['Contents'][0]['id'] == 1
+    assert main()['Contents'] == entry['Contents']
+    assert execute_command.call_count == 2
+
+    args['query'] = 'status:Active'
+    assert main()['Contents'] == entry['Contents']
+    assert execute_command.call_count == 4
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+@pytest.mark.parametrize('output_format, load', [('json', json.load), ('pickle', pickle.load)])
+def test_main_output_file(mocker, output_format, load):
+    args = dict(get_args(), outputFormat=output_format)
+    mocker.patch.object(demisto, 'args', return_value=args)
+    mocker.patch.object(demisto, 'executeCommand', side_effect=execute_command_get_incidents)
+    mocker.patch.object(demisto, 'uniqueFile', return_value='output_file')
+    mocker.patch.object(demisto, 'investigation', return_value={'id': 'test'})
+
+    entry = main()
+    with open('test_output_file', 'rb' if output_format == 'pickle' else 'r') as f:
+        assert load(f) == entry['Contents']
+    os.remove('test_output_file')
+
+
 def test_preprocess_incidents_fields_list():
     incidents_fields = ['incident.emailbody', ' incident.emailsbuject']
     assert preprocess_incidents_fields_list(incidents_fields) == ['emailbody', 'emailsbuject']
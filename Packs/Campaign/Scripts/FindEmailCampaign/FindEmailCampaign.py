@@ -9,8 +9,8 @@ import pandas as pd
 import numpy as np
 from nltk.corpus import stopwords
 from sklearn.feature_extraction.text import CountVectorizer
-from numpy import dot
-from numpy.linalg import norm
+from sklearn.preprocessing import normalize
+from scipy import sparse
 
 EMAIL_BODY_FIELD = 'emailbody'
 EMAIL_SUBJECT_FIELD = 'emailsubject'
@@ -27,6 +27,7 @@ EMAIL_BCC_FIELD = 'emailbcc'
 MIN_CAMPAIGN_SIZE = int(demisto.args().get("minIncidentsForCampaign", 3))
 MIN_UNIQUE_RECIPIENTS = int(demisto.args().get("minUniqueRecipients", 2))
 DUPLICATE_SENTENCE_THRESHOLD = 0.95
+SENTENCES_BLOCK_SIZE = 500
 KEYWORDS = ['#1', '100%', 'access', 'accordance', 'account', 'act', 'action', 'activate', 'ad', 'affordable', 'amazed',
             'amazing', 'apply', 'asap', 'asked', 'attach', 'attached', 'attachment', 'attachments', 'attention',
             'authorize', 'authorizing', 'avoid', 'bank', 'bargain', 'billing', 'bonus', 'boss', 'bucks', 'bulk', 'buy',
@@ -235,20 +236,32 @@ def get_non_na_empty_values(incidents_df, field):
     return field_values
 
 
-def cosine_sim(a, b):
-    return dot(a, b) / (norm(a) * norm(b))
+def get_duplicate_sentences(sentences_vectors):
+    """
+    Returns the indices of the sentences which are similar to a previous sentence. The similarities are sparse products
+    of the normalized sentences vectors, calculated and thresholded one block of sentences at a time, so only a block
+    of the similarities is held in memory.
+    """
+    normalized_vectors = normalize(sentences_vectors).tocsr()
+    duplicate_sentences = set()  # type: Set[int]
+    for start in range(0, normalized_vectors.shape[0], SENTENCES_BLOCK_SIZE):
+        block = normalized_vectors[start:start + SENTENCES_BLOCK_SIZE]
+        similarities = block.dot(normalized_vectors[:start + block.shape[0]].T)
+        # keep only the similarities of each sentence to the sentences preceding it
+        previous_sentences_similarities = sparse.tril(similarities, k=start - 1).tocsr()
+        similar_to_previous = (previous_sentences_similarities > DUPLICATE_SENTENCE_THRESHOLD).getnnz(axis=1)
+        duplicate_sentences.update((start + np.flatnonzero(similar_to_previous)).tolist())
+    return duplicate_sentences
 
 
 def summarize_email_body(body, subject, nb_sentences=3, subject_weight=1.5, keywords_weight=1.5):
     corpus = sent_tokenize(body)
     cv = CountVectorizer(stop_words=list(stopwords.words('english')))
-    body_arr = cv.fit_transform(corpus).toarray()
-    subject_arr = cv.transform(sent_tokenize(subject)).toarray()
+    body_vectors = cv.fit_transform(corpus)
+    subject_vectors = cv.transform(sent_tokenize(subject))
     word_list = cv.get_feature_names()
-    count_list = body_arr.sum(axis=0) + subject_arr.sum(axis=0) * subject_weight
-    duplicate_sentences = [i for i, arr in enumerate(body_arr) if
-                           any(cosine_sim(arr, arr2) > DUPLICATE_SENTENCE_THRESHOLD
-                               for arr2 in body_arr[:i])]
+    count_list = np.asarray(body_vectors.sum(axis=0) + subject_vectors.sum(axis=0) * subject_weight).ravel()
+    duplicate_sentences = get_duplicate_sentences(body_vectors)
 
     word_frequency = dict(zip(word_list, count_list))
     val = sorted(word_frequency.values())
@@ -264,10 +277,11 @@ def summarize_email_body(body, subject, nb_sentences=3, subject_weight=1.5, keyw
     for i, sent in enumerate(corpus):
         if i in duplicate_sentences:
             continue
-        for word in word_tokenize(sent):
-            if word.lower() in word_frequency.keys():
+        sentence_words = word_tokenize(sent)
+        for word in sentence_words:
+            if word.lower() in word_frequency:
                 sentence_rank[i] += word_frequency[word.lower()]
-        sentence_rank[i] = sentence_rank[i] / len(word_tokenize(sent))  # type: ignore
+        sentence_rank[i] = sentence_rank[i] / len(sentence_words)  # type: ignore
     top_sentences_indices = np.argsort(sentence_rank)[::-1][:nb_sentences].tolist()
     summary = []
     for sent_i in sorted(top_sentences_indices):
@@ -323,8 +337,9 @@ def return_indicator_entry(incidents_df):
         return_no_mututal_indicators_found_entry()
         return indicators_df
     indicators_df = indicators_df[indicators_df['relatedIncCount'] < 150]
+    incident_ids = set(incidents_df['id'])
     indicators_df['Involved Incidents Count'] = \
-        indicators_df['investigationIDs'].apply(lambda x: sum(id_ in x for id_ in incidents_df['id']))
+        indicators_df['investigationIDs'].apply(lambda x: len(incident_ids.intersection(x)))
     indicators_df = indicators_df[indicators_df['Involved Incidents Count'] > 1]
     if len(indicators_df) == 0:
         return_no_mututal_indicators_found_entry()
@@ -346,16 +361,21 @@ def get_comma_sep_list(value):
     return [x for x in res if x != '']
 
 
-def get_reputation(id_, indicators_df):
+def get_incidents_max_scores(indicators_df):
+    """
+    Maps each incident ID to the max score of its indicators, in a single pass over the indicators.
+    """
+    incidents_max_scores = {}  # type: Dict[str, int]
     if len(indicators_df) == 0:
-        max_reputation = 0
-    else:
-        relevant_indicators_df = indicators_df[indicators_df['investigationIDs'].apply(lambda x: id_ in x)]
-        if len(relevant_indicators_df) > 0:
-            max_reputation = max(relevant_indicators_df['score'])
-        else:
-            max_reputation = 0
-    return scoreToReputation(max_reputation)
+        return incidents_max_scores
+    for investigation_ids, score in zip(indicators_df['investigationIDs'], indicators_df['score']):
+        for id_ in investigation_ids:
+            incidents_max_scores[id_] = max(score, incidents_max_scores.get(id_, 0))
+    return incidents_max_scores
+
+
+def get_reputation(id_, incidents_max_scores):
+    return scoreToReputation(incidents_max_scores.get(id_, 0))
 
 
 def return_involved_incidents_entry(incidents_df, indicators_df, fields_to_display):
@@ -366,7 +386,8 @@ def return_involved_incidents_entry(incidents_df, indicators_df, fields_to_displ
     incidents_df['similarity'] = incidents_df['similarity'].fillna(1)
     incidents_df['similarity'] = incidents_df['similarity'].apply(lambda x: '{:.1f}%'.format(x * 100))
     current_incident_id = demisto.incident()['id']
-    incidents_df['DBot Score'] = incidents_df['id'].apply(lambda id_: get_reputation(id_, indicators_df))
+    incidents_max_scores = get_incidents_max_scores(indicators_df)
+    incidents_df['DBot Score'] = incidents_df['id'].apply(lambda id_: get_reputation(id_, incidents_max_scores))
     # add a mark at current incident, at its similarity cell
     incidents_df['similarity'] = incidents_df.apply(
         lambda x: '{} (current)'.format(x['similarity']) if x['id'] == current_incident_id else x['similarity'], axis=1)
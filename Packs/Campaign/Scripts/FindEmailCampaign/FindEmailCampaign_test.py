@@ -0,0 +1,84 @@
+import random
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import CountVectorizer
+
+from FindEmailCampaign import *
+
+WORDS = ['account', 'password', 'verify', 'invoice', 'payment', 'urgent', 'click', 'link', 'bank', 'transfer',
+         'document', 'shared', 'login', 'suspended', 'confirm', 'details', 'delivery', 'package', 'refund', 'gift']
+
+
+def generate_synthetic_sentences(n_sentences, n_templates, seed=0):
+    """
+    Generates a synthetic email corpus, in which the sentences are drawn from a small number of templates, and some of
+    them are slightly modified.
+    """
+    rand = random.Random(seed)
+    templates = [' '.join(rand.choice(WORDS) for _ in range(12)) for _ in range(n_templates)]
+    sentences = []
+    for _ in range(n_sentences):
+        words = rand.choice(templates).split()
+        if rand.random() < 0.3:
+            words[rand.randrange(len(words))] = rand.choice(WORDS)
+        sentences.append(' '.join(words))
+    return sentences
+
+
+def get_duplicate_sentences_pairwise(sentences_arr):
+    def cosine_sim(a, b):
+        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    return {i for i, arr in enumerate(sentences_arr) if
+            any(cosine_sim(arr, arr2) > DUPLICATE_SENTENCE_THRESHOLD for arr2 in sentences_arr[:i])}
+
+
+def test_get_duplicate_sentences():
+    """
+    Given:
+        - A synthetic corpus with similar and duplicate sentences.
+    When:
+        - Finding the sentences which are similar to a previous sentence.
+    Then:
+        - The sentences found are the same as with the pairwise cosine similarity.
+    """
+    sentences = generate_synthetic_sentences(300, 20)
+    sentences_vectors = CountVectorizer().fit_transform(sentences)
+    duplicate_sentences = get_duplicate_sentences(sentences_vectors)
+    assert duplicate_sentences == get_duplicate_sentences_pairwise(sentences_vectors.toarray())
+    assert 0 < len(duplicate_sentences) < len(sentences)
+
+
+def test_get_duplicate_sentences_blocks(mocker):
+    """
+    Given:
+        - A synthetic corpus larger than the sentences block size.
+    When:
+        - Finding the sentences which are similar to a previous sentence.
+    Then:
+        - The sentences found are the same as when all the sentences are in a single block.
+    """
+    sentences_vectors = CountVectorizer().fit_transform(generate_synthetic_sentences(300, 20))
+    duplicate_sentences = get_duplicate_sentences(sentences_vectors)
+    mocker.patch('FindEmailCampaign.SENTENCES_BLOCK_SIZE', 7)
+    assert get_duplicate_sentences(sentences_vectors) == duplicate_sentences
+
+
+def test_get_incidents_max_scores():
+    """
+    Given:
+        - Synthetic indicators involved in a set of incidents.
+    When:
+        - Calculating the reputation of each incident.
+    Then:
+        - Each incident gets the max score of the indicators it is involved in.
+    """
+    rand = random.Random(0)
+    incident_ids = [str(i) for i in range(200)]
+    indicators_df = pd.DataFrame([{'investigationIDs': rand.sample(incident_ids, 5), 'score': rand.randint(0, 3)}
+                                  for _ in range(500)])
+    incidents_max_scores = get_incidents_max_scores(indicators_df)
+    for id_ in incident_ids:
+        relevant_scores = indicators_df[indicators_df['investigationIDs'].apply(lambda x: id_ in x)]['score']
+        assert incidents_max_scores.get(id_, 0) == (max(relevant_scores) if len(relevant_scores) > 0 else 0)
+    assert get_incidents_max_scores(pd.DataFrame([])) == {}
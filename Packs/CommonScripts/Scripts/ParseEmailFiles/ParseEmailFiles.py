@@ -9,8 +9,8 @@ from base64 import b64decode
 import email.utils
 from email.parser import HeaderParser
 import traceback
-import tempfile
 import sys
+from io import BytesIO
 
 # -*- coding: utf-8 -*-
 # !/usr/bin/env python
@@ -43,6 +43,10 @@ reload(sys)
 sys.setdefaultencoding('utf8')  # pylint: disable=no-member
 
 MAX_DEPTH_CONST = 3
+# nested emails are parsed in memory, once this amount of nested email bytes was parsed the rest are only returned as
+# file entries
+NESTED_EMAILS_SIZE_BUDGET = 50 * 1024 * 1024
+NESTED_EMAILS_PARSED_SIZE = 0
 
 """
 https://github.com/vikramarsid/msg_parser
@@ -3093,6 +3097,7 @@ class MsOxMessage(object):
     """
 
     def __init__(self, msg_file_path):
+        # msg_file_path is either a path or a file-like object holding the msg data
         self.msg_file_path = msg_file_path
         self.include_attachment_data = False
 
@@ -3129,7 +3134,7 @@ class MsOxMessage(object):
         return self._message.get_attached_emails_hierarchy(max_depth)
 
     def is_valid_msg_file(self):
-        if not os.path.exists(self.msg_file_path):
+        if not hasattr(self.msg_file_path, 'read') and not os.path.exists(self.msg_file_path):
             return False
 
         if not isOleFile(self.msg_file_path):
@@ -3324,6 +3329,20 @@ def data_to_md(email_data, email_file_name=None, parent_email_file=None, print_o
     return md
 
 
+def consume_nested_emails_budget(data, file_name):
+    """
+    Checks whether the nested email fits in the remaining NESTED_EMAILS_SIZE_BUDGET, and if so deducts it.
+    Keeps the memory and time spent on parsing emails with many or large nested emails bounded.
+    """
+    global NESTED_EMAILS_PARSED_SIZE
+    if NESTED_EMAILS_PARSED_SIZE + len(data) > NESTED_EMAILS_SIZE_BUDGET:
+        demisto.debug('Skipping parsing of nested email {}, the nested emails size budget of {} was exceeded'.format(
+            file_name, format_size(NESTED_EMAILS_SIZE_BUDGET)))
+        return False
+    NESTED_EMAILS_PARSED_SIZE += len(data)
+    return True
+
+
 def save_attachments(attachments, root_email_file_name, max_depth):
     attached_emls = []
     for attachment in attachments:
@@ -3332,24 +3351,17 @@ def save_attachments(attachments, root_email_file_name, max_depth):
             display_name = display_name if display_name else ''
             demisto.results(fileResult(display_name, attachment.data))
             name_lower = display_name.lower()
-            if max_depth > 0 and (name_lower.endswith(".eml") or name_lower.endswith('.p7m')):
-                tf = tempfile.NamedTemporaryFile(delete=False)
-
-                try:
-                    tf.write(attachment.data)
-                    tf.close()
-
-                    inner_eml, attached_inner_emails = handle_eml(tf.name, file_name=root_email_file_name,
-                                                                  max_depth=max_depth)
-                    if inner_eml:
-                        return_outputs(
-                            readable_output=data_to_md(inner_eml, attachment.DisplayName, root_email_file_name),
-                            outputs=None)
-                        attached_emls.append(inner_eml)
-                    if attached_inner_emails:
-                        attached_emls.extend(attached_inner_emails)
-                finally:
-                    os.remove(tf.name)
+            if max_depth > 0 and (name_lower.endswith(".eml") or name_lower.endswith('.p7m')) \
+                    and consume_nested_emails_budget(attachment.data, display_name):
+                inner_eml, attached_inner_emails = parse_eml(attachment.data, file_name=root_email_file_name,
+                                                             max_depth=max_depth)
+                if inner_eml:
+                    return_outputs(
+                        readable_output=data_to_md(inner_eml, attachment.DisplayName, root_email_file_name),
+                        outputs=None)
+                    attached_emls.append(inner_eml)
+                if attached_inner_emails:
+                    attached_emls.extend(attached_inner_emails)
 
     return attached_emls
 
@@ -3401,6 +3413,7 @@ def convert_to_unicode(s):
 
 
 def handle_msg(file_path, file_name, parse_only_headers=False, max_depth=3):
+    """ file_path is either the path of the msg file or a file-like object holding its data """
     if max_depth == 0:
         return None, []
 
@@ -3471,205 +3484,218 @@ def decode_content(mime):
         return payload
 
 
+def read_headers_block(eml_file):
+    """
+    Reads the eml file up to the empty line which ends the headers section, without reading the body
+    """
+    lines = []
+    for line in eml_file:
+        if line in ('\n', '\r\n'):
+            break
+        lines.append(line)
+    return ''.join(lines)
+
+
 def handle_eml(file_path, b64=False, file_name=None, parse_only_headers=False, max_depth=3, bom=False):
+    if max_depth == 0:
+        return None, []
+
+    with open(file_path, 'rb') as emlFile:
+        if parse_only_headers and not b64:
+            file_data = read_headers_block(emlFile)
+        else:
+            file_data = emlFile.read()
+
+    if b64:
+        file_data = b64decode(file_data)
+    if bom:
+        # decode bytes taking into account BOM and re-encode to utf-8
+        file_data = file_data.decode("utf-8-sig").encode("utf-8")
+
+    return parse_eml(file_data, file_name, parse_only_headers, max_depth)
+
+
+def parse_eml(file_data, file_name=None, parse_only_headers=False, max_depth=3):
     global ENCODINGS_TYPES
 
     if max_depth == 0:
         return None, []
 
-    with open(file_path, 'rb') as emlFile:
+    parser = HeaderParser()
+    # the headers can't span past the first empty line, no need to feed the parser with the body
+    headers = parser.parsestr(read_headers_block(BytesIO(file_data)))
+
+    header_list = []
+    headers_map = {}  # type: dict
+    for item in headers.items():
+        value = unfold(convert_to_unicode(item[1]))
+        item_dict = {
+            "name": item[0],
+            "value": value
+        }
 
-        file_data = emlFile.read()
-        if b64:
-            file_data = b64decode(file_data)
-        if bom:
-            # decode bytes taking into account BOM and re-encode to utf-8
-            file_data = file_data.decode("utf-8-sig").encode("utf-8")
-
-        parser = HeaderParser()
-        headers = parser.parsestr(file_data)
-
-        header_list = []
-        headers_map = {}  # type: dict
-        for item in headers.items():
-            value = unfold(convert_to_unicode(item[1]))
-            item_dict = {
-                "name": item[0],
-                "value": value
-            }
-
-            # old way to map headers
-            header_list.append(item_dict)
-
-            # new way to map headers - dictionary
-            if item[0] in headers_map:
-                # in case there is already such header
-                # then add that header value to value array
-                if not isinstance(headers_map[item[0]], list):
-                    # convert the existing value to array
-                    headers_map[item[0]] = [headers_map[item[0]]]
-
-                # add the new value to the value array
-                headers_map[item[0]].append(value)
-            else:
-                headers_map[item[0]] = value
+        # old way to map headers
+        header_list.append(item_dict)
 
-        eml = message_from_string(file_data)
-        if not eml:
-            raise Exception("Could not parse eml file!")
+        # new way to map headers - dictionary
+        if item[0] in headers_map:
+            # in case there is already such header
+            # then add that header value to value array
+            if not isinstance(headers_map[item[0]], list):
+                # convert the existing value to array
+                headers_map[item[0]] = [headers_map[item[0]]]
 
-        if parse_only_headers:
-            return {"HeadersMap": headers_map}, []
+            # add the new value to the value array
+            headers_map[item[0]].append(value)
+        else:
+            headers_map[item[0]] = value
 
-        html = ''
-        text = ''
-        attachment_names = []
+    eml = message_from_string(file_data)
+    if not eml:
+        raise Exception("Could not parse eml file!")
 
-        attached_emails = []
-        parts = [eml]
-
-        while parts:
-            part = parts.pop()
-            if (part.is_multipart() or part.get_content_type().startswith('multipart')) \
-                    and "attachment" not in part.get("Content-Disposition", ""):
-                parts += [part_ for part_ in part.get_payload() if isinstance(part_, email.message.Message)]
-
-            elif part.get_filename() or "attachment" in part.get("Content-Disposition", ""):
-
-                attachment_file_name = convert_to_unicode(part.get_filename())
-                if attachment_file_name is None and part.get('filename'):
-                    attachment_file_name = os.path.normpath(part.get('filename'))
-                    if os.path.isabs(attachment_file_name):
-                        attachment_file_name = os.path.basename(attachment_file_name)
-
-                if "message/rfc822" in part.get("Content-Type", "") \
-                        or ("application/octet-stream" in part.get("Content-Type", "")
-                            and attachment_file_name.endswith(".eml")):
-
-                    # .eml files
-                    file_content = ""  # type: str
-                    base64_encoded = "base64" in part.get("Content-Transfer-Encoding", "")
-
-                    if isinstance(part.get_payload(), list) and len(part.get_payload()) > 0:
-                        if attachment_file_name is None or attachment_file_name == "" or attachment_file_name == 'None':
-                            # in case there is no filename for the eml
-                            # we will try to use mail subject as file name
-                            # Subject will be in the email headers
-                            attachment_name = part.get_payload()[0].get('Subject', "no_name_mail_attachment")
-                            attachment_file_name = convert_to_unicode(attachment_name) + '.eml'
-
-                        file_content = part.get_payload()[0].as_string()
-                        if base64_encoded:
-                            try:
-                                file_content = b64decode(file_content)
-
-                            except TypeError:
-                                pass  # In case the file is a string, decode=True for get_payload is not working
-
-                    elif isinstance(part.get_payload(), basestring) and base64_encoded:
-                        file_content = part.get_payload(decode=True)
-                    else:
-                        demisto.debug("found eml attachment with Content-Type=message/rfc822 but has no payload")
+    if parse_only_headers:
+        return {"HeadersMap": headers_map}, []
+
+    html = ''
+    text = ''
+    attachment_names = []
+
+    attached_emails = []
+    parts = [eml]
+
+    while parts:
+        part = parts.pop()
+        if (part.is_multipart() or part.get_content_type().startswith('multipart')) \
+                and "attachment" not in part.get("Content-Disposition", ""):
+            parts += [part_ for part_ in part.get_payload() if isinstance(part_, email.message.Message)]
+
+        elif part.get_filename() or "attachment" in part.get("Content-Disposition", ""):
+
+            attachment_file_name = convert_to_unicode(part.get_filename())
+            if attachment_file_name is None and part.get('filename'):
+                attachment_file_name = os.path.normpath(part.get('filename'))
+                if os.path.isabs(attachment_file_name):
+                    attachment_file_name = os.path.basename(attachment_file_name)
+
+            if "message/rfc822" in part.get("Content-Type", "") \
+                    or ("application/octet-stream" in part.get("Content-Type", "")
+                        and attachment_file_name.endswith(".eml")):
+
+                # .eml files
+                file_content = ""  # type: str
+                base64_encoded = "base64" in part.get("Content-Transfer-Encoding", "")
+
+                if isinstance(part.get_payload(), list) and len(part.get_payload()) > 0:
+                    if attachment_file_name is None or attachment_file_name == "" or attachment_file_name == 'None':
+                        # in case there is no filename for the eml
+                        # we will try to use mail subject as file name
+                        # Subject will be in the email headers
+                        attachment_name = part.get_payload()[0].get('Subject', "no_name_mail_attachment")
+                        attachment_file_name = convert_to_unicode(attachment_name) + '.eml'
+
+                    file_content = part.get_payload()[0].as_string()
+                    if base64_encoded:
+                        try:
+                            file_content = b64decode(file_content)
 
-                    if file_content:
-                        # save the eml to war room as file entry
-                        demisto.results(fileResult(attachment_file_name, file_content))
+                        except TypeError:
+                            pass  # In case the file is a string, decode=True for get_payload is not working
 
-                    if file_content and max_depth - 1 > 0:
-                        f = tempfile.NamedTemporaryFile(delete=False)
+                elif isinstance(part.get_payload(), basestring) and base64_encoded:
+                    file_content = part.get_payload(decode=True)
+                else:
+                    demisto.debug("found eml attachment with Content-Type=message/rfc822 but has no payload")
+
+                if file_content:
+                    # save the eml to war room as file entry
+                    demisto.results(fileResult(attachment_file_name, file_content))
+
+                if file_content and max_depth - 1 > 0 \
+                        and consume_nested_emails_budget(file_content, attachment_file_name):
+                    inner_eml, inner_attached_emails = parse_eml(file_content,
+                                                                 file_name=attachment_file_name,
+                                                                 max_depth=max_depth - 1)
+                    attached_emails.append(inner_eml)
+                    attached_emails.extend(inner_attached_emails)
+                    # if we are outter email is a singed attachment it is a wrapper and we don't return the output of
+                    # this inner email as it will be returned as part of the main result
+                    if 'multipart/signed' not in eml.get_content_type():
+                        return_outputs(readable_output=data_to_md(inner_eml, attachment_file_name, file_name),
+                                       outputs=None)
+                attachment_names.append(attachment_file_name)
+            else:
+                # .msg and other files (png, jpeg)
+                if part.is_multipart() and max_depth - 1 > 0:
+                    # email is DSN
+                    msgs = part.get_payload()  # human-readable section
+                    i = 0
+                    for indiv_msg in msgs:
+                        msg = indiv_msg.get_payload()
+                        attachment_file_name = indiv_msg.get_filename()
                         try:
-                            f.write(file_content)
-                            f.close()
-                            inner_eml, inner_attached_emails = handle_eml(file_path=f.name,
-                                                                          file_name=attachment_file_name,
-                                                                          max_depth=max_depth - 1)
-                            attached_emails.append(inner_eml)
-                            attached_emails.extend(inner_attached_emails)
-                            # if we are outter email is a singed attachment it is a wrapper and we don't return the output of
-                            # this inner email as it will be returned as part of the main result
-                            if 'multipart/signed' not in eml.get_content_type():
-                                return_outputs(readable_output=data_to_md(inner_eml, attachment_file_name, file_name),
-                                               outputs=None)
-                        finally:
-                            os.remove(f.name)
-                    attachment_names.append(attachment_file_name)
+                            # In some cases the body content is empty and cannot be decoded.
+                            msg_info = base64.b64decode(msg).decode('utf-8')
+                        except TypeError:
+                            msg_info = str(msg)
+                        attached_emails.append(msg_info)
+                        if attachment_file_name is None:
+                            attachment_file_name = "unknown_file_name{}".format(i)
+                        demisto.results(fileResult(attachment_file_name, msg_info))
+                        attachment_names.append(attachment_file_name)
+                        i += 1
+
                 else:
-                    # .msg and other files (png, jpeg)
-                    if part.is_multipart() and max_depth - 1 > 0:
-                        # email is DSN
-                        msgs = part.get_payload()  # human-readable section
-                        i = 0
-                        for indiv_msg in msgs:
-                            msg = indiv_msg.get_payload()
-                            attachment_file_name = indiv_msg.get_filename()
-                            try:
-                                # In some cases the body content is empty and cannot be decoded.
-                                msg_info = base64.b64decode(msg).decode('utf-8')
-                            except TypeError:
-                                msg_info = str(msg)
-                            attached_emails.append(msg_info)
-                            if attachment_file_name is None:
-                                attachment_file_name = "unknown_file_name{}".format(i)
-                            demisto.results(fileResult(attachment_file_name, msg_info))
-                            attachment_names.append(attachment_file_name)
-                            i += 1
+                    file_content = part.get_payload(decode=True)
+                    # fileResult will return an error if file_content is None.
+                    if file_content and not attachment_file_name.endswith('.p7s'):
+                        demisto.results(fileResult(attachment_file_name, file_content))
 
-                    else:
-                        file_content = part.get_payload(decode=True)
-                        # fileResult will return an error if file_content is None.
-                        if file_content and not attachment_file_name.endswith('.p7s'):
-                            demisto.results(fileResult(attachment_file_name, file_content))
-
-                        if attachment_file_name.endswith(".msg") and max_depth - 1 > 0:
-                            f = tempfile.NamedTemporaryFile(delete=False)
-                            try:
-                                f.write(file_content)
-                                f.close()
-                                inner_msg, inner_attached_emails = handle_msg(f.name, attachment_file_name, False,
-                                                                              max_depth - 1)
-                                attached_emails.append(inner_msg)
-                                attached_emails.extend(inner_attached_emails)
-
-                                # will output the inner email to the UI
-                                return_outputs(
-                                    readable_output=data_to_md(inner_msg, attachment_file_name, file_name),
-                                    outputs=None)
-                            finally:
-                                os.remove(f.name)
+                    if file_content and attachment_file_name.endswith(".msg") and max_depth - 1 > 0 \
+                            and consume_nested_emails_budget(file_content, attachment_file_name):
+                        inner_msg, inner_attached_emails = handle_msg(BytesIO(file_content), attachment_file_name,
+                                                                      False, max_depth - 1)
+                        attached_emails.append(inner_msg)
+                        attached_emails.extend(inner_attached_emails)
 
-                        attachment_names.append(attachment_file_name)
-                demisto.setContext('AttachmentName', attachment_file_name)
-
-            elif part.get_content_type() == 'text/html':
-                # This line replaces a new line that starts with `..` to a newline that starts with `.`
-                # This is because SMTP duplicate dots for lines that start with `.` and get_payload() doesn't format
-                # this correctly
-                part._payload = part._payload.replace('=\r\n..', '=\r\n.')
-                html = get_utf_string(decode_content(part), 'HTML')
-
-            elif part.get_content_type() == 'text/plain':
-                text = get_utf_string(decode_content(part), 'TEXT')
-        email_data = None
-        # if we are parsing a signed attachment there can be one of two options:
-        # 1. it is 'multipart/signed' so it is probably a wrapper and we can ignore the outer "email"
-        # 2. if it is 'multipart/signed' but has 'to' address so it is actually a real mail.
-        if 'multipart/signed' not in eml.get_content_type() \
-                or ('multipart/signed' in eml.get_content_type() and extract_address_eml(eml, 'to')):
-            email_data = {
-                'To': extract_address_eml(eml, 'to'),
-                'CC': extract_address_eml(eml, 'cc'),
-                'From': extract_address_eml(eml, 'from'),
-                'Subject': convert_to_unicode(eml['Subject']),
-                'HTML': convert_to_unicode(html),
-                'Text': convert_to_unicode(text),
-                'Headers': header_list,
-                'HeadersMap': headers_map,
-                'Attachments': ','.join(attachment_names) if attachment_names else '',
-                'AttachmentNames': attachment_names if attachment_names else [],
-                'Format': eml.get_content_type(),
-                'Depth': MAX_DEPTH_CONST - max_depth
-            }
-        return email_data, attached_emails
+                        # will output the inner email to the UI
+                        return_outputs(
+                            readable_output=data_to_md(inner_msg, attachment_file_name, file_name),
+                            outputs=None)
+
+                    attachment_names.append(attachment_file_name)
+            demisto.setContext('AttachmentName', attachment_file_name)
+
+        elif part.get_content_type() == 'text/html':
+            # This line replaces a new line that starts with `..` to a newline that starts with `.`
+            # This is because SMTP duplicate dots for lines that start with `.` and get_payload() doesn't format
+            # this correctly
+            part._payload = part._payload.replace('=\r\n..', '=\r\n.')
+            html = get_utf_string(decode_content(part), 'HTML')
+
+        elif part.get_content_type() == 'text/plain':
+            text = get_utf_string(decode_content(part), 'TEXT')
+    email_data = None
+    # if we are parsing a signed attachment there can be one of two options:
+    # 1. it is 'multipart/signed' so it is probably a wrapper and we can ignore the outer "email"
+    # 2. if it is 'multipart/signed' but has 'to' address so it is actually a real mail.
+    if 'multipart/signed' not in eml.get_content_type() \
+            or ('multipart/signed' in eml.get_content_type() and extract_address_eml(eml, 'to')):
+        email_data = {
+            'To': extract_address_eml(eml, 'to'),
+            'CC': extract_address_eml(eml, 'cc'),
+            'From': extract_address_eml(eml, 'from'),
+            'Subject': convert_to_unicode(eml['Subject']),
+            'HTML': convert_to_unicode(html),
+            'Text': convert_to_unicode(text),
+            'Headers': header_list,
+            'HeadersMap': headers_map,
+            'Attachments': ','.join(attachment_names) if attachment_names else '',
+            'AttachmentNames': attachment_names if attachment_names else [],
+            'Format': eml.get_content_type(),
+            'Depth': MAX_DEPTH_CONST - max_depth
+        }
+    return email_data, attached_emails
 
 
 def create_email_output(email_data, attached_emails):
@@ -924,3 +924,62 @@ def test_pkcs7_mime(mocker):
     assert len(results) == 1
     assert results[0]['Type'] == entryTypes['note']
     assert results[0]['EntryContext']['Email']['Subject'] == 'Testing signed multipart email'
+
+
+def test_read_headers_block():
+    """
+    Given:
+        - an eml file
+    When:
+        - reading only its headers block
+    Then:
+        - the file is read up to the empty line ending the headers, the body is not read
+    """
+    from io import BytesIO
+    from ParseEmailFiles import read_headers_block
+    eml_file = BytesIO(b'Subject: test\r\nTo: a@test.com,\r\n b@test.com\r\n\r\nbody\r\n')
+    assert read_headers_block(eml_file) == b'Subject: test\r\nTo: a@test.com,\r\n b@test.com\r\n'
+    assert eml_file.read() == b'body\r\n'
+
+
+def test_eml_contains_msg_in_memory(mocker):
+    """
+    Given:
+        - an eml file with a msg attachment
+    When:
+        - parsing the eml
+    Then:
+        - the attached msg is parsed from memory, without writing it to a temp file
+    """
+    import tempfile
+    mocker.patch.object(tempfile, 'NamedTemporaryFile', side_effect=AssertionError('no temp files expected'))
+    mocker.patch.object(demisto, 'args', return_value={'entryid': 'test'})
+    mocker.patch.object(demisto, 'executeCommand',
+                        side_effect=exec_command_for_file('DONT_OPEN-MALICIOUS.eml', info='news or mail text, ASCII text'))
+    mocker.patch.object(demisto, 'results')
+
+    main()
+    results = demisto.results.call_args[0]
+    assert results[0]['EntryContext']['Email'][1]["Subject"] == 'Attacker email'
+
+
+def test_nested_emails_size_budget(mocker):
+    """
+    Given:
+        - an eml file with an eml attachment, which is larger than the nested emails size budget
+    When:
+        - parsing the eml
+    Then:
+        - the attached eml is returned as a file but isn't parsed
+    """
+    import ParseEmailFiles
+    mocker.patch.object(ParseEmailFiles, 'NESTED_EMAILS_SIZE_BUDGET', 10)
+    mocker.patch.object(ParseEmailFiles, 'NESTED_EMAILS_PARSED_SIZE', 0)
+    mocker.patch.object(demisto, 'args', return_value={'entryid': 'test'})
+    mocker.patch.object(demisto, 'executeCommand', side_effect=exec_command_for_file('eml_contains_base64_eml.eml'))
+    mocker.patch.object(demisto, 'results')
+
+    main()
+    results = demisto.results.call_args[0]
+    assert results[0]['EntryContext']['Email']['Subject'] == 'Fwd: test - inner attachment eml (base64)'
+    assert 'message.eml' in results[0]['EntryContext']['Email']['Attachments']
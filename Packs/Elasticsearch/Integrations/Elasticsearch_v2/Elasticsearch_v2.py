@@ -43,6 +43,10 @@ FETCH_INDEX = demisto.params().get('fetch_index', '')
 FETCH_QUERY = demisto.params().get('fetch_query', '')
 FETCH_TIME = demisto.params().get('fetch_time', '3 days')
 FETCH_SIZE = int(demisto.params().get('fetch_size', 50))
+FETCH_SOURCE_FIELDS = argToList(demisto.params().get('fetch_source_fields'))
+FETCH_TIEBREAKER_FIELD = demisto.params().get('fetch_tiebreaker_field') or '_id'
+# the max number of hits requested in a single search_after page of the fetch
+FETCH_PAGE_SIZE = 1000
 INSECURE = not demisto.params().get('insecure', False)
 TIME_METHOD = demisto.params().get('time_method', 'Simple-Date')
 
@@ -471,13 +475,15 @@ def incident_label_maker(source):
     return labels
 
 
-def results_to_incidents_timestamp(response, last_fetch):
+def results_to_incidents_timestamp(response, last_fetch, include_last_fetch=False):
     """Converts the current results into incidents.
 
     Args:
         response(dict): the raw search results from Elasticsearch.
         last_fetch(num): the date or timestamp of the last fetch before this fetch
         - this will hold the last date of the incident brought by this fetch.
+        include_last_fetch(bool): whether to keep the hits at the time of the last fetch, when the search itself
+        already excludes the hits of the previous fetches.
 
     Returns:
         (list).The incidents.
@@ -495,7 +501,7 @@ def results_to_incidents_timestamp(response, last_fetch):
                 last_fetch = hit_timestamp
 
             # avoid duplication due to weak time query
-            if hit_timestamp > current_fetch:
+            if hit_timestamp > current_fetch or (include_last_fetch and hit_timestamp == current_fetch):
                 inc = {
                     'name': 'Elasticsearch: Index: ' + str(hit.get('_index')) + ", ID: " + str(hit.get('_id')),
                     'rawJSON': json.dumps(hit),
@@ -507,13 +513,15 @@ def results_to_incidents_timestamp(response, last_fetch):
     return incidents, last_fetch
 
 
-def results_to_incidents_datetime(response, last_fetch):
+def results_to_incidents_datetime(response, last_fetch, include_last_fetch=False):
     """Converts the current results into incidents.
 
     Args:
         response(dict): the raw search results from Elasticsearch.
         last_fetch(datetime): the date or timestamp of the last fetch before this fetch
         - this will hold the last date of the incident brought by this fetch.
+        include_last_fetch(bool): whether to keep the hits at the time of the last fetch, when the search itself
+        already excludes the hits of the previous fetches.
 
     Returns:
         (list).The incidents.
@@ -533,7 +541,7 @@ def results_to_incidents_datetime(response, last_fetch):
                 last_fetch_timestamp = hit_timestamp
 
             # avoid duplication due to weak time query
-            if hit_timestamp > current_fetch:
+            if hit_timestamp > current_fetch or (include_last_fetch and hit_timestamp == current_fetch):
                 inc = {
                     'name': 'Elasticsearch: Index: ' + str(hit.get('_index')) + ", ID: " + str(hit.get('_id')),
                     'rawJSON': json.dumps(hit),
@@ -566,6 +574,49 @@ def format_to_iso(date_string):
     return date_string
 
 
+def search_new_hits(es, last_fetch_timestamp, search_after=None):
+    """Pages through the hits of the fetch query which are newer than the last fetch, up to FETCH_SIZE hits.
+
+    Notes:
+        the hits are sorted by the time field and the tiebreaker field, and are paged with search_after, so hits which
+        share a timestamp are neither skipped nor fetched twice across the fetches.
+
+    Args:
+        es(Elasticsearch): an Elasticsearch object to which we run the search.
+        last_fetch_timestamp(num): the epoch timestamp of the last fetch.
+        search_after(list): the sort values of the last hit of the previous fetch, if there is one.
+
+    Returns:
+        (list).The new hits.
+        (list).The sort values of the last hit, to continue the next fetch from.
+    """
+    query = QueryString(query=FETCH_QUERY + " AND " + TIME_FIELD + ":*")
+    # the hits at the time of the last fetch which were not fetched yet are after search_after
+    time_operator = 'gte' if search_after else 'gt'
+    # Elastic search can use epoch timestamps (in milliseconds) as date representation regardless of date format.
+    search = Search(using=es, index=FETCH_INDEX).filter({'range': {TIME_FIELD: {time_operator: last_fetch_timestamp}}})
+    search = search.sort({TIME_FIELD: {'order': 'asc'}}, {FETCH_TIEBREAKER_FIELD: {'order': 'asc'}}).query(query)
+    if FETCH_SOURCE_FIELDS:
+        # the time field is needed to create the incidents
+        search = search.source(FETCH_SOURCE_FIELDS + [TIME_FIELD] if TIME_FIELD not in FETCH_SOURCE_FIELDS
+                               else FETCH_SOURCE_FIELDS)
+
+    hits = []  # type: List
+    while len(hits) < FETCH_SIZE:
+        page_size = min(FETCH_PAGE_SIZE, FETCH_SIZE - len(hits))
+        page = search.extra(size=page_size)
+        if search_after:
+            page = page.extra(search_after=search_after)
+        page_hits = page.execute().to_dict().get('hits', {}).get('hits', [])
+        if page_hits:
+            hits.extend(page_hits)
+            search_after = page_hits[-1].get('sort')
+        if len(page_hits) < page_size:
+            break
+
+    return hits, search_after
+
+
 def fetch_incidents(proxies):
     last_run = demisto.getLastRun()
     last_fetch = last_run.get('time')
@@ -593,23 +644,20 @@ def fetch_incidents(proxies):
 
     es = elasticsearch_builder(proxies)
 
-    query = QueryString(query=FETCH_QUERY + " AND " + TIME_FIELD + ":*")
-    # Elastic search can use epoch timestamps (in milliseconds) as date representation regardless of date format.
-    search = Search(using=es, index=FETCH_INDEX).filter({'range': {TIME_FIELD: {'gt': last_fetch_timestamp}}})
-    search = search.sort({TIME_FIELD: {'order': 'asc'}})[0:FETCH_SIZE].query(query)
-    response = search.execute().to_dict()
-    _, total_results = get_total_results(response)
+    hits, search_after = search_new_hits(es, last_fetch_timestamp, last_run.get('search_after'))
+    response = {'hits': {'hits': hits}}
 
     incidents = []  # type: List
 
-    if total_results > 0:
+    if hits:
+        # the search already excludes the hits of the previous fetches
         if 'Timestamp' in TIME_METHOD:
-            incidents, last_fetch = results_to_incidents_timestamp(response, last_fetch)
-            demisto.setLastRun({'time': last_fetch})
+            incidents, last_fetch = results_to_incidents_timestamp(response, last_fetch, include_last_fetch=True)
+            demisto.setLastRun({'time': last_fetch, 'search_after': search_after})
 
         else:
-            incidents, last_fetch = results_to_incidents_datetime(response, last_fetch)
-            demisto.setLastRun({'time': str(last_fetch)})
+            incidents, last_fetch = results_to_incidents_datetime(response, last_fetch, include_last_fetch=True)
+            demisto.setLastRun({'time': str(last_fetch), 'search_after': search_after})
 
         demisto.info('extract {} incidents'.format(len(incidents)))
     demisto.incidents(incidents)
@@ -614,6 +614,86 @@ def test_elasticsearch_parse_subtree():
     assert str(sub_tree) == str(MOCK_ES7_SCHEMA_OUTPUT)
 
 
+def mock_sorted_search(hits):
+    """Mocks the execution of a search sorted by the Date and _id fields, which returns the page after search_after."""
+    def execute(search):
+        body = search.to_dict()
+        search_after = body.get('search_after')
+        page = [hit for hit in hits if search_after is None or hit['sort'] > search_after][:body['size']]
+        return mock.Mock(to_dict=lambda: {'hits': {'hits': page}})
+    return execute
+
+
+BURST_HITS = [{'_index': 'customer', '_id': str(i), '_source': {'Date': '1572502640', 'name': str(i)},
+               'sort': [1572502640, str(i)]} for i in range(5)]
+
+
+@patch("Elasticsearch_v2.TIME_METHOD", 'Timestamp-Seconds')
+@patch("Elasticsearch_v2.TIME_FIELD", 'Date')
+@patch("Elasticsearch_v2.FETCH_INDEX", "customer")
+@patch("Elasticsearch_v2.FETCH_QUERY", "*")
+@patch("Elasticsearch_v2.FETCH_SIZE", 3)
+@patch("Elasticsearch_v2.FETCH_PAGE_SIZE", 2)
+@patch("Elasticsearch_v2.FETCH_SOURCE_FIELDS", ['name'])
+def test_search_new_hits(mocker):
+    """
+    Given:
+        - A fetch size larger than the page size, and source fields to fetch.
+    When:
+        - Searching the new hits.
+    Then:
+        - The hits are paged with search_after up to the fetch size, with the tiebreaker sort and the time field in
+          the source fields.
+    """
+    from elasticsearch_dsl import Search
+    from Elasticsearch_v2 import search_new_hits
+    searches = []
+
+    def execute(search):
+        searches.append(search.to_dict())
+        return mock_sorted_search(BURST_HITS)(search)
+
+    mocker.patch.object(Search, 'execute', autospec=True, side_effect=execute)
+    hits, search_after = search_new_hits(None, 1572502630)
+    assert [hit['_id'] for hit in hits] == ['0', '1', '2']
+    assert search_after == [1572502640, '2']
+    assert [search['size'] for search in searches] == [2, 1]
+    assert searches[1]['search_after'] == [1572502640, '1']
+    assert searches[0]['sort'] == [{'Date': {'order': 'asc'}}, {'_id': {'order': 'asc'}}]
+    assert searches[0]['_source'] == ['name', 'Date']
+
+
+@patch("Elasticsearch_v2.TIME_METHOD", 'Timestamp-Seconds')
+@patch("Elasticsearch_v2.TIME_FIELD", 'Date')
+@patch("Elasticsearch_v2.FETCH_INDEX", "customer")
+@patch("Elasticsearch_v2.FETCH_QUERY", "*")
+@patch("Elasticsearch_v2.FETCH_SIZE", 3)
+def test_fetch_incidents_same_timestamp(mocker):
+    """
+    Given:
+        - More hits which share the same timestamp than the fetch size.
+    When:
+        - Fetching incidents twice.
+    Then:
+        - Every hit is fetched exactly once.
+    """
+    import demistomock as demisto
+    from elasticsearch_dsl import Search
+    from Elasticsearch_v2 import fetch_incidents
+    last_run = {'time': 1572502630}
+    mocker.patch.object(demisto, 'getLastRun', side_effect=lambda: last_run)
+    mocker.patch.object(demisto, 'setLastRun', side_effect=last_run.update)
+    incidents = mocker.patch.object(demisto, 'incidents')
+    mocker.patch('Elasticsearch_v2.elasticsearch_builder')
+    mocker.patch.object(Search, 'execute', autospec=True, side_effect=mock_sorted_search(BURST_HITS))
+
+    fetch_incidents(None)
+    fetch_incidents(None)
+    fetched = [inc['name'] for call in incidents.call_args_list for inc in call[0][0]]
+    assert fetched == ['Elasticsearch: Index: customer, ID: {}'.format(i) for i in range(5)]
+    assert last_run == {'time': 1572502640, 'search_after': [1572502640, '4']}
+
+
 # This is the class we want to test
 '''
 The get-mapping-fields command perform a GET /<index name>/_mapping http command
@@ -2,7 +2,7 @@ import demistomock as demisto  # noqa
 
 from typing import Tuple, List
 from math import floor
-from functools import reduce
+import random
 
 import ExpanseGenerateIssueMapWidgetScript
 
@@ -186,11 +186,39 @@ def test_calc_clusters(mocker):
     mocker.patch('ExpanseGenerateIssueMapWidgetScript.lon_to_x', side_effect=lambda x: x)
 
     points = [(0, 0), (4, 4), (300, 300), (320, 320), (280, 280)]
-    clusters = reduce(ExpanseGenerateIssueMapWidgetScript.calc_clusters, points, [])
+    clusters = ExpanseGenerateIssueMapWidgetScript.calc_clusters(points)
 
     assert clusters == [[(0, 0), (4, 4)], [(300, 300), (320, 320), (280, 280)]]
 
 
+def test_calc_clusters_grid(mocker):
+    """
+    Given:
+        - random issue coordinates
+    When
+        - calculating grouping of points in clusters
+    Then
+        - the grid index groups the points exactly like a linear scan over all the clusters
+    """
+    mocker.patch('ExpanseGenerateIssueMapWidgetScript.lat_to_y', side_effect=lambda y: y)
+    mocker.patch('ExpanseGenerateIssueMapWidgetScript.lon_to_x', side_effect=lambda x: x)
+    radius = ExpanseGenerateIssueMapWidgetScript.ZOC_RADIUS
+
+    rand = random.Random(42)
+    points = [(rand.randint(0, 1000), rand.randint(0, 1000)) for _ in range(500)]
+
+    expected: List[List[Tuple[int, int]]] = []
+    for y, x in points:
+        for cluster in expected:
+            if (cluster[0][0] - x)**2 + (cluster[0][1] - y)**2 < radius**2:
+                cluster.append((x, y))
+                break
+        else:
+            expected.append([(x, y)])
+
+    assert ExpanseGenerateIssueMapWidgetScript.calc_clusters(points) == expected
+
+
 def test_extract_geolocation(mocker):
     """
     Given:
@@ -245,3 +273,23 @@ def test_generate_map_command(mocker):
     assert eg_mock.call_args[0][0] == "fake-from"
     assert eg_mock.call_args[0][1] == "fake-to"
     assert result.startswith('### Map of Open Incidents On Prem')
+
+
+def test_generate_map_command_cache(mocker):
+    """
+    Given:
+        - the same geolocations returned in a different order
+    When
+        - generating the map twice
+    Then
+        - the map is rendered only once
+    """
+    mocker.patch('ExpanseGenerateIssueMapWidgetScript.extract_geolocation',
+                 side_effect=[[(3.14, 14.3), (40.7, -74.0)], [(40.7, -74.0), (3.14, 14.3)]])
+    ExpanseGenerateIssueMapWidgetScript.render_map.cache_clear()
+
+    first = ExpanseGenerateIssueMapWidgetScript.generate_map_command({})
+    second = ExpanseGenerateIssueMapWidgetScript.generate_map_command({})
+
+    assert first == second
+    assert ExpanseGenerateIssueMapWidgetScript.render_map.cache_info().misses == 1
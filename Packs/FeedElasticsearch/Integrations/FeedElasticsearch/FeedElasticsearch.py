@@ -8,6 +8,9 @@ from elasticsearch_dsl import Search
 from elasticsearch_dsl.query import QueryString
 import requests
 import warnings
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Disable insecure warnings
 requests.packages.urllib3.disable_warnings()
@@ -31,12 +34,16 @@ MODULE_TO_FEEDMAP_KEY = 'moduleToFeedMap'
 FEED_TYPE_GENERIC = 'Generic Feed'
 FEED_TYPE_CORTEX = 'Cortex XSOAR Feed'
 FEED_TYPE_CORTEX_MT = 'Cortex XSOAR MT Shared Feed'
+CREATE_INDICATORS_BATCH_SIZE = 2000
+DEFAULT_SCROLL_SLICES = 4
+# the max number of hits read from the scroll slices ahead of the indicators creation
+HITS_QUEUE_SIZE = 5000
 
 
 class ElasticsearchClient:
     def __init__(self, insecure=None, server=None, username=None, password=None, api_key=None, api_id=None,
                  time_field=None, time_method=None, fetch_index=None, fetch_time=None, query=None, tags=None,
-                 tlp_color=None):
+                 tlp_color=None, scroll_slices=DEFAULT_SCROLL_SLICES):
         self._insecure = insecure
         self._proxy = handle_proxy()
         # _elasticsearch_builder expects _proxy to be None if empty
@@ -54,6 +61,7 @@ class ElasticsearchClient:
         self.es = self._elasticsearch_builder()
         self.tags = tags
         self.tlp_color = tlp_color
+        self.scroll_slices = scroll_slices
 
     def _elasticsearch_builder(self):
         """Builds an Elasticsearch obj with the necessary credentials, proxy settings and secure connection."""
@@ -196,36 +204,130 @@ def get_demisto_indicators(search, tags, tlp_color):
     return ioc_lst, ioc_enrch_lst
 
 
-def fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch):
+def scan_slices(search, slices, sort_field=None):
+    """
+    Scans the search with sliced scrolls in parallel, and yields their hits as they arrive, through a bounded queue.
+    If a sort field is given, the hits of each slice are ordered by it.
+    :return: a generator of (slice id, hit) tuples, and (slice id, None) once the slice was scanned
+    """
+    if sort_field:
+        search = search.sort(sort_field).params(preserve_order=True)
+    hits_queue: queue.Queue = queue.Queue(maxsize=HITS_QUEUE_SIZE)
+    stop_event = threading.Event()
+
+    def put(item):
+        while not stop_event.is_set():
+            try:
+                hits_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan_slice(slice_id):
+        try:
+            sliced_search = search.extra(slice={'id': slice_id, 'max': slices}) if slices > 1 else search
+            for hit in sliced_search.scan():
+                if not put((slice_id, hit)):
+                    return
+            put((slice_id, None))
+        except Exception as e:
+            put((slice_id, e))
+
+    with ThreadPoolExecutor(max_workers=slices) as executor:
+        for slice_id in range(slices):
+            executor.submit(scan_slice, slice_id)
+        try:
+            scanned_slices = 0
+            while scanned_slices < slices:
+                slice_id, hit = hits_queue.get()
+                if isinstance(hit, Exception):
+                    raise hit
+                if hit is None:
+                    scanned_slices += 1
+                yield slice_id, hit
+        finally:
+            stop_event.set()
+
+
+def get_hit_time(hit, time_field):
+    """Gets the time field value of a hit, where the time field may be a dotted path such as event.created"""
+    value = hit.to_dict()
+    if time_field in value:
+        return value[time_field]
+    for key in time_field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def get_checkpoint(slices_last_time, scanned_slices, slices):
+    """
+    Gets the time field value up to which all of the hits were fetched, which is the earliest last time of the
+    slices which weren't scanned yet, as the hits of each slice are ordered by the time field.
+    There is no checkpoint until every slice which wasn't scanned yet has a last time.
+    """
+    times = []
+    for slice_id in range(slices):
+        if slice_id in scanned_slices:
+            continue
+        slice_time = slices_last_time.get(slice_id)
+        if slice_time is None:
+            return None
+        times.append(slice_time)
+    return min(times) if times else None
+
+
+def fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch, checkpoint=None):
     """Implements fetch-indicators command"""
     last_fetch_timestamp = get_last_fetch_timestamp(last_fetch, client.time_method, client.fetch_time)
+    # an interrupted fetch resumes from its checkpoint, including the hits with the checkpoint time
+    from_time, from_operator = (checkpoint, 'gte') if checkpoint else (last_fetch_timestamp, 'gt')
     now = datetime.now()
-    ioc_lst: list = []
-    ioc_enrch_lst: list = []
     if FEED_TYPE_GENERIC not in feed_type:
         # Insight is the name of the indicator object as it's saved into the database
-        search = get_scan_insight_format(client, now, last_fetch_timestamp, feed_type)
-        for hit in search.scan():
+        search = get_scan_insight_format(client, now, from_time, feed_type, from_operator)
+    else:
+        search = get_scan_generic_format(client, now, from_time, from_operator)
+
+    ioc_lst: list = []
+    ioc_enrch_batches: list = []
+    slices_last_time: dict = {}
+    scanned_slices: set = set()
+    for slice_id, hit in scan_slices(search, client.scroll_slices, client.time_field):
+        if hit is None:
+            scanned_slices.add(slice_id)
+        elif FEED_TYPE_GENERIC not in feed_type:
             hit_lst, hit_enrch_lst = extract_indicators_from_insight_hit(hit, tags=client.tags,
                                                                          tlp_color=client.tlp_color)
             ioc_lst.extend(hit_lst)
-            ioc_enrch_lst.extend(hit_enrch_lst)
-    else:
-        search = get_scan_generic_format(client, now, last_fetch_timestamp)
-        for hit in search.scan():
+            add_to_enrichment_batches(ioc_enrch_batches, hit_enrch_lst)
+        else:
             ioc_lst.extend(extract_indicators_from_generic_hit(hit, src_val, src_type, default_type, client.tags,
                                                                client.tlp_color))
+        if hit is not None and client.time_field:
+            hit_time = get_hit_time(hit, client.time_field)
+            if hit_time is not None:
+                slices_last_time[slice_id] = hit_time
+        if len(ioc_lst) >= CREATE_INDICATORS_BATCH_SIZE:
+            create_indicators(ioc_lst, ioc_enrch_batches)
+            ioc_lst, ioc_enrch_batches = [], []
+            new_checkpoint = get_checkpoint(slices_last_time, scanned_slices, client.scroll_slices)
+            if new_checkpoint is not None:
+                demisto.setLastRun({'time': last_fetch, 'checkpoint': new_checkpoint})
+    create_indicators(ioc_lst, ioc_enrch_batches)
+    demisto.setLastRun({'time': now.timestamp() * 1000})
+
 
-    if ioc_lst:
-        for b in batch(ioc_lst, batch_size=2000):
+def create_indicators(ioc_lst, ioc_enrch_batches):
+    """Creates the indicators, and then their enrichments"""
+    for b in batch(ioc_lst, batch_size=CREATE_INDICATORS_BATCH_SIZE):
+        demisto.createIndicators(b)
+    for enrch_batch in ioc_enrch_batches:
+        # ensure batch sizes don't exceed 2000
+        for b in batch(enrch_batch, batch_size=CREATE_INDICATORS_BATCH_SIZE):
             demisto.createIndicators(b)
-    if ioc_enrch_lst:
-        ioc_enrch_batches = create_enrichment_batches(ioc_enrch_lst)
-        for enrch_batch in ioc_enrch_batches:
-            # ensure batch sizes don't exceed 2000
-            for b in batch(enrch_batch, batch_size=2000):
-                demisto.createIndicators(b)
-    demisto.setLastRun({'time': now.timestamp() * 1000})
 
 
 def get_last_fetch_timestamp(last_fetch, time_method, fetch_time):
@@ -241,7 +343,7 @@ def get_last_fetch_timestamp(last_fetch, time_method, fetch_time):
     return last_fetch_timestamp
 
 
-def get_scan_generic_format(client, now, last_fetch_timestamp=None):
+def get_scan_generic_format(client, now, last_fetch_timestamp=None, from_operator='gt'):
     """Gets a scan object in generic format"""
     # if method is simple date - convert the date string to datetime
     es = client.es
@@ -252,7 +354,7 @@ def get_scan_generic_format(client, now, last_fetch_timestamp=None):
     if time_field:
         query = QueryString(query=time_field + ':*')
         range_field = {
-            time_field: {'gt': last_fetch_timestamp, 'lte': now}} if last_fetch_timestamp else {
+            time_field: {from_operator: last_fetch_timestamp, 'lte': now}} if last_fetch_timestamp else {
             time_field: {'lte': now}}
         search = Search(using=es, index=fetch_index).filter({'range': range_field}).query(query)
     else:
@@ -269,11 +371,11 @@ def extract_indicators_from_generic_hit(hit, src_val, src_type, default_type, ta
     return ioc_lst
 
 
-def get_scan_insight_format(client, now, last_fetch_timestamp=None, feed_type=None):
+def get_scan_insight_format(client, now, last_fetch_timestamp=None, feed_type=None, from_operator='gt'):
     """Gets a scan object in insight format"""
     time_field = client.time_field
     range_field = {
-        time_field: {'gt': last_fetch_timestamp, 'lte': now}} if last_fetch_timestamp else {
+        time_field: {from_operator: last_fetch_timestamp, 'lte': now}} if last_fetch_timestamp else {
         time_field: {'lte': now}}
     es = client.es
     query = QueryString(query=time_field + ":*")
@@ -335,16 +437,18 @@ def create_enrichment_batches(ioc_enrch_lst):
     """
     Create batches for enrichments, by separating enrichments that come from the same indicator into diff batches
     """
-    max_enrch_len = 0
+    return add_to_enrichment_batches([], ioc_enrch_lst)
+
+
+def add_to_enrichment_batches(enrch_batch_lst, ioc_enrch_lst):
+    """
+    Adds the enrichments of each indicator to the enrichment batches, the i-th enrichment to the i-th batch
+    """
     for ioc_enrch_obj in ioc_enrch_lst:
-        max_enrch_len = max(max_enrch_len, len(ioc_enrch_obj))
-    enrch_batch_lst = []
-    for i in range(max_enrch_len):
-        enrch_batch_obj = []
-        for ioc_enrch_obj in ioc_enrch_lst:
-            if i < len(ioc_enrch_obj):
-                enrch_batch_obj.append(ioc_enrch_obj[i])
-        enrch_batch_lst.append(enrch_batch_obj)
+        for i, ioc_enrch in enumerate(ioc_enrch_obj):
+            if i == len(enrch_batch_lst):
+                enrch_batch_lst.append([])
+            enrch_batch_lst[i].append(ioc_enrch)
     return enrch_batch_lst
 
 
@@ -364,19 +468,22 @@ def main():
         fetch_index = params.get('fetch_index')
         fetch_time = params.get('fetch_time', '3 days')
         query = params.get('es_query')
+        scroll_slices = int(params.get('scroll_slices') or DEFAULT_SCROLL_SLICES)
         api_id, api_key = extract_api_from_username_password(username, password)
         client = ElasticsearchClient(insecure, server, username, password, api_key, api_id, time_field, time_method,
-                                     fetch_index, fetch_time, query, tags, tlp_color)
+                                     fetch_index, fetch_time, query, tags, tlp_color, scroll_slices)
         src_val = params.get('src_val')
         src_type = params.get('src_type')
         default_type = params.get('default_type')
-        last_fetch = demisto.getLastRun().get('time')
+        last_run = demisto.getLastRun()
+        last_fetch = last_run.get('time')
 
         if demisto.command() == 'test-module':
             test_command(client, feed_type, src_val, src_type, default_type, time_method, time_field, fetch_time, query,
                          username, password, api_key, api_id)
         elif demisto.command() == 'fetch-indicators':
-            fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch)
+            fetch_indicators_command(client, feed_type, src_val, src_type, default_type, last_fetch,
+                                     last_run.get('checkpoint'))
         elif demisto.command() == 'es-get-indicators':
             get_indicators_command(client, feed_type, src_val, src_type, default_type)
     except Exception as e:
@@ -1,3 +1,7 @@
+import pytest
+import demistomock as demisto
+
+
 class MockHit:
     def __init__(self, hit_val):
         self._hit_val = hit_val
@@ -219,6 +223,146 @@ def test_create_enrichment_batches_mult_indicators():
     assert ioc_enrch_lst_of_lsts[3] == [9]
 
 
+class MockSearch:
+    """
+    A search of hits in a number of slices, which are returned ordered by their time when sorted.
+    """
+    def __init__(self, slices_hits, slice_id=0, sort_field=None):
+        self._slices_hits = slices_hits
+        self._slice_id = slice_id
+        self._sort_field = sort_field
+
+    def sort(self, field):
+        return MockSearch(self._slices_hits, self._slice_id, field)
+
+    def params(self, **kwargs):
+        assert kwargs == {'preserve_order': True}
+        return self
+
+    def extra(self, slice):
+        assert slice['max'] == len(self._slices_hits)
+        return MockSearch(self._slices_hits, slice['id'], self._sort_field)
+
+    def scan(self):
+        hits = self._slices_hits[self._slice_id]
+        if isinstance(hits, Exception):
+            raise hits
+        if self._sort_field:
+            hits = sorted(hits, key=lambda hit: get_path(hit, self._sort_field))
+        return [MockHit(hit) for hit in hits]
+
+
+def get_path(hit, path):
+    for key in path.split('.'):
+        hit = hit[key]
+    return hit
+
+
+def generate_slices_hits(slices, hits_per_slice):
+    return [[{CUSTOM_VAL_KEY: '{}.{}.0.0'.format(slice_id, i), 'time': (i * 7) % hits_per_slice}
+             for i in range(hits_per_slice)] for slice_id in range(slices)]
+
+
+def test_scan_slices():
+    import FeedElasticsearch as esf
+    slices_hits = generate_slices_hits(3, 10)
+    results = list(esf.scan_slices(MockSearch(slices_hits), 3, 'time'))
+    for slice_id in range(3):
+        slice_results = [hit for result_slice_id, hit in results if result_slice_id == slice_id]
+        assert [hit.to_dict()['time'] for hit in slice_results[:-1]] == list(range(10))
+        assert slice_results[-1] is None
+
+    with pytest.raises(ValueError, match='scroll failed'):
+        list(esf.scan_slices(MockSearch([slices_hits[0], ValueError('scroll failed')]), 2))
+
+
+def test_fetch_indicators_sliced(mocker):
+    """
+    Given:
+        - An index scanned in 3 slices, with more hits than the indicators batch size.
+    When:
+        - Fetching indicators.
+    Then:
+        - All of the indicators are created in batches while the slices are scanned.
+        - Each checkpoint is set only after all of the hits before its time were created.
+        - The last run of the completed fetch has no checkpoint.
+    """
+    import FeedElasticsearch as esf
+    slices_hits = generate_slices_hits(3, 10)
+    client = esf.ElasticsearchClient(server='https://localhost:9200', time_field='time', time_method='Simple-Date',
+                                     fetch_time='3 days', scroll_slices=3)
+    mocker.patch.object(esf, 'get_scan_generic_format', return_value=MockSearch(slices_hits))
+    mocker.patch.object(esf, 'CREATE_INDICATORS_BATCH_SIZE', 4)
+    created = []
+    mocker.patch.object(demisto, 'createIndicators', side_effect=created.extend)
+    checkpoints = []
+
+    def set_last_run(last_run):
+        if 'checkpoint' in last_run:
+            created_values = {ioc['value'] for ioc in created}
+            assert all(hit[CUSTOM_VAL_KEY] in created_values for hits in slices_hits for hit in hits
+                       if hit['time'] < last_run['checkpoint'])
+            checkpoints.append(last_run['checkpoint'])
+        else:
+            assert len(created) == 30
+
+    mocker.patch.object(demisto, 'setLastRun', side_effect=set_last_run)
+    esf.fetch_indicators_command(client, esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY, None, 'IP', None)
+    assert sorted(ioc['value'] for ioc in created) == sorted(hit[CUSTOM_VAL_KEY] for hits in slices_hits for hit in hits)
+    assert checkpoints == sorted(checkpoints)
+    assert demisto.setLastRun.call_count == len(checkpoints) + 1
+
+
+def test_fetch_indicators_nested_time_field(mocker):
+    """
+    Given:
+        - An index scanned in 4 slices, with a time field nested under the event object.
+    When:
+        - Fetching indicators.
+    Then:
+        - The checkpoints are set from the nested time values.
+    """
+    import FeedElasticsearch as esf
+    slices_hits = [[{CUSTOM_VAL_KEY: hit[CUSTOM_VAL_KEY], 'event': {'created': hit['time']}} for hit in hits]
+                   for hits in generate_slices_hits(4, 10)]
+    client = esf.ElasticsearchClient(server='https://localhost:9200', time_field='event.created',
+                                     time_method='Simple-Date', fetch_time='3 days', scroll_slices=4)
+    mocker.patch.object(esf, 'get_scan_generic_format', return_value=MockSearch(slices_hits))
+    mocker.patch.object(esf, 'CREATE_INDICATORS_BATCH_SIZE', 4)
+    created = []
+    mocker.patch.object(demisto, 'createIndicators', side_effect=created.extend)
+    set_last_run = mocker.patch.object(demisto, 'setLastRun')
+    esf.fetch_indicators_command(client, esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY, None, 'IP', None)
+    assert len(created) == 40
+    checkpoints = [call[0][0]['checkpoint'] for call in set_last_run.call_args_list if 'checkpoint' in call[0][0]]
+    assert checkpoints
+    assert all(isinstance(checkpoint, int) for checkpoint in checkpoints)
+
+
+@pytest.mark.parametrize('slices_last_time, scanned_slices, expected', [
+    ({0: 5, 1: 3}, set(), 3),
+    ({0: 5}, {1}, 5),
+    ({0: 5}, set(), None),
+    ({0: 5, 1: None}, set(), None),
+    ({}, {0, 1}, None),
+])
+def test_get_checkpoint(slices_last_time, scanned_slices, expected):
+    import FeedElasticsearch as esf
+    assert esf.get_checkpoint(slices_last_time, scanned_slices, 2) == expected
+
+
+def test_fetch_indicators_resume_from_checkpoint(mocker):
+    import FeedElasticsearch as esf
+    client = esf.ElasticsearchClient(server='https://localhost:9200', time_field='time', time_method='Simple-Date',
+                                     fetch_time='3 days', scroll_slices=1)
+    get_scan = mocker.patch.object(esf, 'get_scan_generic_format', return_value=MockSearch([[]]))
+    mocker.patch.object(demisto, 'setLastRun')
+    esf.fetch_indicators_command(client, esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY, None, 'IP', 1000, checkpoint=5)
+    assert get_scan.call_args[0][2:] == (5, 'gte')
+    esf.fetch_indicators_command(client, esf.FEED_TYPE_GENERIC, CUSTOM_VAL_KEY, None, 'IP', 1000)
+    assert get_scan.call_args[0][2:] == (1000, 'gt')
+
+
 def test_elasticsearch_builder_called_with_username_password(mocker):
     from elasticsearch import Elasticsearch
     import FeedElasticsearch as esf
@@ -2,9 +2,12 @@ import demistomock as demisto
 from CommonServerPython import *
 
 from typing import List, Dict, Set, Optional
+import hashlib
 import json
+import os
+import tempfile
+import uuid
 import requests
-from stix2 import TAXIICollectionSource, Filter
 from taxii2client.v20 import Server, Collection, ApiRoot
 
 ''' CONSTANT VARIABLES '''
@@ -36,6 +39,14 @@ mitre_field_mapping = {
     "mitremodified": {"name": "modified", "type": "str"}
 }
 
+# The MITRE types which are ingested, in the order in which the indicators
+# which share a value are merged.
+MITRE_TYPES = ['attack-pattern', 'course-of-action', 'intrusion-set', 'malware', 'tool']
+
+# The docker container is kept between the executions of the integration,
+# so the collection bundles are cached in its temp dir.
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'FeedMitreAttack')
+
 # Disable insecure warnings
 requests.packages.urllib3.disable_warnings()
 
@@ -86,8 +97,8 @@ class Client:
         """
 
         indicators: List[Dict] = list()
+        indicator_by_value: Dict[str, Dict] = dict()
         mitre_id_list: Set[str] = set()
-        indicator_values_list: Set[str] = set()
         external_refs: Set[str] = set()
         counter = 0
 
@@ -102,150 +113,130 @@ class Client:
             collection_url = urljoin(self.base_url, f'stix/collections/{collection.id}/')
             collection_data = Collection(collection_url, verify=self.verify, proxies=self.proxies)
 
-            # Supply the collection to TAXIICollection
-            tc_source = TAXIICollectionSource(collection_data)
-
-            # Create filters to retrieve content
-            filter_objs = {
-                "Technique": {"name": "attack-pattern", "filter": Filter("type", "=", "attack-pattern")},
-                "Mitigation": {"name": "course-of-action", "filter": Filter("type", "=", "course-of-action")},
-                "Group": {"name": "intrusion-set", "filter": Filter("type", "=", "intrusion-set")},
-                "Malware": {"name": "malware", "filter": Filter("type", "=", "malware")},
-                "Tool": {"name": "tool", "filter": Filter("type", "=", "tool")},
-            }
+            try:
+                mitre_data = get_collection_objects(collection_data)
+            except Exception as err:
+                demisto.error(f"Failed to retrieve the MITRE collection {collection.id} - {err}")
+                continue
 
-            # Retrieve content
-            for concept in filter_objs:
+            # For each item in the MITRE list, add an indicator to the indicators list
+            for mitre_item_json in mitre_data:
 
                 # Stop when we have reached the limit defined
                 if 0 < limit <= counter:
                     break
 
-                input_filter = filter_objs[concept]['filter']
+                value = None
+
+                # Try and map a friendly name to the value before the real ID
                 try:
-                    mitre_data = tc_source.query(input_filter)
+                    externals = [x['external_id'] for x in mitre_item_json.get('external_references', []) if
+                                 x['source_name'] == 'mitre-attack' and x['external_id']]
+                    value = externals[0]
                 except Exception:
-                    continue
-
-                # For each item in the MITRE list, add an indicator to the indicators list
-                for mitreItem in mitre_data:
-
-                    # Stop when we have reached the limit defined
-                    if 0 < limit <= counter:
-                        break
-
-                    mitre_item_json = json.loads(str(mitreItem))
                     value = None
+                if not value:
+                    value = mitre_item_json.get('x_mitre_old_attack_id', None)
+                if not value:
+                    value = mitre_item_json.get('id')
+
+                if mitre_item_json.get('id') not in mitre_id_list:
+
+                    # If the indicator already exists, then append the new data
+                    # to the existing indicator.
+                    if value in indicator_by_value:
+
+                        # Append data to the original item
+                        original_item = indicator_by_value[value]
+                        if original_item['rawJSON'].get('id', None):
+                            try:
+                                original_item['rawJSON']['id'] += f"\n{mitre_item_json.get('id', '')}"
+                            except Exception:
+                                pass
+                        if original_item['rawJSON'].get('created', None):
+                            try:
+                                original_item['rawJSON']['created'] += f"\n{mitre_item_json.get('created', '')}"
+                            except Exception:
+                                pass
+                        if original_item['rawJSON'].get('modified', None):
+                            try:
+                                original_item['rawJSON']['modified'] += f"\n{mitre_item_json.get('modified', '')}"
+                            except Exception:
+                                pass
+                        if original_item['rawJSON'].get('description', None):
+                            try:
+                                if not original_item['rawJSON'].get('description').startswith("###"):
+                                    original_item['rawJSON']['description'] = \
+                                        f"### {original_item['rawJSON'].get('type')}\n" \
+                                        f"{original_item['rawJSON']['description']}"
+                                original_item['rawJSON']['description'] += \
+                                    f"\n\n_____\n\n### {mitre_item_json.get('type')}\n" \
+                                    f"{mitre_item_json.get('description', '')}"
+                            except Exception:
+                                pass
+                        if original_item['rawJSON'].get('external_references', None):
+                            try:
+                                original_item['rawJSON']['external_references'].extend(
+                                    mitre_item_json.get('external_references', [])
+                                )
+                            except Exception:
+                                pass
+                        if original_item['rawJSON'].get('kill_chain_phases', None):
+                            try:
+                                original_item['rawJSON']['kill_chain_phases'].extend(
+                                    mitre_item_json.get('kill_chain_phases', [])
+                                )
+                            except Exception:
+                                pass
+                        if original_item['rawJSON'].get('aliases', None):
+                            try:
+                                original_item['rawJSON']['aliases'].extend(
+                                    mitre_item_json.get('aliases', [])
+                                )
+                            except Exception:
+                                pass
 
-                    # Try and map a friendly name to the value before the real ID
-                    try:
-                        externals = [x['external_id'] for x in mitre_item_json.get('external_references', []) if
-                                     x['source_name'] == 'mitre-attack' and x['external_id']]
-                        value = externals[0]
-                    except Exception:
-                        value = None
-                    if not value:
-                        value = mitre_item_json.get('x_mitre_old_attack_id', None)
-                    if not value:
-                        value = mitre_item_json.get('id')
-
-                    if mitre_item_json.get('id') not in mitre_id_list:
-
-                        # If the indicator already exists, then append the new data
-                        # to the existing indicator.
-                        if value in indicator_values_list:
-
-                            # Append data to the original item
-                            original_item = [x for x in indicators if x.get('value') == value][0]
-                            if original_item['rawJSON'].get('id', None):
-                                try:
-                                    original_item['rawJSON']['id'] += f"\n{mitre_item_json.get('id', '')}"
-                                except Exception:
-                                    pass
-                            if original_item['rawJSON'].get('created', None):
-                                try:
-                                    original_item['rawJSON']['created'] += f"\n{mitre_item_json.get('created', '')}"
-                                except Exception:
-                                    pass
-                            if original_item['rawJSON'].get('modified', None):
-                                try:
-                                    original_item['rawJSON']['modified'] += f"\n{mitre_item_json.get('modified', '')}"
-                                except Exception:
-                                    pass
-                            if original_item['rawJSON'].get('description', None):
-                                try:
-                                    if not original_item['rawJSON'].get('description').startswith("###"):
-                                        original_item['rawJSON']['description'] = \
-                                            f"### {original_item['rawJSON'].get('type')}\n" \
-                                            f"{original_item['rawJSON']['description']}"
-                                    original_item['rawJSON']['description'] += \
-                                        f"\n\n_____\n\n### {mitre_item_json.get('type')}\n" \
-                                        f"{mitre_item_json.get('description', '')}"
-                                except Exception:
-                                    pass
-                            if original_item['rawJSON'].get('external_references', None):
-                                try:
-                                    original_item['rawJSON']['external_references'].extend(
-                                        mitre_item_json.get('external_references', [])
-                                    )
-                                except Exception:
-                                    pass
-                            if original_item['rawJSON'].get('kill_chain_phases', None):
-                                try:
-                                    original_item['rawJSON']['kill_chain_phases'].extend(
-                                        mitre_item_json.get('kill_chain_phases', [])
-                                    )
-                                except Exception:
-                                    pass
-                            if original_item['rawJSON'].get('aliases', None):
-                                try:
-                                    original_item['rawJSON']['aliases'].extend(
-                                        mitre_item_json.get('aliases', [])
-                                    )
-                                except Exception:
-                                    pass
-
-                        else:
-                            indicator_obj = {
-                                "value": value,
-                                "score": self.reputation,
-                                "type": "MITRE ATT&CK",
-                                "rawJSON": mitre_item_json,
-                                "fields": {
-                                    "tags": self.tags,
-                                }
+                    else:
+                        indicator_obj = {
+                            "value": value,
+                            "score": self.reputation,
+                            "type": "MITRE ATT&CK",
+                            "rawJSON": mitre_item_json,
+                            "fields": {
+                                "tags": self.tags,
                             }
-
-                            if self.tlp_color:
-                                indicator_obj['fields']['trafficlightprotocol'] = self.tlp_color
-
-                            indicators.append(indicator_obj)
-                            indicator_values_list.add(value)
-                            counter += 1
-                        mitre_id_list.add(mitre_item_json.get('id'))
-
-                        # Create a duplicate indicator using the "external_id" from the
-                        # original indicator, if the user has selected "includeAPT" as True
-                        if self.include_apt:
-                            ext_refs = [x.get('external_id') for x in mitre_item_json.get('external_references')
-                                        if x.get('external_id') and x.get('source_name') != "mitre-attack"]
-                            for x in ext_refs:
-                                if x not in external_refs:
-                                    indicator_obj = {
-                                        "value": x,
-                                        "score": self.reputation,
-                                        "type": "MITRE ATT&CK",
-                                        "rawJSON": mitre_item_json,
-                                        "fields": {
-                                            "tags": self.tags,
-                                        }
+                        }
+
+                        if self.tlp_color:
+                            indicator_obj['fields']['trafficlightprotocol'] = self.tlp_color
+
+                        indicators.append(indicator_obj)
+                        indicator_by_value[value] = indicator_obj
+                        counter += 1
+                    mitre_id_list.add(mitre_item_json.get('id'))
+
+                    # Create a duplicate indicator using the "external_id" from the
+                    # original indicator, if the user has selected "includeAPT" as True
+                    if self.include_apt:
+                        ext_refs = [x.get('external_id') for x in mitre_item_json.get('external_references')
+                                    if x.get('external_id') and x.get('source_name') != "mitre-attack"]
+                        for x in ext_refs:
+                            if x not in external_refs:
+                                indicator_obj = {
+                                    "value": x,
+                                    "score": self.reputation,
+                                    "type": "MITRE ATT&CK",
+                                    "rawJSON": mitre_item_json,
+                                    "fields": {
+                                        "tags": self.tags,
                                     }
+                                }
 
-                                    if self.tlp_color:
-                                        indicator_obj['fields']['trafficlightprotocol'] = self.tlp_color
+                                if self.tlp_color:
+                                    indicator_obj['fields']['trafficlightprotocol'] = self.tlp_color
 
-                                    indicators.append(indicator_obj)
-                                    external_refs.add(x)
+                                indicators.append(indicator_obj)
+                                external_refs.add(x)
 
         # Finally, map all the fields from the indicator
         # rawjson to the fields in the indicator
@@ -277,6 +268,62 @@ class Client:
         return indicators
 
 
+def get_collection_version(collection_data: Collection) -> Optional[str]:
+    """Gets the version of the MITRE objects of a collection from its manifest.
+
+    Args:
+        collection_data (Collection): The TAXII2 collection.
+
+    Returns:
+        str. A hash of the latest modified time and the number of the objects, or None if it is not available.
+    """
+    try:
+        manifest = collection_data.get_manifest(type=MITRE_TYPES).get('objects', [])
+    except Exception as err:
+        demisto.debug(f"Could not get the manifest of the MITRE collection {collection_data.id} - {err}")
+        return None
+    modified = max((version for entry in manifest for version in entry.get('versions', [])), default='')
+    return hashlib.sha256(f'{modified}:{len(manifest)}'.encode('utf-8')).hexdigest()
+
+
+def get_collection_objects(collection_data: Collection) -> List[Dict]:
+    """Retrieves the MITRE objects of a collection in a single request, and caches them by the collection version.
+
+    Args:
+        collection_data (Collection): The TAXII2 collection.
+
+    Returns:
+        list. The MITRE objects, ordered by their type as in MITRE_TYPES.
+    """
+    version = get_collection_version(collection_data)
+    cache_prefix = f'{collection_data.id}_'
+    cache_path = os.path.join(CACHE_DIR, f'{cache_prefix}{version}')
+    if version and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                return json.load(f)
+        except Exception as err:
+            demisto.debug(f"Could not load the cached MITRE collection {collection_data.id} - {err}")
+
+    bundle = collection_data.get_objects(type=MITRE_TYPES)
+    objects = [item for item in bundle.get('objects', []) if item.get('type') in MITRE_TYPES]
+    objects.sort(key=lambda item: MITRE_TYPES.index(item['type']))
+
+    if version:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            for file_name in os.listdir(CACHE_DIR):
+                if file_name.startswith(cache_prefix):
+                    os.remove(os.path.join(CACHE_DIR, file_name))
+            temp_path = os.path.join(CACHE_DIR, f'{uuid.uuid4()}.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump(objects, f)
+            os.replace(temp_path, cache_path)
+        except Exception as err:
+            demisto.debug(f"Could not cache the MITRE collection {collection_data.id} - {err}")
+    return objects
+
+
 def handle_multiple_dates_in_one_field(field_name: str, field_value: str):
     """Parses datetime fields to handle one value or more
 
@@ -347,52 +394,58 @@ def show_feeds_command(client, args):
     })
 
 
+def iter_mitre_indicators(client, query):
+    """Yields the MITRE indicators which match the query, one page at a time.
+
+    Args:
+        client (Client): The MITRE client.
+        query (str): The indicators query, in addition to the MITRE indicator type.
+
+    Returns:
+        generator. The indicators.
+    """
+    page = 0
+    size = 1000
+    query = f'type:"{client.indicatorType}" {query}'.strip()
+    raw_data = demisto.searchIndicators(query=query, page=page, size=size)
+    while len(raw_data.get('iocs', [])) > 0:
+        yield from raw_data.get('iocs', [])
+        page += 1
+        raw_data = demisto.searchIndicators(query=query, page=page, size=size)
+
+
 def search_command(client, args):
     search = args.get('search')
     demisto_urls = demisto.demistoUrls()
     indicator_url = demisto_urls.get('server') + "/#/indicator/"
     sensitive = True if args.get('casesensitive') == 'True' else False
-    return_list_md: List[Dict] = list()
-    entries = list()
-    all_indicators: List[Dict] = list()
-    page = 0
-    size = 1000
-    raw_data = demisto.searchIndicators(query=f'type:"{client.indicatorType}"', page=page, size=size)
-    while len(raw_data.get('iocs', [])) > 0:
-        all_indicators.extend(raw_data.get('iocs', []))
-        page += 1
-        raw_data = demisto.searchIndicators(query=f'type:"{client.indicatorType}"', page=page, size=size)
+    if not sensitive:
+        search = search.lower()
 
-    for indicator in all_indicators:
+    # The indicators which match the search, by their MITRE name
+    matches_by_name: Dict[str, Dict] = dict()
+    for indicator in iter_mitre_indicators(client, ''):
         custom_fields = indicator.get('CustomFields', {})
+        mitre_name = custom_fields.get('mitrename')
+        if mitre_name in matches_by_name:
+            continue
         for v in custom_fields.values():
-            if type(v) != str:
+            if not isinstance(v, str):
                 continue
-            if sensitive:
-                if search in v and custom_fields.get('mitrename') not in [x.get('mitrename') for x in return_list_md]:
-                    return_list_md.append({
-                        'mitrename': custom_fields.get('mitrename'),
-                        'Name': f"[{custom_fields.get('mitrename', '')}]({urljoin(indicator_url, indicator.get('id'))})",
-                    })
-                    entries.append({
-                        "id": f"{indicator.get('id')}",
-                        "value": f"{indicator.get('value')}"
-                    })
-                    break
-            else:
-                if search.lower() in v.lower() \
-                        and custom_fields.get('mitrename') not in [x.get('mitrename') for x in return_list_md]:
-                    return_list_md.append({
-                        'mitrename': custom_fields.get('mitrename'),
-                        'Name': f"[{custom_fields.get('mitrename', '')}]({urljoin(indicator_url, indicator.get('id'))})",
-                    })
-                    entries.append({
-                        "id": f"{indicator.get('id')}",
-                        "value": f"{indicator.get('value')}"
-                    })
-                    break
-    return_list_md = sorted(return_list_md, key=lambda name: name['mitrename'])
-    return_list_md = [{"Name": x.get('Name')} for x in return_list_md]
+            if search in (v if sensitive else v.lower()):
+                matches_by_name[mitre_name] = indicator
+                break
+
+    return_list_md = list()
+    entries = list()
+    for mitre_name, indicator in sorted(matches_by_name.items(), key=lambda item: item[0]):
+        return_list_md.append({
+            "Name": f"[{mitre_name or ''}]({urljoin(indicator_url, indicator.get('id'))})",
+        })
+        entries.append({
+            "id": f"{indicator.get('id')}",
+            "value": f"{indicator.get('value')}"
+        })
 
     md = tableToMarkdown('MITRE Indicator search:', return_list_md)
     ec = {'indicators(val.id && val.id == obj.id)': entries}
@@ -403,20 +456,12 @@ def reputation_command(client, args):
     input_indicator = args.get('indicator')
     demisto_urls = demisto.demistoUrls()
     indicator_url = demisto_urls.get('server') + "/#/indicator/"
-    all_indicators: List[Dict] = list()
-    page = 0
-    size = 1000
-    raw_data: dict = demisto.searchIndicators(query=f'type:"{client.indicatorType}" value:{input_indicator}',
-                                              page=page, size=size)
-    if raw_data.get('total') == 0:
+    all_indicators: List[Dict] = list(iter_mitre_indicators(client, f'value:{input_indicator}'))
+    if not all_indicators:
         md = 'No indicators found.'
         ec = {}
+        raw_data: dict = {'total': 0}
     else:
-        while len(raw_data.get('iocs', [])) > 0:
-            all_indicators.extend(raw_data.get('iocs', []))
-            page += 1
-            raw_data = demisto.searchIndicators(query=f'type:"{client.indicatorType}" value:{input_indicator}',
-                                                page=page, size=size)
         for indicator in all_indicators:
             custom_fields = indicator.get('CustomFields', {})
 
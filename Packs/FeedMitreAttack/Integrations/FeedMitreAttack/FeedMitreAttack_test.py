@@ -11,3 +11,82 @@ from FeedMitreAttack import handle_multiple_dates_in_one_field
 ])
 def test_handle_multiple_dates_in_one_field(field_name, field_value, expected_result):
     assert handle_multiple_dates_in_one_field(field_name, field_value) == expected_result
+
+
+MITRE_OBJECTS = [
+    {'type': 'tool', 'id': 'tool--1', 'name': 'Tool', 'created': '2017-05-31T21:31:43.540Z',
+     'modified': '2020-03-16T15:38:37.650Z', 'external_references': [{'source_name': 'mitre-attack', 'external_id': 'S0001'}]},
+    {'type': 'relationship', 'id': 'relationship--1'},
+    {'type': 'attack-pattern', 'id': 'attack-pattern--1', 'name': 'Technique', 'created': '2017-05-31T21:31:43.540Z',
+     'modified': '2019-04-25T20:53:07.719Z', 'external_references': [{'source_name': 'mitre-attack', 'external_id': 'T0001'}]},
+    {'type': 'malware', 'id': 'malware--1', 'name': 'Malware', 'created': '2017-05-31T21:31:43.540Z',
+     'modified': '2019-04-25T20:53:07.814Z', 'external_references': [{'source_name': 'mitre-attack', 'external_id': 'S0001'}]},
+]
+
+
+class MockCollection:
+    def __init__(self, url, **kwargs):
+        self.id = 'collection--1'
+        self.get_objects_calls = 0
+
+    def get_manifest(self, type):
+        return {'objects': [{'id': obj['id'], 'versions': [obj.get('modified', '')]} for obj in MITRE_OBJECTS
+                            if obj['type'] in type]}
+
+    def get_objects(self, type):
+        MockCollection.get_objects_calls += 1
+        return {'type': 'bundle', 'objects': [dict(obj) for obj in MITRE_OBJECTS]}
+
+
+def test_build_iterator(mocker, tmp_path):
+    """
+    Given:
+        - A collection with MITRE objects of several types, two of which share a MITRE ID.
+    When:
+        - Building the indicators twice.
+    Then:
+        - The objects are retrieved once and cached, the indicators are ordered by type, and the indicators which share
+          a value are merged.
+    """
+    from FeedMitreAttack import Client
+    mocker.patch('FeedMitreAttack.CACHE_DIR', str(tmp_path))
+    mocker.patch('FeedMitreAttack.Collection', MockCollection)
+    MockCollection.get_objects_calls = 0
+    client = Client('https://cti-taxii.mitre.org', None, False, False, 'Good', tags=['tag'])
+    client.collections = [MockCollection('')]
+
+    for _ in range(2):
+        indicators = client.build_iterator()
+        assert [indicator['value'] for indicator in indicators] == ['T0001', 'S0001']
+        assert indicators[1]['fields']['mitreid'] == 'malware--1\ntool--1'
+        assert indicators[1]['fields']['mitremodified'] == '2020-03-16T15:38:37.650Z'
+    assert MockCollection.get_objects_calls == 1
+
+
+def test_search_command(mocker):
+    """
+    Given:
+        - Indicators, two of which share a MITRE name.
+    When:
+        - Searching the indicators.
+    Then:
+        - Each MITRE name which matches the search is returned once, sorted by name.
+    """
+    import demistomock as demisto
+    from FeedMitreAttack import Client, search_command
+    iocs = [
+        {'id': '1', 'value': 'T0002', 'CustomFields': {'mitrename': 'Phishing', 'mitredescription': 'Spearphishing'}},
+        {'id': '2', 'value': 'T0001', 'CustomFields': {'mitrename': 'Exploit', 'mitredescription': 'Phishing exploit'}},
+        {'id': '3', 'value': 'T0003', 'CustomFields': {'mitrename': 'Phishing', 'mitredescription': 'Phishing'}},
+        {'id': '4', 'value': 'T0004', 'CustomFields': {'mitrename': 'Other', 'mitreversion': 1}},
+    ]
+    mocker.patch.object(demisto, 'demistoUrls', return_value={'server': 'https://server'})
+    mocker.patch.object(demisto, 'searchIndicators',
+                        side_effect=lambda query, page, size: {'iocs': iocs if page == 0 else []})
+    return_outputs = mocker.patch('FeedMitreAttack.return_outputs')
+    client = Client('https://cti-taxii.mitre.org', None, False, False, 'Good')
+
+    search_command(client, {'search': 'phishing'})
+    md, ec, raw = return_outputs.call_args[0]
+    assert ec == {'indicators(val.id && val.id == obj.id)': [{'id': '2', 'value': 'T0001'}, {'id': '1', 'value': 'T0002'}]}
+    assert raw == [{'Name': '[Exploit](https://server/#/indicator/2)'}, {'Name': '[Phishing](https://server/#/indicator/1)'}]
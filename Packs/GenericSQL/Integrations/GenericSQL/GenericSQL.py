@@ -2,12 +2,13 @@ import demistomock as demisto
 from CommonServerPython import *
 from CommonServerUserPython import *
 
-from typing import Any, Tuple, Dict, List, Callable, Optional
+from typing import Any, Tuple, Dict, List, Callable, Optional, Iterator
 import sqlalchemy
 import pymysql
 import traceback
 import hashlib
 import logging
+import csv
 from sqlalchemy.sql import text
 from sqlalchemy.engine.url import URL
 from urllib.parse import parse_qsl
@@ -23,6 +24,10 @@ pymysql.install_as_MySQLdb()
 
 GLOBAL_CACHE_ATTR = '_generic_sql_engine_cache'
 DEFAULT_POOL_TTL = 600
+# the number of rows fetched from the cursor at once
+FETCH_BATCH_SIZE = 1000
+DEFAULT_FETCH_LIMIT = 50
+MSSQL_DIALECTS = {'Microsoft SQL Server', 'Microsoft SQL Server - MS ODBC Driver'}
 
 
 class Client:
@@ -130,23 +135,114 @@ class Client:
                                               poolclass=sqlalchemy.pool.NullPool)
         return engine.connect()
 
-    def sql_query_execute_request(self, sql_query: str, bind_vars: Any) -> Tuple[Dict, List]:
+    def get_paginated_query(self, sql_query: str, skip: int, limit: int) -> Optional[str]:
+        """
+        Wraps a select query with the pagination clause of the dialect, so only the requested rows are returned
+        :param sql_query: the SQL query
+        :param skip: the number of rows to skip
+        :param limit: the max number of rows to return
+        :return: the paginated query, or None if the query is not a single select query
+        """
+        sql_query = sql_query.strip().rstrip(';').strip()
+        if not sql_query.lower().startswith('select') or ';' in sql_query:
+            return None
+        if self.dialect in MSSQL_DIALECTS:
+            if not skip:
+                return f'SELECT TOP {limit} * FROM ({sql_query}) paged_query'
+            return f'SELECT * FROM ({sql_query}) paged_query ORDER BY (SELECT NULL) ' \
+                   f'OFFSET {skip} ROWS FETCH NEXT {limit} ROWS ONLY'
+        if self.dialect == 'Oracle':
+            if not skip:
+                return f'SELECT * FROM ({sql_query}) WHERE ROWNUM <= {limit}'
+            return f'SELECT * FROM ({sql_query}) OFFSET {skip} ROWS FETCH NEXT {limit} ROWS ONLY'
+        return f'SELECT * FROM ({sql_query}) paged_query LIMIT {limit} OFFSET {skip}'
+
+    def get_limited_query(self, sql_query: str, limit: int) -> str:
+        """
+        Adds the limit clause of the dialect to a select query which ends with an order by clause
+        :param sql_query: the SQL query
+        :param limit: the max number of rows to return
+        :return: the limited query
+        """
+        if self.dialect in MSSQL_DIALECTS:
+            return re.sub(r'^\s*select\b', f'SELECT TOP {limit}', sql_query, count=1, flags=re.IGNORECASE)
+        if self.dialect == 'Oracle':
+            return f'{sql_query} FETCH FIRST {limit} ROWS ONLY'
+        return f'{sql_query} LIMIT {limit}'
+
+    def _execute(self, sql_query: str, bind_vars: Any) -> sqlalchemy.engine.ResultProxy:
+        if type(bind_vars) is dict:
+            return self.connection.execute(text(sql_query), bind_vars)
+        return self.connection.execute(sql_query, bind_vars)
+
+    def sql_query_execute_request(self, sql_query: str, bind_vars: Any, skip: int = 0,
+                                  limit: Optional[int] = None) -> Tuple[List, List]:
         """Execute query in DB via engine
         :param bind_vars: in case there are names and values - a bind_var dict, in case there are only values - list
         :param sql_query: the SQL query
+        :param skip: the number of rows to skip
+        :param limit: the max number of rows to return, all of the rows if None
         :return: results of query, table headers
         """
-        if type(bind_vars) is dict:
-            sql_query = text(sql_query)
-
-        result = self.connection.execute(sql_query, bind_vars)
-        results = result.fetchall()
-        headers = []
-        if results:
-            # if the table isn't empty
-            headers = results[0].keys()
+        result = None
+        paginated_query = self.get_paginated_query(sql_query, skip, limit) if limit is not None else None
+        if paginated_query:
+            try:
+                result = self._execute(paginated_query, bind_vars)
+                skip = 0
+            except sqlalchemy.exc.DBAPIError as err:
+                # e.g. a query the dialect doesn't support as a sub query, so the rows are skipped in the cursor
+                demisto.debug(f'Failed executing the paginated query, executing the original query: {str(err)}')
+        if result is None:
+            result = self._execute(sql_query, bind_vars)
+        headers = list(result.keys())
+        results = fetch_rows(result, skip, limit)
         return results, headers
 
+    def sql_query_iterate_request(self, sql_query: str, bind_vars: Any) -> Tuple[List, Iterator[List]]:
+        """Execute query in DB via engine, and fetch its results in batches
+        :param bind_vars: in case there are names and values - a bind_var dict, in case there are only values - list
+        :param sql_query: the SQL query
+        :return: table headers, a generator of the batches of the results
+        """
+        result = self._execute(sql_query, bind_vars)
+
+        def iterate_batches():
+            try:
+                batch = result.fetchmany(FETCH_BATCH_SIZE)
+                while batch:
+                    yield batch
+                    batch = result.fetchmany(FETCH_BATCH_SIZE)
+            finally:
+                result.close()
+
+        return list(result.keys()), iterate_batches()
+
+
+def fetch_rows(result: sqlalchemy.engine.ResultProxy, skip: int, limit: Optional[int]) -> List:
+    """
+    Fetches the requested rows from the cursor in batches, without reading the rest of the results
+    :param result: the result of the query
+    :param skip: the number of rows to skip
+    :param limit: the max number of rows to return, all of the rows if None
+    :return: the rows
+    """
+    try:
+        while skip > 0:
+            batch = result.fetchmany(min(skip, FETCH_BATCH_SIZE))
+            if not batch:
+                return []
+            skip -= len(batch)
+        rows: List = []
+        while limit is None or len(rows) < limit:
+            batch = result.fetchmany(FETCH_BATCH_SIZE if limit is None else min(limit - len(rows), FETCH_BATCH_SIZE))
+            if not batch:
+                break
+            rows.extend(batch)
+        return rows
+    finally:
+        result.close()
+
 
 def generate_default_port_by_dialect(dialect: str) -> Optional[str]:
     """
@@ -204,12 +300,11 @@ def sql_query_execute(client: Client, args: dict, *_) -> Tuple[str, Dict[str, An
         bind_variables_values = args.get('bind_variables_values', "")
         bind_variables = generate_bind_vars(bind_variables_names, bind_variables_values)
 
-        result, headers = client.sql_query_execute_request(sql_query, bind_variables)
+        result, headers = client.sql_query_execute_request(sql_query, bind_variables, skip, limit)
         # converting an sqlalchemy object to a table
         converted_table = [dict(row) for row in result]
         # converting b'' and datetime objects to readable ones
         table = [{str(key): str(value) for key, value in dictionary.items()} for dictionary in converted_table]
-        table = table[skip:skip + limit]
         human_readable = tableToMarkdown(name="Query result:", t=table, headers=headers,
                                          removeNull=True)
         context = {
@@ -229,6 +324,102 @@ def sql_query_execute(client: Client, args: dict, *_) -> Tuple[str, Dict[str, An
         raise err
 
 
+def sql_query_export(client: Client, args: dict) -> Dict[str, Any]:
+    """
+    Executes the sql query and writes all of its results to a CSV file, streaming them from the cursor in batches
+    :param client: the client object with the db connection
+    :param args: demisto.args() including the sql query
+    :return: a file entry
+    """
+    sql_query = str(args.get('query'))
+    bind_variables = generate_bind_vars(args.get('bind_variables_names', ""), args.get('bind_variables_values', ""))
+    headers, batches = client.sql_query_iterate_request(sql_query, bind_variables)
+    file_id = demisto.uniqueFile()
+    rows_count = 0
+    with open(demisto.investigation()['id'] + '_' + file_id, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for batch in batches:
+            # converting b'' and datetime objects to readable ones
+            writer.writerows([str(value) for value in row] for row in batch)
+            rows_count += len(batch)
+    demisto.debug(f'Exported {rows_count} rows of the query: {sql_query}')
+    return {'Contents': '', 'ContentsFormat': formats['text'], 'Type': entryTypes['file'],
+            'File': f'{client.dialect}_{client.dbname}_query_result.csv', 'FileID': file_id}
+
+
+def to_last_run_value(value: Any) -> Any:
+    return value if isinstance(value, (int, float, str)) else str(value)
+
+
+def hash_row(row: dict) -> str:
+    return hashlib.sha256(json.dumps({str(k): str(v) for k, v in row.items()}, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def fetch_incidents(client: Client, params: dict, last_run: dict) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Fetches the new rows of the fetch query as incidents, using a keyset cursor on the fetch column, so each fetch
+    reads only the rows which were added since the previous one.
+    The rows with the same value in the fetch column are ordered by the fetch ID column. Without a fetch ID column,
+    the hashes of the fetched rows with the last value are kept, and they are skipped in the next fetch.
+    :param client: the client object with the db connection
+    :param params: demisto.params() including the fetch query and columns
+    :param last_run: the last run of the previous fetch
+    :return: the incidents, and the next last run
+    """
+    fetch_query = str(params.get('fetch_query')).strip().rstrip(';')
+    fetch_column = params.get('fetch_column')
+    id_column = params.get('fetch_id_column')
+    name_column = params.get('incident_name_column')
+    limit = int(params.get('fetch_limit') or DEFAULT_FETCH_LIMIT)
+    if not fetch_query or not fetch_column:
+        raise ValueError('The fetch query and the fetch column are required in order to fetch incidents')
+
+    last_value = last_run.get('last_value', params.get('fetch_first_value') or None)
+    last_id = last_run.get('last_id')
+    last_hashes = set(last_run.get('last_hashes', []))
+    bind_vars: Dict[str, Any] = {}
+    sql_query = f'SELECT * FROM ({fetch_query}) fetch_query'
+    if last_value is not None:
+        bind_vars['last_value'] = last_value
+        if id_column and last_id is not None:
+            bind_vars['last_id'] = last_id
+            sql_query += f' WHERE {fetch_column} > :last_value OR ({fetch_column} = :last_value AND {id_column} > :last_id)'
+        else:
+            sql_query += f' WHERE {fetch_column} >= :last_value'
+    sql_query += f' ORDER BY {fetch_column}, {id_column}' if id_column else f' ORDER BY {fetch_column}'
+    # the rows of the last value which were already fetched are returned again without a fetch ID column
+    sql_query = client.get_limited_query(sql_query, limit + len(last_hashes))
+    rows = fetch_rows(client._execute(sql_query, bind_vars), 0, None)
+
+    incidents = []
+    next_run = dict(last_run)
+    for row in rows:
+        row = dict(row)
+        value = to_last_run_value(row.get(fetch_column))
+        row_hash = hash_row(row)
+        if not id_column and value == last_value and row_hash in last_hashes:
+            continue
+        if len(incidents) == limit:
+            break
+        if value != next_run.get('last_value'):
+            last_hashes = set()
+        next_run['last_value'] = value
+        if id_column:
+            next_run['last_id'] = to_last_run_value(row.get(id_column))
+        else:
+            last_hashes.add(row_hash)
+        occurred = row.get(fetch_column)
+        incidents.append({
+            'name': str(row.get(name_column) if name_column else f'Generic SQL {fetch_column} {value}'),
+            'occurred': occurred.isoformat() if isinstance(occurred, datetime) else None,
+            'rawJSON': json.dumps({str(k): str(v) for k, v in row.items()}),
+        })
+    if not id_column:
+        next_run['last_hashes'] = list(last_hashes)
+    return incidents, next_run
+
+
 # list of loggers we should set to debug when running in debug_mode
 # taken from: https://docs.sqlalchemy.org/en/13/core/engines.html#configuring-logging
 SQL_LOGGERS = [
@@ -277,7 +468,13 @@ def main():
             'pgsql-query': sql_query_execute,
             'sql-command': sql_query_execute
         }
-        if command in commands:
+        if command == 'fetch-incidents':
+            incidents, next_run = fetch_incidents(client, params, demisto.getLastRun())
+            demisto.setLastRun(next_run)
+            demisto.incidents(incidents)
+        elif command == 'sql-command' and argToBoolean(demisto.args().get('export_to_file', 'false')):
+            demisto.results(sql_query_export(client, demisto.args()))
+        elif command in commands:
             return_outputs(*commands[command](client, demisto.args(), command))
         else:
             raise NotImplementedError(f'{command} is not an existing Generic SQL command')
@@ -3,7 +3,10 @@ import os
 import pytest
 import sqlalchemy
 
-from GenericSQL import Client, sql_query_execute, generate_default_port_by_dialect
+import json
+
+from GenericSQL import Client, sql_query_execute, sql_query_export, generate_default_port_by_dialect, fetch_incidents
+import demistomock as demisto
 
 
 class ResultMock:
@@ -13,6 +16,15 @@ class ResultMock:
     def fetchall(self):
         return []
 
+    def fetchmany(self, size):
+        return []
+
+    def keys(self):
+        return []
+
+    def close(self):
+        pass
+
 
 ARGS1 = {
     'query': "select Name from city",
@@ -250,3 +262,137 @@ def test_mysql_integration():
      {'arg1': 'value1', 'arg2': 'value2', 'driver': 'ODBC Driver 17 for SQL Server'})])
 def test_parse_connect_parameters(connect_parameters, dialect, expected_response):
     assert Client.parse_connect_parameters(connect_parameters, dialect) == expected_response
+
+
+@pytest.fixture
+def sqlite_client(tmp_path):
+    """
+    A client of a local SQLite database, with a table of 100 alerts.
+    """
+    client = Client('sqlite', '', '', '', None, str(tmp_path / 'test.db'), '', False)
+    client.connection.execute('CREATE TABLE alerts (id INTEGER PRIMARY KEY, name TEXT)')
+    client.connection.execute('INSERT INTO alerts (id, name) VALUES (?, ?)', [(i, f'alert {i}') for i in range(100)])
+    yield client
+    client.connection.close()
+
+
+@pytest.mark.parametrize('dialect, skip, expected_query', [
+    ('MySQL', 10, 'SELECT * FROM (select * from alerts) paged_query LIMIT 5 OFFSET 10'),
+    ('Microsoft SQL Server', 0, 'SELECT TOP 5 * FROM (select * from alerts) paged_query'),
+    ('Microsoft SQL Server - MS ODBC Driver', 10, 'SELECT * FROM (select * from alerts) paged_query '
+                                                  'ORDER BY (SELECT NULL) OFFSET 10 ROWS FETCH NEXT 5 ROWS ONLY'),
+    ('Oracle', 0, 'SELECT * FROM (select * from alerts) WHERE ROWNUM <= 5'),
+    ('Oracle', 10, 'SELECT * FROM (select * from alerts) OFFSET 10 ROWS FETCH NEXT 5 ROWS ONLY'),
+])
+def test_get_paginated_query(mocker, dialect, skip, expected_query):
+    mocker.patch.object(Client, '_create_engine_and_connect')
+    client = Client(dialect, 'server_url', 'username', 'password', 'port', 'database', "", False)
+    assert client.get_paginated_query('select * from alerts; ', skip, 5) == expected_query
+    assert client.get_paginated_query('delete from alerts', skip, 5) is None
+    assert client.get_paginated_query('select 1; select 2', skip, 5) is None
+
+
+def test_sql_query_execute_paginated(mocker, sqlite_client):
+    """
+    Given
+    - a select query, with limit and skip
+    When
+    - executing the query on the database
+    Then
+    - the limit and skip are applied by the database, and only the requested rows are returned
+    """
+    execute = mocker.spy(sqlite_client.connection, 'execute')
+    args = {'query': 'select * from alerts where id >= :min_id order by id', 'limit': 5, 'skip': 10,
+            'bind_variables_names': 'min_id', 'bind_variables_values': '1'}
+    _, _, table = sql_query_execute(sqlite_client, args)
+    assert table == [{'id': str(i), 'name': f'alert {i}'} for i in range(11, 16)]
+    assert 'LIMIT 5 OFFSET 10' in str(execute.call_args[0][0])
+
+
+def test_sql_query_execute_not_paginated(mocker, sqlite_client):
+    """
+    Given
+    - a query the database fails to run with the pagination clause
+    When
+    - executing the query on the database
+    Then
+    - the original query is executed, and only the requested rows are fetched from the cursor
+    """
+    mocker.patch.object(Client, 'get_paginated_query', return_value='select * from no_such_table')
+    mocker.patch('GenericSQL.FETCH_BATCH_SIZE', 3)
+    _, _, table = sql_query_execute(sqlite_client, {'query': 'select * from alerts order by id', 'limit': 4,
+                                                    'skip': 95})
+    assert table == [{'id': str(i), 'name': f'alert {i}'} for i in range(95, 99)]
+    assert sql_query_execute(sqlite_client, {'query': 'delete from alerts where id = 1'})[0] == 'Command executed'
+
+
+def test_sql_query_export(mocker, tmp_path, sqlite_client):
+    """
+    Given
+    - a query with more results than the fetch batch size
+    When
+    - exporting the results of the query
+    Then
+    - all of the results are written to the CSV file
+    """
+    mocker.patch('GenericSQL.FETCH_BATCH_SIZE', 7)
+    mocker.patch.object(demisto, 'uniqueFile', return_value='file_id')
+    mocker.patch.object(demisto, 'investigation', return_value={'id': str(tmp_path / 'inv')})
+    entry = sql_query_export(sqlite_client, {'query': 'select * from alerts order by id'})
+    assert entry['FileID'] == 'file_id'
+    with open(str(tmp_path / 'inv_file_id')) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == 'id,name'
+    assert lines[1:] == [f'{i},alert {i}' for i in range(100)]
+
+
+def fetch_all_incidents(client, params, last_run=None):
+    last_run = last_run or {}
+    fetched_ids = []
+    incidents, last_run = fetch_incidents(client, params, last_run)
+    while incidents:
+        assert len(incidents) <= int(params['fetch_limit'])
+        fetched_ids += [json.loads(incident['rawJSON'])['id'] for incident in incidents]
+        incidents, last_run = fetch_incidents(client, params, last_run)
+    return fetched_ids, last_run
+
+
+@pytest.mark.parametrize('fetch_id_column', ['id', None])
+def test_fetch_incidents(sqlite_client, fetch_id_column):
+    """
+    Given
+    - a table whose fetch column has duplicate values, more than the fetch limit
+    When
+    - fetching incidents until there are no new rows, and then again after new rows are added
+    Then
+    - each row is fetched exactly once, in the order of the fetch column
+    """
+    sqlite_client.connection.execute('ALTER TABLE alerts ADD COLUMN created INTEGER')
+    sqlite_client.connection.execute('UPDATE alerts SET created = id / 3')
+    params = {'fetch_query': 'select * from alerts', 'fetch_column': 'created', 'fetch_id_column': fetch_id_column,
+              'incident_name_column': 'name', 'fetch_limit': '2'}
+
+    fetched_ids, last_run = fetch_all_incidents(sqlite_client, params)
+    assert fetched_ids == [str(i) for i in range(100)]
+    assert last_run['last_value'] == 33
+
+    sqlite_client.connection.execute('INSERT INTO alerts (id, name, created) VALUES (?, ?, ?)',
+                                     [(i, f'alert {i}', i // 3) for i in range(100, 105)])
+    fetched_ids, _ = fetch_all_incidents(sqlite_client, params, last_run)
+    assert fetched_ids == [str(i) for i in range(100, 105)]
+
+
+def test_fetch_incidents_first_value(sqlite_client):
+    """
+    Given
+    - a first value of the fetch column
+    When
+    - fetching incidents for the first time
+    Then
+    - only the rows after the first value are fetched, and the incidents are named by the incident name column
+    """
+    params = {'fetch_query': 'select * from alerts', 'fetch_column': 'id', 'fetch_first_value': '96',
+              'incident_name_column': 'name', 'fetch_limit': '50'}
+    incidents, last_run = fetch_incidents(sqlite_client, params, {})
+    assert [incident['name'] for incident in incidents] == ['alert 96', 'alert 97', 'alert 98', 'alert 99']
+    assert last_run['last_value'] == 99
@@ -3,7 +3,10 @@ from CommonServerPython import *  # noqa: E402 lgtm [py/polluting-import]
 from CommonServerUserPython import *  # noqa: E402 lgtm [py/polluting-import]
 
 # IMPORTS
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Dict, List, Callable, Iterable
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import traceback
 import dateparser
 import httplib2
@@ -24,6 +27,19 @@ SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
 ISO_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
 LAST_RUN_TIME_KEY = "fetch_time"
 LAST_RUN_FETCHED_KEY = "fetched_ids"
+# The maximum number of messages returned by a single pull request
+PULL_MAX_MSGS = 1000
+# The maximum number of ack ids sent in a single acknowledge request
+ACK_BATCH_SIZE = 1000
+DEFAULT_PULL_WORKERS = 4
+DEFAULT_MAX_FETCH_DURATION = 30
+# The fetched message ids are kept for this many minutes of publish time, to drop redelivered messages
+FETCHED_IDS_WINDOW_MINUTES = 10
+FETCHED_IDS_MAX_SIZE = 20000
+# The maximum number of projects listed in parallel
+MAX_PROJECT_WORKERS = 10
+# The built services and their http clients are shared across commands
+GOOGLE_SESSIONS_CACHE = "google_sessions"
 
 """ HELPER CLASSES """
 
@@ -67,6 +83,66 @@ class GoogleNameParser:
         ) + GoogleNameParser.FULL_SNAPSHOT_PREFIX.format(snapshot_id)
 
 
+class FetchedMessageIds:
+    """
+    The ids of the fetched messages, by the minute of their publish time.
+    Only the ids published up to FETCHED_IDS_WINDOW_MINUTES before the latest one are kept in the last run.
+    """
+
+    MINUTE_FORMAT = "%Y-%m-%dT%H:%M"
+    MINUTE_LENGTH = len("YYYY-MM-DDThh:mm")
+
+    def __init__(self, ids_by_minute: Optional[Dict[str, List[str]]] = None):
+        self.ids_by_minute = {
+            minute: set(ids) for minute, ids in (ids_by_minute or {}).items()
+        }
+        self._ids = set().union(*self.ids_by_minute.values())
+
+    @classmethod
+    def from_last_run(cls, fetched_ids, last_run_time):
+        """
+        Creates the fetched ids from the last run value
+        :param fetched_ids: The fetched ids by minute, or a list of the ids fetched in the last run
+        :param last_run_time: The last run time
+        :return: The fetched ids
+        """
+        if isinstance(fetched_ids, list):
+            return cls({last_run_time[: cls.MINUTE_LENGTH]: fetched_ids})
+        return cls(fetched_ids)
+
+    def __contains__(self, msg_id):
+        return msg_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, msg_id, publish_time):
+        minute = publish_time[: self.MINUTE_LENGTH]
+        self.ids_by_minute.setdefault(minute, set()).add(msg_id)
+        self._ids.add(msg_id)
+
+    def to_last_run(self):
+        """
+        Returns the ids in the time window by minute, without the oldest minutes if there are too many ids
+        """
+        minutes = sorted((minute for minute in self.ids_by_minute if minute), reverse=True)
+        if not minutes:
+            return {}
+        window_start = (
+            datetime.strptime(minutes[0], self.MINUTE_FORMAT)
+            - timedelta(minutes=FETCHED_IDS_WINDOW_MINUTES)
+        ).strftime(self.MINUTE_FORMAT)
+        last_run_ids: Dict[str, List[str]] = {}
+        size = 0
+        for minute in minutes:
+            ids = self.ids_by_minute[minute]
+            if minute < window_start or (last_run_ids and size + len(ids) > FETCHED_IDS_MAX_SIZE):
+                break
+            last_run_ids[minute] = sorted(ids)
+            size += len(ids)
+        return last_run_ids
+
+
 # disable-secrets-detection-start
 class BaseGoogleClient:
     """
@@ -93,20 +169,32 @@ class BaseGoogleClient:
         :param insecure: Insecure flag
         :param kwargs: Potential arguments dict
         """
-        credentials = service_account.ServiceAccountCredentials.from_json_keyfile_dict(
-            client_secret, scopes=scopes
-        )
-        if proxy or insecure:
-            http_client = credentials.authorize(
-                self.get_http_client_with_proxy(proxy, insecure)
-            )
-            self.service = discovery.build(
-                service_name, service_version, http=http_client
-            )
-        else:
-            self.service = discovery.build(
-                service_name, service_version, credentials=credentials
+        self.proxy = proxy
+        self.insecure = insecure
+        sessions = get_process_cache(GOOGLE_SESSIONS_CACHE)
+        session_key = hashlib.sha256(
+            json.dumps(
+                [service_name, service_version, client_secret, scopes, proxy, insecure],
+                sort_keys=True,
+            ).encode("utf-8")
+        ).hexdigest()
+        if session_key not in sessions:
+            credentials = service_account.ServiceAccountCredentials.from_json_keyfile_dict(
+                client_secret, scopes=scopes
             )
+            if proxy or insecure:
+                http_client = credentials.authorize(
+                    self.get_http_client_with_proxy(proxy, insecure)
+                )
+                service = discovery.build(
+                    service_name, service_version, http=http_client
+                )
+            else:
+                service = discovery.build(
+                    service_name, service_version, credentials=credentials
+                )
+            sessions[session_key] = (credentials, service, threading.local())
+        self.credentials, self.service, self._thread_local = sessions[session_key]
 
     @staticmethod
     def get_http_client_with_proxy(proxy, insecure):
@@ -140,6 +228,46 @@ class BaseGoogleClient:
                 )
         return httplib2.Http(disable_ssl_certificate_validation=insecure)
 
+    def get_thread_http(self):
+        """
+        Gets an authorized http client of the current thread, as the http clients are not thread safe.
+        :return: The http client, to execute the requests of the service with
+        """
+        http = getattr(self._thread_local, "http", None)
+        if http is None:
+            http = self.credentials.authorize(
+                self.get_http_client_with_proxy(self.proxy, self.insecure)
+            )
+            self._thread_local.http = http
+        return http
+
+    def iter_pages(self, resource, items_key: str, **list_kwargs) -> Iterable:
+        """
+        Yields the items of a list method of a resource, requesting each page once the previous one was consumed.
+        :param resource: The resource, i.e. self.service.projects().topics()
+        :param items_key: The key of the items in each page
+        :param list_kwargs: The arguments of the list method
+        :return: The items of all the pages
+        """
+        request = resource.list(**list_kwargs)
+        while request is not None:
+            response = request.execute(http=self.get_thread_http())
+            yield from response.get(items_key, [])
+            request = resource.list_next(request, response)
+
+    @staticmethod
+    def map_projects(func: Callable[[str], list], project_ids: List[str]) -> List[list]:
+        """
+        Calls a function for each of the projects in parallel.
+        :param func: The function, which is called with a project ID
+        :param project_ids: The project IDs
+        :return: The results, in the order of the project IDs
+        """
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(MAX_PROJECT_WORKERS, len(project_ids)))
+        ) as executor:
+            return list(executor.map(func, project_ids))
+
 
 # disable-secrets-detection-end
 
@@ -219,6 +347,15 @@ class PubSubClient(BaseGoogleClient):
             .execute()
         )
 
+    def list_all_topics(self, project_id, page_size=None):
+        """Get the topics of all the pages from GoogleClient"""
+        return self.iter_pages(
+            self.service.projects().topics(),
+            "topics",
+            project=project_id,
+            pageSize=page_size,
+        )
+
     def list_topic_subs(self, topic_id, page_size, page_token=None):
         """Get topic subscriptions from GoogleClient"""
         return (
@@ -238,6 +375,15 @@ class PubSubClient(BaseGoogleClient):
             .execute()
         )
 
+    def list_all_project_subs(self, project_id, page_size=None):
+        """Get the project subscriptions of all the pages from GoogleClient"""
+        return self.iter_pages(
+            self.service.projects().subscriptions(),
+            "subscriptions",
+            project=project_id,
+            pageSize=page_size,
+        )
+
     def get_sub(self, sub_name):
         """Get subscription by name from GoogleClient"""
         return (
@@ -256,12 +402,13 @@ class PubSubClient(BaseGoogleClient):
             .execute()
         )
 
-    def pull_messages(self, sub_name, max_messages, ret_immediately=True):
+    def pull_messages(self, sub_name, max_messages, ret_immediately=True, http=None):
         """
         Pull messages for the subscription
         :param sub_name: Subscription name
         :param max_messages: The maximum number of messages to return for this request. Must be a positive integer
         :param ret_immediately: when set to true will return immediately, otherwise will be async
+        :param http: The http client to execute the request with, defaults to the http client of the service
         :return: Messages
         """
         req_body = {"returnImmediately": ret_immediately, "maxMessages": max_messages}
@@ -269,14 +416,15 @@ class PubSubClient(BaseGoogleClient):
             self.service.projects()
             .subscriptions()
             .pull(subscription=sub_name, body=req_body)
-            .execute()
+            .execute(http=http)
         )
 
-    def ack_messages(self, sub_name, acks):
+    def ack_messages(self, sub_name, acks, http=None):
         """
         Ack a list of messages
         :param sub_name: subscription name
         :param acks: ack ids to ack
+        :param http: The http client to execute the request with, defaults to the http client of the service
         :return:
         """
         body = {"ackIds": acks}
@@ -284,7 +432,7 @@ class PubSubClient(BaseGoogleClient):
             self.service.projects()
             .subscriptions()
             .acknowledge(subscription=sub_name, body=body)
-            .execute()
+            .execute(http=http)
         )
 
     def create_subscription(
@@ -472,6 +620,15 @@ class PubSubClient(BaseGoogleClient):
             .execute()
         )
 
+    def list_all_project_snapshots(self, project_name, page_size=None):
+        """Get the project snapshots of all the pages from GoogleClient"""
+        return self.iter_pages(
+            self.service.projects().snapshots(),
+            "snapshots",
+            project=project_name,
+            pageSize=page_size,
+        )
+
     def create_snapshot(self, subscription_name, snapshot_name, labels):
         """
         Create a snapshot
@@ -630,6 +787,27 @@ def attribute_pairs_to_dict(attrs_str: Optional[str], delim_char: str = ","):
     return attrs
 
 
+def list_projects_items(client, project_ids, list_all_func, page_size, page_token):
+    """
+    Lists the items of all the pages of several projects, the projects are listed in parallel
+    :param client: PubSub client
+    :param project_ids: The project IDs
+    :param list_all_func: The client function which yields the items of a project, i.e. client.list_all_topics
+    :param page_size: page size
+    :param page_token: page token, which can not be used with several projects
+    :return: The items of all the projects
+    """
+    if page_token:
+        raise ValueError("A page token can only be used with a single project ID.")
+    items_by_project = client.map_projects(
+        lambda project_id: list(
+            list_all_func(GoogleNameParser.get_project_name(project_id), page_size)
+        ),
+        project_ids,
+    )
+    return [item for items in items_by_project for item in items]
+
+
 """ COMMAND FUNCTIONS """
 
 
@@ -668,11 +846,22 @@ def topics_list_command(
         https://www.googleapis.com/auth/cloud-platform
 
     :param client: GoogleClient
-    :param project_id: project name
+    :param project_id: project name, or a comma separated list of project names to list all of their topics
     :param page_size: page size
     :param page_token: page token, as returned from the api
     :return: list of topics
     """
+    project_ids = argToList(project_id)
+    if len(project_ids) > 1:
+        topics = list_projects_items(
+            client, project_ids, client.list_all_topics, page_size, page_token
+        )
+        readable_output = tableToMarkdown(
+            f"Topics for projects {', '.join(project_ids)}", topics, ["name"]
+        )
+        outputs = {"GoogleCloudPubSubTopics(val && val.name === obj.name)": topics}
+        return readable_output, outputs, {"topics": topics}
+
     full_project_name = GoogleNameParser.get_project_name(project_id)
     res = client.list_topic(full_project_name, page_size, page_token)
 
@@ -862,14 +1051,32 @@ def subscriptions_list_command(
         https://www.googleapis.com/auth/cloud-platform
 
     :param client: GoogleClient
-    :param project_id: project name
+    :param project_id: project name, or a comma separated list of project names to list all of their subscriptions
     :param page_size: page size
     :param page_token: page token, as returned from the api
     :param topic_id: topic name
     :return: list of subscriptions
     """
     title = "Subscriptions"
-    if topic_id:
+    project_ids = argToList(project_id)
+    if len(project_ids) > 1 and topic_id:
+        raise ValueError("A topic ID can only be used with a single project ID.")
+    if len(project_ids) > 1:
+        subs = list_projects_items(
+            client, project_ids, client.list_all_project_subs, page_size, page_token
+        )
+        next_page_token = None
+        raw_response = {"subscriptions": subs}
+        title += f" in projects {', '.join(project_ids)}"
+        for sub in subs:
+            sub["deliveryType"] = "Push" if sub.get("pushConfig") else "Pull"
+        readable_output = tableToMarkdown(
+            title,
+            subs,
+            headers=["name", "topic", "ackDeadlineSeconds", "labels"],
+            headerTransform=pascalToSpace,
+        )
+    elif topic_id:
         full_topic_name = GoogleNameParser.get_topic_name(project_id, topic_id)
         raw_response = client.list_topic_subs(full_topic_name, page_size, page_token)
         subs = [{"name": sub} for sub in raw_response.get("subscriptions", [])]
@@ -1179,12 +1386,25 @@ def snapshot_list_command(
         https://www.googleapis.com/auth/cloud-platform
 
     :param client: GoogleClient
-    :param project_id: project id
+    :param project_id: project id, or a comma separated list of project ids to list all of their snapshots
     :param topic_id:
     :param page_size: page size
     :param page_token: page token, as returned from the api
     :return: list of snapshots
     """
+    project_ids = argToList(project_id)
+    if len(project_ids) > 1:
+        if topic_id:
+            raise ValueError("A topic ID can only be used with a single project ID.")
+        snapshots = list_projects_items(
+            client, project_ids, client.list_all_project_snapshots, page_size, page_token
+        )
+        readable_output = tableToMarkdown(
+            f"Snapshots for projects {', '.join(project_ids)}", snapshots, ["name"]
+        )
+        outputs = {"GoogleCloudPubSubSnapshots(val && val.name === obj.name)": snapshots}
+        return readable_output, outputs, {"snapshots": snapshots}
+
     if topic_id:
         topic_name = GoogleNameParser.get_topic_name(project_id, topic_id)
         res = client.get_topic_snapshots_list(topic_name, page_size, page_token)
@@ -1296,7 +1516,12 @@ def snapshot_delete_command(
 
 
 def fetch_incidents(
-    client: PubSubClient, last_run: dict, first_fetch_time: str, ack_incidents: bool
+    client: PubSubClient,
+    last_run: dict,
+    first_fetch_time: str,
+    ack_incidents: bool,
+    pull_workers: int = DEFAULT_PULL_WORKERS,
+    max_fetch_duration: int = DEFAULT_MAX_FETCH_DURATION,
 ):
     """
     This function will execute each interval (default is 1 minute).
@@ -1304,6 +1529,8 @@ def fetch_incidents(
     :param last_run: last run dict containing last run data
     :param first_fetch_time: how long ago should the subscription seek in first fetch
     :param ack_incidents: Boolean flag - when set to True will ack back the fetched messages
+    :param pull_workers: The number of pull requests made in parallel
+    :param max_fetch_duration: The number of seconds after which no more messages are pulled
     :return: incidents: Incidents that will be created in Demisto
     """
     sub_name = GoogleNameParser.get_subscription_project_name(
@@ -1311,28 +1538,24 @@ def fetch_incidents(
     )
 
     # Setup subscription for fetch
-    last_run_fetched_ids, last_run_time = setup_subscription_last_run(
+    fetched_ids, last_run_time = setup_subscription_last_run(
         client, first_fetch_time, last_run, sub_name, ack_incidents
     )
 
-    # Pull unique messages if available
-    msgs, msg_ids, acknowledges, max_publish_time = try_pull_unique_messages(
-        client, sub_name, last_run_fetched_ids, last_run_time, retry_times=1
-    )
-
-    # Handle fetch results
-    return handle_fetch_results(
+    # Pull unique messages until the subscription has no new messages or a fetch limit is reached
+    msgs = pull_unique_messages(
         client,
         sub_name,
-        last_run,
-        acknowledges,
-        last_run_time,
-        max_publish_time,
-        msg_ids,
-        msgs,
+        fetched_ids,
+        int(client.default_max_msgs),
+        pull_workers,
+        max_fetch_duration,
         ack_incidents,
     )
 
+    # Handle fetch results
+    return handle_fetch_results(last_run, last_run_time, msgs, fetched_ids, ack_incidents)
+
 
 def setup_subscription_last_run(
     client, first_fetch_time, last_run, sub_name, ack_incidents
@@ -1344,155 +1567,112 @@ def setup_subscription_last_run(
     :param last_run: Last run dict
     :param sub_name: Name of the subscription
     :param ack_incidents: ACK flag - if true, will not use seek except for first time fetch
-    :return:
+    :return: The ids of the previously fetched messages, and the last run time
     """
-    last_run_fetched_ids = set()
     # Handle first time fetch
     if not last_run or LAST_RUN_TIME_KEY not in last_run:
         last_run_time, _ = parse_date_range(first_fetch_time, ISO_DATE_FORMAT)
         # Seek previous message state
         client.subscription_seek_message(sub_name, last_run_time)
-    else:
-        last_run_time = last_run.get(LAST_RUN_TIME_KEY)
-        last_run_fetched_val = last_run.get(LAST_RUN_FETCHED_KEY)
-        if last_run_fetched_val:
-            last_run_fetched_ids = set(last_run_fetched_val)
-        if not ack_incidents:
-            # Seek previous message state
-            client.subscription_seek_message(sub_name, last_run_time)
-    return last_run_fetched_ids, last_run_time
-
-
-def try_pull_unique_messages(
-    client, sub_name, previous_msg_ids, last_run_time, retry_times=0
-):
-    """
-    Tries to pull unique messages for the subscription
-    :param client: PubSub client
-    :param sub_name: Subscription name
-    :param previous_msg_ids: Previous message ids set
-    :param last_run_time: previous run time
-    :param retry_times: How many times to retry pulling
-    :return:
-        1. Unique list of messages
-        2. Unique  set of message ids
-        3. Messages acks
-        4. max_publish_time
-    """
-    res_msgs = None
-    res_msg_ids = None
-    res_acks = None
-    res_max_publish_time = None
-    raw_msgs = client.pull_messages(sub_name, client.default_max_msgs)
-    if "receivedMessages" in raw_msgs:
-        res_acks, msgs = extract_acks_and_msgs(raw_msgs)
-        # continue only if messages were extracted successfully
-        if msgs:
-            msg_ids, max_publish_time = get_messages_ids_and_max_publish_time(msgs)
-            new_msg_ids = msg_ids.difference(previous_msg_ids)
-            # all messages are unique - return as is
-            if len(new_msg_ids) == len(msg_ids):
-                return msgs, msg_ids, res_acks, max_publish_time
-            # no new messages - retry -1
-            elif len(new_msg_ids) == 0 and retry_times > 0:
-                demisto.debug(
-                    f"GCP_PUBSUB_MSG Duplicates with max_publish_time: {max_publish_time}"
-                )
-                return try_pull_unique_messages(
-                    client, sub_name, previous_msg_ids, retry_times - 1
-                )
-            # clean non-unique ids from raw_msgs
-            else:
-                filtered_raw_msgs = filter_non_unique_messages(
-                    raw_msgs, previous_msg_ids, last_run_time
-                )
-                res_acks, res_msgs = extract_acks_and_msgs(filtered_raw_msgs)
-                (
-                    res_msg_ids,
-                    res_max_publish_time,
-                ) = get_messages_ids_and_max_publish_time(res_msgs)
-    return res_msgs, res_msg_ids, res_acks, res_max_publish_time
+        return FetchedMessageIds(), last_run_time
 
-
-def is_unique_msg(msg, previous_msg_ids, previous_run_time):
-    """
-    Determines if message is unique given previous message ids, and that it's greater than previous run time
-    :param msg: raw Message object
-    :param previous_msg_ids: set of previously fetched message ids
-    :param previous_run_time: previous run time string
-    :return: True if message is unique
-    """
-    message_dict = msg.get("message", {})
-    if message_dict:
-        msg_id = message_dict.get("messageId")
-        msg_pub_time = message_dict.get("publishTime", "")
-        return msg_id not in previous_msg_ids and msg_pub_time > previous_run_time
-    return False
-
-
-def filter_non_unique_messages(raw_msgs, previous_msg_ids, previous_run_time):
-    """
-    Filters messages that appear in previous_msg_ids or are older than the previous_run_time
-    :param raw_msgs: Raw message object
-    :param previous_msg_ids:
-    :param previous_run_time:
-    :return:
-    """
-    raw_msgs = raw_msgs.get("receivedMessages", [])
-    # filter messages using `previous_msg_ids` and `previous_run_time`
-    filtered_raw_msgs = list(
-        filter(
-            lambda msg: is_unique_msg(msg, previous_msg_ids, previous_run_time),
-            raw_msgs,
-        )
+    last_run_time = last_run.get(LAST_RUN_TIME_KEY)
+    if not ack_incidents:
+        # Seek previous message state
+        client.subscription_seek_message(sub_name, last_run_time)
+    fetched_ids = FetchedMessageIds.from_last_run(
+        last_run.get(LAST_RUN_FETCHED_KEY) or {}, last_run_time
     )
-    return {"receivedMessages": filtered_raw_msgs}
+    return fetched_ids, last_run_time
 
 
-def handle_fetch_results(
+def pull_unique_messages(
     client,
     sub_name,
-    last_run,
-    acknowledges,
-    last_run_time,
-    max_publish_time,
-    pulled_msg_ids,
-    pulled_msgs,
+    fetched_ids,
+    max_msgs,
+    pull_workers,
+    max_fetch_duration,
     ack_incidents,
 ):
     """
-    Handle the fetch results
-    :param client: PubSub Client
+    Pulls messages in parallel rounds, until max_msgs unique messages were pulled, the subscription has no new messages,
+    or max_fetch_duration has passed. When ack_incidents is set, the messages of each round are acked in batches.
+    :param client: PubSub client
     :param sub_name: Subscription name
+    :param fetched_ids: The ids of the fetched messages, the ids of the pulled unique messages are added to it
+    :param max_msgs: The maximum number of unique messages to pull
+    :param pull_workers: The number of pull requests made in parallel
+    :param max_fetch_duration: The number of seconds after which no more rounds are pulled
+    :param ack_incidents: Boolean flag - when set to True will ack the pulled messages
+    :return: The unique messages
+    """
+    deadline = time.time() + max_fetch_duration
+    unique_msgs: List[dict] = []
+
+    def pull(max_messages):
+        return client.pull_messages(sub_name, max_messages, http=client.get_thread_http())
+
+    def ack(acks):
+        return client.ack_messages(sub_name, acks, http=client.get_thread_http())
+
+    with ThreadPoolExecutor(max_workers=pull_workers) as executor:
+        while len(unique_msgs) < max_msgs and time.time() < deadline:
+            remaining = max_msgs - len(unique_msgs)
+            pull_size = min(PULL_MAX_MSGS, -(-remaining // pull_workers))
+            pulls_count = min(pull_workers, -(-remaining // pull_size))
+            round_msgs = []
+            for raw_msgs in executor.map(pull, [pull_size] * pulls_count):
+                round_msgs.extend(extract_acks_and_msgs(raw_msgs)[1])
+            if not round_msgs:
+                break
+            # the rounds may pull more messages than needed, the newest ones are left for the next fetch
+            round_msgs.sort(key=lambda msg: msg.get("publishTime", ""))
+
+            acks = []
+            new_msgs_count = 0
+            for msg in round_msgs:
+                msg_id = msg.get("messageId")
+                if msg_id in fetched_ids:
+                    demisto.debug(f"GCP_PUBSUB_MSG Duplicate message: {msg_id}")
+                elif len(unique_msgs) < max_msgs:
+                    fetched_ids.add(msg_id, msg.get("publishTime", ""))
+                    unique_msgs.append(msg)
+                    new_msgs_count += 1
+                else:
+                    continue
+                if msg.get("ackId"):
+                    acks.append(msg["ackId"])
+
+            if ack_incidents and acks:
+                list(executor.map(ack, batch(acks, batch_size=ACK_BATCH_SIZE)))
+            # duplicates which are not acked would be pulled again once their ack deadline passes
+            elif not new_msgs_count:
+                break
+    return unique_msgs
+
+
+def handle_fetch_results(last_run, last_run_time, pulled_msgs, fetched_ids, ack_incidents):
+    """
+    Handle the fetch results
     :param last_run: last run dict
-    :param acknowledges: acknowledges to make given ack_incidents is True
     :param last_run_time: last run time
-    :param max_publish_time: max publish time of pulled messages
-    :param pulled_msg_ids: pulled message ids
-    :param pulled_msgs: pulled messages
+    :param pulled_msgs: pulled unique messages
+    :param fetched_ids: the ids of the fetched messages, including the pulled messages
     :param ack_incidents: ack incidents flag
     :return: incidents and last run
     """
-    incidents = []
-    if pulled_msg_ids and max_publish_time:
-        if last_run_time <= max_publish_time:
-            # Create incidents
-            for msg in pulled_msgs:
-                incident = message_to_incident(msg)
-                incidents.append(incident)
-            # ACK messages if relevant
-            if ack_incidents:
-                client.ack_messages(sub_name, acknowledges)
-            # Recreate last run to return with new values
-            last_run = {
-                LAST_RUN_TIME_KEY: max_publish_time,
-                LAST_RUN_FETCHED_KEY: list(pulled_msg_ids),
-            }
+    incidents = [message_to_incident(msg) for msg in pulled_msgs]
+    _, max_publish_time = get_messages_ids_and_max_publish_time(pulled_msgs)
+    if max_publish_time:
+        # Recreate last run to return with new values
+        last_run = {
+            LAST_RUN_TIME_KEY: max(last_run_time, max_publish_time),
+            LAST_RUN_FETCHED_KEY: fetched_ids.to_last_run(),
+        }
     # We didn't manage to pull any unique messages, so we're trying to increment micro seconds - not relevant for ack
     elif not ack_incidents:
-        last_run_time_dt = dateparser.parse(
-            max_publish_time if max_publish_time else last_run_time
-        )
+        last_run_time_dt = dateparser.parse(last_run_time)
         last_run_time = convert_datetime_to_iso_str(
             last_run_time_dt + timedelta(microseconds=1)
         )
@@ -1531,8 +1711,17 @@ def main():
             ack_incidents = params.get("ack_incidents")
             first_fetch_time = params.get("first_fetch_time").rstrip()
             last_run = demisto.getLastRun()
+            pull_workers = int(params.get("pull_workers") or DEFAULT_PULL_WORKERS)
+            max_fetch_duration = int(
+                params.get("max_fetch_duration") or DEFAULT_MAX_FETCH_DURATION
+            )
             incidents, last_run = fetch_incidents(
-                client, last_run, first_fetch_time, ack_incidents
+                client,
+                last_run,
+                first_fetch_time,
+                ack_incidents,
+                pull_workers,
+                max_fetch_duration,
             )
             demisto.incidents(incidents)
             demisto.setLastRun(last_run)
@@ -1,4 +1,3 @@
-import demistomock as demisto
 import base64
 import pytest
 from GooglePubSub import (
@@ -8,8 +7,10 @@ from GooglePubSub import (
     attribute_pairs_to_dict,
     get_publish_body,
     extract_acks_and_msgs,
-    try_pull_unique_messages,
+    pull_unique_messages,
     setup_subscription_last_run,
+    handle_fetch_results,
+    FetchedMessageIds,
     publish_message_command,
     pull_messages_command,
     subscriptions_list_command,
@@ -27,7 +28,11 @@ from GooglePubSub import (
     snapshot_delete_command,
     LAST_RUN_FETCHED_KEY,
     LAST_RUN_TIME_KEY,
+    BaseGoogleClient,
+    PubSubClient,
+    GOOGLE_SESSIONS_CACHE,
 )
+import copy
 import dateparser
 import json
 
@@ -415,9 +420,12 @@ class TestCommands:
         def delete_snapshot(self, **kwargs):
             return ""
 
-        def ack_messages(self, a, b):
+        def ack_messages(self, a, b, http=None):
             return ""
 
+        def get_thread_http(self):
+            return None
+
     with open("test_data/commands_outputs.json", "r") as f:
         COMMAND_OUTPUTS = json.load(f)
     with open("test_data/raw_responses.json", "r") as f:
@@ -578,199 +586,148 @@ class TestCommands:
         res = command_func(client, **args)
         assert expected == res[1]
 
-    def test_try_pull_unique_messages__empty_1(self, mocker):
+    def pull_side_effect(self, *responses):
         """
-        Test try_pull_unique_messages with empty result
-        Given:
-            - previous_msg_ids = set()
-            - last_run_time = "2020-04-25T08:36:30.242Z"
-            - there are no messages in queue
-        When:
-            - trying  to pull unique messages
-        Then:
-            - try_pull_unique_messages should be called once (verified by demisto.debug)
-            - function should return an empty result
+        Returns the given raw responses one after the other, and then empty responses
         """
-        client = self.MockClient()
-        sub_name = "test_sub_2"
-        previous_msg_ids = set()
-        last_run_time = "2020-04-25T08:36:30.242Z"
-        mocker.patch.object(client, "pull_messages", return_value={})
-        debug_mock = mocker.patch.object(demisto, "debug")
-        (
-            res_msgs,
-            res_msg_ids,
-            res_acks,
-            res_max_publish_time,
-        ) = try_pull_unique_messages(
-            client, sub_name, previous_msg_ids, last_run_time, retry_times=1
-        )
-        assert debug_mock.call_count == 0
-        assert res_msgs is None
-        assert res_msg_ids is None
-        assert res_acks is None
-        assert res_max_publish_time is None
+        responses = [copy.deepcopy(self.RAW_RESPONSES[name]) for name in responses]
+        return lambda sub_name, max_messages, http=None: responses.pop(0) if responses else {}
 
-    def test_try_pull_unique_messages__empty_2(self, mocker):
+    def test_pull_unique_messages__empty(self, mocker):
         """
-        Test try_pull_unique_messages with empty result - receivedMessages is empty
+        Test pull_unique_messages with empty result
         Given:
-            - previous_msg_ids = set()
-            - last_run_time = "2020-04-25T08:36:30.242Z"
             - there are no messages in queue
         When:
-            - trying  to pull unique messages
+            - pulling unique messages
         Then:
-            - try_pull_unique_messages should be called once (verified by demisto.debug)
-            - function should return an empty result
+            - a single round of pulls is made and no messages are returned
         """
         client = self.MockClient()
-        sub_name = "test_sub_2"
-        previous_msg_ids = set()
-        last_run_time = "2020-04-25T08:36:30.242Z"
-        mocker.patch.object(
-            client, "pull_messages", return_value={"receivedMessages": []}
-        )
-        debug_mock = mocker.patch.object(demisto, "debug")
-        (
-            res_msgs,
-            res_msg_ids,
-            res_acks,
-            res_max_publish_time,
-        ) = try_pull_unique_messages(
-            client, sub_name, previous_msg_ids, last_run_time, retry_times=1
-        )
-        assert debug_mock.call_count == 0
-        assert res_msgs is None
-        assert res_msg_ids is None
-        assert res_acks == []
-        assert res_max_publish_time is None
+        pull_mock = mocker.patch.object(client, "pull_messages", return_value={"receivedMessages": []})
+        ack_mock = mocker.patch.object(client, "ack_messages")
+        res_msgs = pull_unique_messages(client, "test_sub_2", FetchedMessageIds(), 10, 2, 30, True)
+        assert res_msgs == []
+        assert pull_mock.call_count == 2
+        assert ack_mock.call_count == 0
 
-    def test_try_pull_unique_messages__unique_first_try(self, mocker):
+    def test_pull_unique_messages__until_no_new_messages(self, mocker):
         """
-        Test try_pull_unique_messages with a unique result on first try
+        Test pull_unique_messages with messages in several rounds of pulls
         Given:
-            - previous_msg_ids = set()
-            - last_run_time = "2020-04-25T08:36:30.242Z"
-            - there are messages in queue
+            - previous fetched ids = {'123'}
+            - the duplicate message is pulled in the first round, a new message in the second round
         When:
-            - trying to pull unique messages
+            - pulling unique messages with acks
         Then:
-            - try_pull_unique_messages should be called once (verified by demisto.debug)
-            - function should return a result with the pulled message
+            - rounds are pulled until the subscription has no new messages
+            - only the new message is returned, and both messages are acked
         """
         client = self.MockClient()
-        sub_name = "test_sub_2"
-        previous_msg_ids = set()
-        last_run_time = "2020-04-25T08:36:30.242Z"
-        unique_messages = self.RAW_RESPONSES["try_pull_unique_messages_1"]
-        mocker.patch.object(client, "pull_messages", return_value=unique_messages)
-        debug_mock = mocker.patch.object(demisto, "debug")
-        (
-            res_msgs,
-            res_msg_ids,
-            res_acks,
-            res_max_publish_time,
-        ) = try_pull_unique_messages(
-            client, sub_name, previous_msg_ids, last_run_time, retry_times=1
+        fetched_ids = FetchedMessageIds({"2020-04-18T08:36": ["123"]})
+        mocker.patch.object(
+            client,
+            "pull_messages",
+            side_effect=self.pull_side_effect("try_pull_unique_messages_1", "try_pull_unique_messages_2"),
         )
-        assert debug_mock.call_count == 0
+        ack_mock = mocker.patch.object(client, "ack_messages")
+        res_msgs = pull_unique_messages(client, "test_sub_2", fetched_ids, 10, 1, 30, True)
         assert res_msgs == [
             {
-                "ackId": "321",
-                "data": "42",
-                "messageId": "123",
-                "publishTime": "2020-04-18T08:36:30.541Z",
+                "ackId": "654",
+                "data": "43",
+                "messageId": "456",
+                "publishTime": "2020-04-19T08:36:30.541Z",
             }
         ]
-        assert res_msg_ids == {"123"}
-        assert res_acks == ["321"]
-        assert res_max_publish_time == "2020-04-18T08:36:30.541000Z"
+        assert "456" in fetched_ids
+        assert [call[0][1] for call in ack_mock.call_args_list] == [["321"], ["654"]]
 
-    def test_try_pull_unique_messages__unique_second_try(self, mocker):
+    def test_pull_unique_messages__max_msgs(self, mocker):
         """
-        Test try_pull_unique_messages with a non-unique result on first try and unique result second time
+        Test pull_unique_messages with more messages in the queue than the max messages
         Given:
-            - previous_msg_ids = {'123'}
-            - last_run_time = "2020-04-25T08:36:30.242Z"
-            - there are messages in queue
+            - max messages = 1
+            - a round pulls two new messages
         When:
-            - trying to pull unique messages
+            - pulling unique messages with acks
         Then:
-            - try_pull_unique_messages should be called twice (verified by demisto.debug)
-            - function should return a result with the unique pulled message
+            - only the first message is returned and acked, the other message is left for the next fetch
         """
         client = self.MockClient()
-        sub_name = "test_sub_2"
-        previous_msg_ids = {"123"}
-        last_run_time = "2020-04-25T08:36:30.242Z"
-        unique_messages_list = [
-            self.RAW_RESPONSES["try_pull_unique_messages_1"],
-            self.RAW_RESPONSES["try_pull_unique_messages_2"],
-        ]
-        mocker.patch.object(client, "pull_messages", side_effect=unique_messages_list)
-        debug_mock = mocker.patch.object(demisto, "debug")
-        (
-            res_msgs,
-            res_msg_ids,
-            res_acks,
-            res_max_publish_time,
-        ) = try_pull_unique_messages(
-            client, sub_name, previous_msg_ids, last_run_time, retry_times=1
+        fetched_ids = FetchedMessageIds()
+        pull_mock = mocker.patch.object(
+            client, "pull_messages", side_effect=self.pull_side_effect("try_pull_unique_messages_3")
         )
-        assert debug_mock.call_count == 1
-        assert res_msgs == [
-            {
-                "ackId": "654",
-                "data": "43",
-                "messageId": "456",
-                "publishTime": "2020-04-19T08:36:30.541Z",
-            }
-        ]
-        assert res_msg_ids == {"456"}
-        assert res_acks == ["654"]
-        assert res_max_publish_time == "2020-04-19T08:36:30.541000Z"
+        ack_mock = mocker.patch.object(client, "ack_messages")
+        res_msgs = pull_unique_messages(client, "test_sub_2", fetched_ids, 1, 4, 30, True)
+        assert [msg["messageId"] for msg in res_msgs] == ["123"]
+        assert pull_mock.call_count == 1
+        assert "456" not in fetched_ids
+        assert ack_mock.call_args[0][1] == ["321"]
 
-    def test_try_pull_unique_messages__partially_unique_first_try(self, mocker):
+    def test_pull_unique_messages__max_fetch_duration(self, mocker):
         """
-        Test try_pull_unique_messages with a partially unique result on first try
+        Test pull_unique_messages when the fetch duration has passed
         Given:
-            - previous_msg_ids = set()
-            - last_run_time = "2020-04-09T08:36:30.242Z"
-            - there are messages in queue
+            - max fetch duration = 0
         When:
-            - trying to pull unique messages
+            - pulling unique messages
         Then:
-            - try_pull_unique_messages should be called twice (verified by demisto.debug)
-            - function should return a result with the unique pulled message
+            - no messages are pulled
         """
         client = self.MockClient()
-        sub_name = "test_sub_2"
-        previous_msg_ids = {"123"}
-        last_run_time = "2020-04-09T08:36:30.242Z"
-        unique_messages_list = [self.RAW_RESPONSES["try_pull_unique_messages_3"]]
-        mocker.patch.object(client, "pull_messages", side_effect=unique_messages_list)
-        debug_mock = mocker.patch.object(demisto, "debug")
-        (
-            res_msgs,
-            res_msg_ids,
-            res_acks,
-            res_max_publish_time,
-        ) = try_pull_unique_messages(
-            client, sub_name, previous_msg_ids, last_run_time, retry_times=1
-        )
-        assert debug_mock.call_count == 0
-        assert res_msgs == [
-            {
-                "ackId": "654",
-                "data": "43",
-                "messageId": "456",
-                "publishTime": "2020-04-19T08:36:30.541Z",
-            }
+        pull_mock = mocker.patch.object(client, "pull_messages")
+        assert pull_unique_messages(client, "test_sub_2", FetchedMessageIds(), 10, 4, 0, False) == []
+        assert pull_mock.call_count == 0
+
+    def test_handle_fetch_results(self):
+        """
+        Test handle_fetch_results with pulled messages
+        Given:
+            - messages which were pulled in the fetch
+        When:
+            - handling the fetch results
+        Then:
+            - an incident is created per message, and the last run keeps the max publish time and the fetched ids
+        """
+        msgs = [
+            {"messageId": "123", "publishTime": "2020-04-18T08:36:30.541Z"},
+            {"messageId": "456", "publishTime": "2020-04-19T08:36:30.541Z"},
         ]
-        assert res_msg_ids == {"456"}
-        assert res_acks == ["654"]
-        assert res_max_publish_time == "2020-04-19T08:36:30.541000Z"
+        fetched_ids = FetchedMessageIds()
+        for msg in msgs:
+            fetched_ids.add(msg["messageId"], msg["publishTime"])
+        incidents, last_run = handle_fetch_results({}, "2020-04-09T08:36:30.242000Z", msgs, fetched_ids, False)
+        assert len(incidents) == 2
+        assert last_run == {
+            LAST_RUN_TIME_KEY: "2020-04-19T08:36:30.541000Z",
+            LAST_RUN_FETCHED_KEY: {"2020-04-19T08:36": ["456"]},
+        }
+
+    def test_fetched_message_ids__window(self, mocker):
+        """
+        Test FetchedMessageIds last run value
+        Given:
+            - fetched ids published over more minutes than the window, and more ids than the max size
+        When:
+            - creating the last run value
+        Then:
+            - only the ids of the newest minutes are kept
+        """
+        mocker.patch("GooglePubSub.FETCHED_IDS_MAX_SIZE", 2)
+        fetched_ids = FetchedMessageIds.from_last_run(["1"], "2020-04-18T08:00:30.541000Z")
+        for msg_id, publish_time in [("2", "2020-04-18T08:20:00Z"), ("3", "2020-04-18T08:25:00Z"),
+                                     ("4", "2020-04-18T08:26:00Z"), ("5", "2020-04-18T08:26:30Z")]:
+            fetched_ids.add(msg_id, publish_time)
+        assert "1" in fetched_ids
+        assert fetched_ids.to_last_run() == {"2020-04-18T08:26": ["4", "5"]}
+        mocker.patch("GooglePubSub.FETCHED_IDS_MAX_SIZE", 10)
+        assert fetched_ids.to_last_run() == {
+            "2020-04-18T08:26": ["4", "5"],
+            "2020-04-18T08:25": ["3"],
+            "2020-04-18T08:20": ["2"],
+        }
 
     def test_setup_subscription_last_run__first_run(self, mocker):
         """
@@ -793,7 +750,7 @@ class TestCommands:
             client, first_fetch_time, last_run, sub_name, ack_incidents
         )
         assert sub_seek_mock.call_count == 1
-        assert last_run_fetched_ids == set()
+        assert len(last_run_fetched_ids) == 0
         assert last_run_time is not None
 
     def test_setup_subscription_last_run__not_first_run__with_acks(self, mocker):
@@ -820,7 +777,7 @@ class TestCommands:
             client, first_fetch_time, last_run, sub_name, ack_incidents
         )
         assert sub_seek_mock.call_count == 0
-        assert last_run_fetched_ids == {"123"}
+        assert "123" in last_run_fetched_ids
         assert last_run_time is not None
 
     def test_setup_subscription_last_run__not_first_run__no_acks(self, mocker):
@@ -847,5 +804,95 @@ class TestCommands:
             client, first_fetch_time, last_run, sub_name, ack_incidents
         )
         assert sub_seek_mock.call_count == 1
-        assert last_run_fetched_ids == {"123"}
+        assert "123" in last_run_fetched_ids
         assert last_run_time is not None
+
+
+class TestPaging:
+    class MockResource:
+        def __init__(self, pages):
+            self.pages = pages
+            self.executed = 0
+
+        def list(self, **kwargs):
+            return self.request(0)
+
+        def list_next(self, request, response):
+            return self.request(request.page + 1) if request.page + 1 < len(self.pages) else None
+
+        def request(self, page):
+            resource = self
+
+            class Request:
+                def __init__(self):
+                    self.page = page
+
+                def execute(self, http=None):
+                    resource.executed += 1
+                    return resource.pages[page]
+            return Request()
+
+    def test_iter_pages(self, mocker):
+        """
+        Given:
+            - A list method with two pages
+        When:
+            - Iterating the items of the pages
+        Then:
+            - The next page is requested only once the items of the previous page were consumed
+        """
+        client = object.__new__(PubSubClient)
+        mocker.patch.object(PubSubClient, "get_thread_http", return_value=None)
+        resource = self.MockResource([{"topics": [1, 2], "nextPageToken": "a"}, {"topics": [3]}])
+        items = client.iter_pages(resource, "topics", project="projects/p", pageSize=2)
+        assert next(items) == 1
+        assert resource.executed == 1
+        assert list(items) == [2, 3]
+        assert resource.executed == 2
+
+    def test_topics_list_command__projects(self):
+        """
+        Given:
+            - Several project IDs
+        When:
+            - Listing topics
+        Then:
+            - The topics of all the pages of all the projects are returned, and a page token can not be used
+        """
+        class MockClient:
+            map_projects = staticmethod(BaseGoogleClient.map_projects)
+
+            def list_all_topics(self, project_name, page_size=None):
+                return iter([{"name": f"{project_name}/topics/{i}"} for i in range(2)])
+
+        readable_output, outputs, raw = topics_list_command(MockClient(), "p1,p2")
+        assert [topic["name"] for topic in raw["topics"]] == [
+            "projects/p1/topics/0",
+            "projects/p1/topics/1",
+            "projects/p2/topics/0",
+            "projects/p2/topics/1",
+        ]
+        assert outputs["GoogleCloudPubSubTopics(val && val.name === obj.name)"] == raw["topics"]
+        with pytest.raises(ValueError):
+            topics_list_command(MockClient(), "p1,p2", page_token="a")
+
+    def test_session_shared_across_clients(self, mocker):
+        """
+        Given:
+            - Two clients with the same credentials
+        When:
+            - Creating the clients
+        Then:
+            - The service is built once and shared
+        """
+        import GooglePubSub
+        from oauth2client import service_account
+
+        mocker.patch.dict(GooglePubSub.get_process_cache(GOOGLE_SESSIONS_CACHE), clear=True)
+        build = mocker.patch.object(GooglePubSub.discovery, "build")
+        mocker.patch.object(service_account.ServiceAccountCredentials, "from_json_keyfile_dict")
+        kwargs = dict(default_project="p", default_subscription="s", default_max_msgs="1",
+                      client_secret={"project_id": "p"}, service_name="pubsub", service_version="v1",
+                      scopes=[], proxy=False, insecure=False)
+        assert PubSubClient(**kwargs).service is PubSubClient(**kwargs).service
+        assert build.call_count == 1
@@ -8,6 +8,7 @@ from pykafka.common import OffsetType
 import logging
 from cStringIO import StringIO
 import traceback
+import time
 
 # Disable insecure warnings
 requests.packages.urllib3.disable_warnings()
@@ -18,6 +19,11 @@ requests.packages.urllib3.disable_warnings()
 log_stream = None
 log_handler = None
 
+# Long running
+DEFAULT_CONSUMER_GROUP = 'xsoar'
+CONSUMER_TIMEOUT_MS = 1000  # wait max 1 second for new messages before checking the batch wait time
+MAX_CREATE_INCIDENTS_BACKOFF = 60
+
 ''' HELPER FUNCTIONS '''
 
 
@@ -385,6 +391,104 @@ def fetch_incidents(client):
     demisto.incidents(incidents)
 
 
+def consume_incidents_batch(consumer, topic, max_batch_size, max_batch_wait):
+    """
+    Consumes messages until the batch is full, or until max_batch_wait seconds passed since its first message
+    :param consumer: the consumer to consume the messages from
+    :type consumer: :class:`pykafka.balancedconsumer.BalancedConsumer`
+    :param topic: the consumer's topic
+    :type topic: str
+    :param max_batch_size: max number of incidents in the batch
+    :type max_batch_size: int
+    :param max_batch_wait: max number of seconds to wait for the batch to fill
+    :type max_batch_wait: int
+    :return incidents: the incidents, or an empty list if no message was consumed in the consumer timeout
+    :rtype: list
+    """
+    incidents = []  # type: list
+    batch_start = time.time()
+    while len(incidents) < max_batch_size:
+        message = consumer.consume()
+        if message is None and not incidents:
+            break
+        if message and message.value:
+            if not incidents:
+                batch_start = time.time()
+            incident = create_incident(message=message, topic=topic)
+            if message.timestamp_dt:
+                incident['occurred'] = message.timestamp_dt.isoformat()
+            incidents.append(incident)
+        if time.time() - batch_start >= max_batch_wait:
+            break
+    return incidents
+
+
+def create_incidents_and_commit(consumer, incidents):
+    """
+    Creates the incidents, and commits the offsets of their messages only after they were created.
+    While the server fails to create the incidents, retries with an increasing backoff, and doesn't consume new
+    messages, so no more than the queued messages of the consumer are held in memory.
+    :param consumer: the consumer the messages of the incidents were consumed from
+    :type consumer: :class:`pykafka.balancedconsumer.BalancedConsumer`
+    :param incidents: the incidents to create
+    :type incidents: list
+    """
+    backoff = 1
+    while True:
+        try:
+            demisto.createIncidents(incidents)
+            break
+        except Exception as e:
+            demisto.updateModuleHealth('Failed creating {} incidents, retrying in {} seconds: {}'.format(
+                len(incidents), backoff, e))
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_CREATE_INCIDENTS_BACKOFF)
+    if backoff > 1:
+        demisto.updateModuleHealth('')
+    consumer.commit_offsets()
+
+
+def long_running_execution(client):
+    """
+    Keeps a balanced consumer of the topic alive, and creates incidents from its messages in batches
+    """
+    params = demisto.params()
+    topic = params.get('topic', '')
+    consumer_group = params.get('consumer_group') or DEFAULT_CONSUMER_GROUP
+    try:
+        max_batch_size = int(params.get('max_messages', 50))
+    except ValueError:
+        max_batch_size = 50
+    try:
+        max_batch_wait = int(params.get('batch_wait_seconds', 10))
+    except ValueError:
+        max_batch_wait = 10
+    try:
+        offset_to_fetch_from = int(params.get('offset', OffsetType.EARLIEST))
+    except ValueError:
+        offset_to_fetch_from = OffsetType.EARLIEST
+
+    if topic not in client.topics:
+        raise ValueError('No such topic \'{}\' to fetch incidents from.'.format(topic))
+    kafka_topic = client.topics[topic]
+    consumer = kafka_topic.get_balanced_consumer(
+        consumer_group=consumer_group,
+        managed=True,
+        auto_commit_enable=False,
+        # the committed offsets of the consumer group are used if there are any
+        auto_offset_reset=OffsetType.LATEST if offset_to_fetch_from == OffsetType.LATEST else OffsetType.EARLIEST,
+        consumer_timeout_ms=CONSUMER_TIMEOUT_MS,
+        queued_max_messages=max_batch_size
+    )
+    try:
+        while True:
+            incidents = consume_incidents_batch(consumer, kafka_topic.name, max_batch_size, max_batch_wait)
+            if incidents:
+                create_incidents_and_commit(consumer, incidents)
+    finally:
+        consumer.stop()
+
+
 ''' COMMANDS MANAGER / SWITCH PANEL '''
 
 
@@ -424,10 +528,14 @@ def main():
             fetch_partitions(client)
         elif demisto.command() == 'fetch-incidents':
             fetch_incidents(client)
+        elif demisto.command() == 'long-running-execution':
+            long_running_execution(client)
 
     except Exception as e:
         debug_log = 'Debug logs:\n\n{0}'.format(log_stream.getvalue() if log_stream else '')
         error_message = str(e)
+        if demisto.command() == 'long-running-execution':
+            demisto.updateModuleHealth(error_message)
         if demisto.command() != 'test-module':
             stacktrace = traceback.format_exc()
             if stacktrace:
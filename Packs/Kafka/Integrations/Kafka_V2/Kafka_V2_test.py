@@ -1,5 +1,8 @@
-from Kafka_V2 import create_certificate
+from Kafka_V2 import create_certificate, consume_incidents_batch, create_incidents_and_commit, long_running_execution
+import demistomock as demisto
+import json
 import os
+import pytest
 
 
 def test_create_certificate():
@@ -18,3 +21,121 @@ def test_create_certificate():
     with open(res.keyfile, 'rb') as f:
         assert f.read() == key
     os.remove(res.keyfile)
+
+
+class FakeMessage(object):
+    def __init__(self, partition_id, offset, value):
+        self.partition_id = partition_id
+        self.offset = offset
+        self.value = value
+        self.timestamp_dt = None
+
+
+class ConsumerStopped(Exception):
+    pass
+
+
+class FakeBalancedConsumer(object):
+    """
+    An in-process stand-in for a balanced consumer of a single partition topic. Once there are no messages it returns
+    None like a consumer timeout, and then raises ConsumerStopped to stop the long running loop.
+    """
+    def __init__(self, messages, **kwargs):
+        self.messages = list(messages)
+        self.kwargs = kwargs
+        self.consumed_offset = -1
+        self.committed_offset = -1
+        self.timed_out = False
+        self.stopped = False
+
+    def consume(self, block=True):
+        if not self.messages:
+            if self.timed_out:
+                raise ConsumerStopped()
+            self.timed_out = True
+            return None
+        message = self.messages.pop(0)
+        self.consumed_offset = message.offset
+        return message
+
+    def commit_offsets(self):
+        self.committed_offset = self.consumed_offset
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakeTopic(object):
+    def __init__(self, name, messages):
+        self.name = name
+        self.messages = messages
+        self.consumer = None
+
+    def get_balanced_consumer(self, **kwargs):
+        self.consumer = FakeBalancedConsumer(self.messages, **kwargs)
+        return self.consumer
+
+
+class FakeKafkaClient(object):
+    def __init__(self, topics):
+        self.topics = {topic.name: topic for topic in topics}
+
+
+def create_messages(count):
+    return [FakeMessage(0, offset, 'message {}'.format(offset)) for offset in range(count)]
+
+
+def test_consume_incidents_batch():
+    consumer = FakeBalancedConsumer(create_messages(5))
+    assert [json.loads(i['rawJSON'])['Offset'] for i in consume_incidents_batch(consumer, 'test', 3, 60)] == [0, 1, 2]
+    assert [json.loads(i['rawJSON'])['Offset'] for i in consume_incidents_batch(consumer, 'test', 1, 60)] == [3]
+    assert len(consume_incidents_batch(consumer, 'test', 3, 0)) == 1
+    assert consume_incidents_batch(FakeBalancedConsumer([]), 'test', 3, 60) == []
+
+
+def test_create_incidents_and_commit(mocker):
+    """
+    Given:
+        - A server which fails to create the incidents once.
+    When:
+        - Creating the incidents of the consumed messages.
+    Then:
+        - The incidents are created again after a backoff, and only then the offsets are committed.
+    """
+    consumer = FakeBalancedConsumer(create_messages(2))
+    incidents = consume_incidents_batch(consumer, 'test', 2, 60)
+    mocker.patch.object(demisto, 'createIncidents', side_effect=[Exception('server is busy'), None])
+    mocker.patch.object(demisto, 'updateModuleHealth')
+    sleep = mocker.patch('Kafka_V2.time.sleep')
+    create_incidents_and_commit(consumer, incidents)
+    assert demisto.createIncidents.call_count == 2
+    sleep.assert_called_once_with(1)
+    assert 'server is busy' in demisto.updateModuleHealth.call_args_list[0][0][0]
+    demisto.updateModuleHealth.assert_called_with('')
+    assert consumer.committed_offset == 1
+
+
+def test_long_running_execution(mocker):
+    """
+    Given:
+        - A topic with 5 messages, and a batch size of 2.
+    When:
+        - Running the long running execution until the consumer stops.
+    Then:
+        - The incidents are created in full batches, the offsets of each batch are committed after it was created,
+          and the messages of the partial batch are not committed.
+    """
+    topic = FakeTopic('test', create_messages(5))
+    mocker.patch.object(demisto, 'params', return_value={'topic': 'test', 'max_messages': '2',
+                                                         'batch_wait_seconds': '60'})
+    committed_offsets = []
+    mocker.patch.object(demisto, 'createIncidents',
+                        side_effect=lambda incidents: committed_offsets.append(topic.consumer.committed_offset))
+    with pytest.raises(ConsumerStopped):
+        long_running_execution(FakeKafkaClient([topic]))
+    assert [len(call[0][0]) for call in demisto.createIncidents.call_args_list] == [2, 2]
+    assert committed_offsets == [-1, 1]
+    assert topic.consumer.committed_offset == 3
+    assert topic.consumer.stopped
+    assert topic.consumer.kwargs['consumer_group'] == 'xsoar'
+    assert not topic.consumer.kwargs['auto_commit_enable']
@@ -5,9 +5,9 @@ from CommonServerPython import *
 from CommonServerUserPython import *
 import pandas as pd
 from bs4 import BeautifulSoup
-from sklearn.feature_extraction.text import CountVectorizer
-from numpy import dot
-from numpy.linalg import norm
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+import numpy as np
 from email.utils import parseaddr
 import tldextract
 from urllib.parse import urlparse
@@ -43,6 +43,9 @@ URL_REGEX = r'(?:(?:https?|ftp|hxxps?):\/\/|www\[?\.\]?|ftp\[?\.\]?)(?:[-\w\d]+\
 
 IGNORE_INCIDENT_TYPE_VALUE = 'None'
 
+# a stateless vectorizer producing the token counts, so no vocabulary is fitted on each run
+VECTORIZER = HashingVectorizer(token_pattern=r"(?u)\b\w\w+\b|!|\?|\"|\'", alternate_sign=False, norm=None)
+
 
 def get_existing_incidents(input_args, current_incident_type):
     global DEFAULT_ARGS
@@ -200,23 +203,30 @@ def filter_newer_incidents(existing_incidents_df, new_incident):
     return existing_incidents_df[earlier_incidents_mask]
 
 
-def vectorize(text, vectorizer):
-    return vectorizer.transform([text]).toarray()[0]
+def calculate_similarities(new_incident_text, existing_incidents_texts):
+    """
+    Calculates the cosine similarity of the new incident to all of the existing incidents with a single sparse
+    matrix multiplication.
+    """
+    existing_incidents_vectors = normalize(VECTORIZER.transform(existing_incidents_texts))
+    new_incident_vector = normalize(VECTORIZER.transform([new_incident_text]))
+    return existing_incidents_vectors.dot(new_incident_vector.T).toarray().ravel()
 
 
-def cosine_sim(a, b):
-    return dot(a, b) / (norm(a) * norm(b))
+def get_top_k_mask(similarities, k):
+    """
+    Returns a mask of the incidents with the k highest similarities, including the incidents tied with the k-th one.
+    """
+    if len(similarities) <= k:
+        return np.ones(len(similarities), dtype=bool)
+    kth_similarity = np.partition(similarities, -k)[-k]
+    return similarities >= kth_similarity
 
 
 def find_duplicate_incidents(new_incident, existing_incidents_df, max_incidents_to_return):
     global MERGED_TEXT_FIELD, FROM_POLICY
-    new_incident_text = new_incident[MERGED_TEXT_FIELD]
-    text = [new_incident_text] + existing_incidents_df[MERGED_TEXT_FIELD].tolist()
-    vectorizer = CountVectorizer(token_pattern=r"(?u)\b\w\w+\b|!|\?|\"|\'").fit(text)
-    new_incident_vector = vectorize(new_incident_text, vectorizer)
-    existing_incidents_df['vector'] = existing_incidents_df[MERGED_TEXT_FIELD].apply(lambda x: vectorize(x, vectorizer))
-    existing_incidents_df['similarity'] = existing_incidents_df['vector'].apply(
-        lambda x: cosine_sim(x, new_incident_vector))
+    existing_incidents_df['similarity'] = calculate_similarities(new_incident[MERGED_TEXT_FIELD],
+                                                                 existing_incidents_df[MERGED_TEXT_FIELD].tolist())
     if FROM_POLICY == FROM_POLICY_DOMAIN:
         mask = (existing_incidents_df[FROM_DOMAIN_FIELD] != '') & \
                (existing_incidents_df[FROM_DOMAIN_FIELD] == new_incident[FROM_DOMAIN_FIELD])
@@ -225,6 +235,8 @@ def find_duplicate_incidents(new_incident, existing_incidents_df, max_incidents_
         mask = (existing_incidents_df[FROM_FIELD] != '') & \
                (existing_incidents_df[FROM_FIELD] == new_incident[FROM_FIELD])
         existing_incidents_df = existing_incidents_df[mask]
+    existing_incidents_df = existing_incidents_df[get_top_k_mask(existing_incidents_df['similarity'].values,
+                                                                 max_incidents_to_return)]
     existing_incidents_df['distance'] = existing_incidents_df['similarity'].apply(lambda x: 1 - x)
     tie_breaker_col = 'id'
     try:
@@ -247,7 +259,6 @@ def return_entry(message, duplicate_incidents_df=None, new_incident=None):
         all_duplicate_incidents = [format_incident_context(row) for _, row in duplicate_incidents_df.iterrows()]
         new_incident['created'] = new_incident['created'].astype(str)
         duplicate_incidents_df['created'] = duplicate_incidents_df['created'].astype(str)
-        duplicate_incidents_df.drop('vector', axis=1, inplace=True)
         full_incidents = new_incident.to_dict(orient='records') + duplicate_incidents_df.to_dict(orient='records')
     outputs = {
         'duplicateIncident': duplicate_incident,
@@ -395,3 +395,19 @@ def test_multiple_incidents_word_difference(mocker):
     assert duplicated_incidents_found(existing_incidents_list[0])
     duplicate_ids_found = [res['id'] for res in RESULTS['EntryContext']['allDuplicateIncidents']]
     assert all(inc['id'] in duplicate_ids_found for inc in existing_incidents_list)
+
+
+def test_calculate_similarities():
+    similarities = calculate_similarities(text, [text, text2, text + ' ' + text, ''])
+    assert similarities[0] > 0.999
+    assert similarities[1] < 0.5
+    assert similarities[2] > 0.999
+    assert similarities[3] == 0
+
+
+def test_get_top_k_mask():
+    similarities = np.array([0.1, 0.9, 0.5, 0.9, 0.3])
+    assert get_top_k_mask(similarities, 2).tolist() == [False, True, False, True, False]
+    assert get_top_k_mask(similarities, 3).tolist() == [False, True, True, True, False]
+    assert get_top_k_mask(similarities, 1).tolist() == [False, True, False, True, False]
+    assert get_top_k_mask(similarities, 10).all()
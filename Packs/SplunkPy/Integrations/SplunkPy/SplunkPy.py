@@ -13,6 +13,9 @@ import requests
 import urllib3
 import io
 import re
+import time
+import hashlib
+from multiprocessing.pool import ThreadPool
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -31,31 +34,16 @@ FETCH_TIME = demisto.params().get('fetch_time')
 PROXIES = handle_proxy()
 TIME_UNIT_TO_MINUTES = {'minute': 1, 'hour': 60, 'day': 24 * 60, 'week': 7 * 24 * 60, 'month': 30 * 24 * 60,
                         'year': 365 * 24 * 60}
-
-
-class ResponseReaderWrapper(io.RawIOBase):
-    """ This class was supplied as a solution for a bug in Splunk causing the search to run slowly.
-    """
-
-    def __init__(self, responseReader):
-        self.responseReader = responseReader
-
-    def readable(self):
-        return True
-
-    def close(self):
-        self.responseReader.close()
-
-    def read(self, n):
-        return self.responseReader.read(n)
-
-    def readinto(self, b):
-        sz = len(b)
-        data = self.responseReader.read(sz)
-        for idx, ch in enumerate(data):
-            b[idx] = ch
-
-        return len(data)
+# long running fetch
+LONG_RUNNING_BATCH_SIZE = 200
+LONG_RUNNING_FETCH_INTERVAL = 60  # seconds between the fetch windows
+LONG_RUNNING_MAX_SEEN_IDS = 20000
+LONG_RUNNING_CHECKPOINT_INTERVAL = 30  # seconds between the checkpoints saved in the middle of a window
+LONG_RUNNING_SAMPLES_SIZE = 20
+# splunk-search
+SEARCH_RESULTS_FILE_THRESHOLD = 0  # the results are written to a file only when a threshold is given
+SEARCH_RESULTS_PREVIEW_SIZE = 50
+SEARCH_RESULTS_FILE_NAME = 'splunk_search_results.jsonl'
 
 
 def get_current_splunk_time(splunk_service):
@@ -353,64 +341,109 @@ def update_headers_from_field_names(search_result, chosen_fields):
 def get_current_results_batch(search_job, batch_size, results_offset):
     current_batch_kwargs = {
         "count": batch_size,
-        "offset": results_offset
+        "offset": results_offset,
+        "output_mode": "json"
     }
 
     results_batch = search_job.results(**current_batch_kwargs)
-    return results_batch
+    return results_batch.read()
 
 
 def parse_batch_of_results(current_batch_of_results, max_results_to_add, app):
     parsed_batch_results = []
     batch_dbot_scores = []
-    results_reader = results.ResultsReader(io.BufferedReader(ResponseReaderWrapper(current_batch_of_results)))
-    for item in results_reader:
-        if isinstance(item, results.Message):
-            if "Error in" in item.message:
-                raise ValueError(item.message)
-            parsed_batch_results.append(convert_to_str(item.message))
-
-        elif isinstance(item, dict):
-            if demisto.get(item, 'host'):
-                batch_dbot_scores.append({'Indicator': item['host'], 'Type': 'hostname',
-                                          'Vendor': 'Splunk', 'Score': 0, 'isTypedIndicator': True})
-            if app:
-                item['app'] = app
-            # Normal events are returned as dicts
-            parsed_batch_results.append(item)
-
+    batch = json.loads(current_batch_of_results) if current_batch_of_results else {}
+    for message in batch.get('messages', []):
+        message_text = message.get('text', '')
+        if "Error in" in message_text:
+            raise ValueError(message_text)
+        parsed_batch_results.append(convert_to_str(message_text))
+
+    for item in batch.get('results', []):
         if len(parsed_batch_results) >= max_results_to_add:
             break
+        if demisto.get(item, 'host'):
+            batch_dbot_scores.append({'Indicator': item['host'], 'Type': 'hostname',
+                                      'Vendor': 'Splunk', 'Score': 0, 'isTypedIndicator': True})
+        if app:
+            item['app'] = app
+        parsed_batch_results.append(item)
     return parsed_batch_results, batch_dbot_scores
 
 
+def write_results_to_file(results_file, parsed_results):
+    for result in parsed_results:
+        results_file.write(json.dumps(result) + '\n')
+
+
 def splunk_search_command(service):
     args = demisto.args()
 
     query = build_search_query(args)
     search_kwargs = build_search_kwargs(args)
     search_job = service.jobs.create(query, **search_kwargs)  # type: ignore
-    num_of_results_from_query = search_job["resultCount"]
+    num_of_results_from_query = int(search_job["resultCount"])
 
     results_limit = float(demisto.args().get("event_limit", 100))
     if results_limit == 0.0:
         # In Splunk, a result limit of 0 means no limit.
         results_limit = float("inf")
     batch_size = int(demisto.args().get("batch_limit", 25000))
+    file_threshold = int(demisto.args().get("results_file_threshold", SEARCH_RESULTS_FILE_THRESHOLD))
 
     results_offset = 0
+    num_of_parsed_results = 0
     total_parsed_results = []  # type: List[Dict[str,Any]]
     dbot_scores = []  # type: List[Dict[str,Any]]
+    # once the results exceed the threshold they are streamed to a JSONL file, and only a preview is kept in memory
+    results_file = None
+    results_file_id = None
 
-    while len(total_parsed_results) < int(num_of_results_from_query) and len(total_parsed_results) < results_limit:
-        current_batch_of_results = get_current_results_batch(search_job, batch_size, results_offset)
-        max_results_to_add = results_limit - len(total_parsed_results)
-        parsed_batch_results, batch_dbot_scores = parse_batch_of_results(current_batch_of_results, max_results_to_add,
-                                                                         search_kwargs.get('app', ''))
-        total_parsed_results.extend(parsed_batch_results)
-        dbot_scores.extend(batch_dbot_scores)
-
-        results_offset += batch_size
+    pool = ThreadPool(1)
+    try:
+        next_batch = pool.apply_async(get_current_results_batch, (search_job, batch_size, results_offset))
+        while next_batch is not None:
+            current_batch_of_results = next_batch.get()
+            results_offset += batch_size
+            next_batch = None
+            if results_offset < num_of_results_from_query and results_offset < results_limit:
+                # the next batch is read while the current one is parsed
+                next_batch = pool.apply_async(get_current_results_batch, (search_job, batch_size, results_offset))
+
+            max_results_to_add = results_limit - num_of_parsed_results
+            parsed_batch_results, batch_dbot_scores = parse_batch_of_results(current_batch_of_results, max_results_to_add,
+                                                                             search_kwargs.get('app', ''))
+            num_of_parsed_results += len(parsed_batch_results)
+            if results_file:
+                write_results_to_file(results_file, parsed_batch_results)
+                continue
+
+            total_parsed_results.extend(parsed_batch_results)
+            dbot_scores.extend(batch_dbot_scores)
+            if file_threshold and num_of_parsed_results > file_threshold:
+                results_file_id = demisto.uniqueFile()
+                results_file = open(demisto.investigation()['id'] + '_' + results_file_id, 'w')
+                write_results_to_file(results_file, total_parsed_results)
+                del total_parsed_results[SEARCH_RESULTS_PREVIEW_SIZE:]
+                dbot_scores = []
+    finally:
+        pool.terminate()
+        if results_file:
+            results_file.close()
+
+    if results_file:
+        demisto.results({'Contents': '', 'ContentsFormat': formats['text'], 'Type': entryTypes['file'],
+                         'File': SEARCH_RESULTS_FILE_NAME, 'FileID': results_file_id})
+        human_readable = '{} results were written to the file {}. The first {} results are displayed.\n{}'.format(
+            num_of_parsed_results, SEARCH_RESULTS_FILE_NAME, len(total_parsed_results),
+            build_search_human_readable(args, total_parsed_results))
+        demisto.results({
+            "Type": 1,
+            "Contents": total_parsed_results,
+            "ContentsFormat": "json",
+            "HumanReadable": human_readable
+        })
+        return
 
     entry_context = create_entry_context(args, total_parsed_results, dbot_scores)
     human_readable = build_search_human_readable(args, total_parsed_results)
@@ -468,11 +501,7 @@ def splunk_results_command(service):
         demisto.results({"Type": 1, "ContentsFormat": "json", "Contents": json.dumps(res)})
 
 
-def fetch_incidents(service):
-    last_run = demisto.getLastRun() and demisto.getLastRun()['time']
-    search_offset = demisto.getLastRun().get('offset', 0)
-
-    incidents = []
+def get_fetch_end_time(service):
     current_time_for_fetch = datetime.utcnow()
     dem_params = demisto.params()
     if demisto.get(dem_params, 'timezone'):
@@ -484,6 +513,28 @@ def fetch_incidents(service):
         now = get_current_splunk_time(service)
         current_time_in_splunk = datetime.strptime(now, SPLUNK_TIME_FORMAT)
         current_time_for_fetch = current_time_in_splunk
+    return now, current_time_for_fetch
+
+
+def build_fetch_query(dem_params):
+    searchquery_oneshot = dem_params['fetchQuery']
+
+    if demisto.get(dem_params, 'extractFields'):
+        extractFields = dem_params['extractFields']
+        extra_raw_arr = extractFields.split(',')
+        for field in extra_raw_arr:
+            field_trimmed = field.strip()
+            searchquery_oneshot = searchquery_oneshot + ' | eval ' + field_trimmed + '=' + field_trimmed
+    return searchquery_oneshot
+
+
+def fetch_incidents(service):
+    last_run = demisto.getLastRun() and demisto.getLastRun()['time']
+    search_offset = demisto.getLastRun().get('offset', 0)
+
+    incidents = []
+    dem_params = demisto.params()
+    now, current_time_for_fetch = get_fetch_end_time(service)
 
     if len(last_run) == 0:
         fetch_time_in_minutes = parse_time_to_minutes()
@@ -496,14 +547,7 @@ def fetch_incidents(service):
     kwargs_oneshot = {earliest_fetch_time_fieldname: last_run,
                       latest_fetch_time_fieldname: now, "count": FETCH_LIMIT, 'offset': search_offset}
 
-    searchquery_oneshot = dem_params['fetchQuery']
-
-    if demisto.get(dem_params, 'extractFields'):
-        extractFields = dem_params['extractFields']
-        extra_raw_arr = extractFields.split(',')
-        for field in extra_raw_arr:
-            field_trimmed = field.strip()
-            searchquery_oneshot = searchquery_oneshot + ' | eval ' + field_trimmed + '=' + field_trimmed
+    searchquery_oneshot = build_fetch_query(dem_params)
 
     oneshotsearch_results = service.jobs.oneshot(searchquery_oneshot, **kwargs_oneshot)  # type: ignore
     reader = results.ResultsReader(oneshotsearch_results)
@@ -518,6 +562,109 @@ def fetch_incidents(service):
         demisto.setLastRun({'time': last_run, 'offset': search_offset + FETCH_LIMIT})
 
 
+def get_notable_id(notable):
+    """
+    Returns the ID used to dedupe the notables fetched by the long running fetch.
+    """
+    if notable.get('event_id'):
+        return notable['event_id']
+    raw = u'{}{}'.format(notable.get('_time', ''), notable.get('_raw') or json.dumps(notable, sort_keys=True))
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def export_notables(service, query, earliest, latest):
+    """
+    Runs an export search over the window, which streams the results while the search is running instead of waiting
+    for a job to finish and paging through its results.
+    """
+    dem_params = demisto.params()
+    kwargs_export = {
+        dem_params.get("earliest_fetch_time_fieldname", "earliest_time"): earliest,
+        dem_params.get("latest_fetch_time_fieldname", "latest_time"): latest,
+        'search_mode': 'normal'
+    }
+    stream = service.jobs.export(query, **kwargs_export)  # type: ignore
+    for item in results.ResultsReader(stream):
+        if isinstance(item, results.Message):
+            demisto.debug('Splunk export search message: {}'.format(item.message))
+        elif isinstance(item, dict):
+            yield item
+
+
+def fetch_notables_window(service):
+    """
+    Fetches the notables from the checkpoint stored in the integration context to the current time, and creates
+    incidents from them in batches of LONG_RUNNING_BATCH_SIZE while the results are streamed.
+    The checkpoint holds the IDs of the fetched notables, so a window interrupted in the middle resumes without
+    refetching the notables saved in it. It is saved every LONG_RUNNING_CHECKPOINT_INTERVAL seconds while the window
+    is fetched and at its end, so the incidents are created at least once: the notables created after the last saved
+    checkpoint of an interrupted window are created again.
+    """
+    context = get_integration_context()
+    latest, current_time_for_fetch = get_fetch_end_time(service)
+    earliest = context.get('time')
+    if not earliest:
+        start_time_for_fetch = current_time_for_fetch - timedelta(minutes=parse_time_to_minutes())
+        earliest = start_time_for_fetch.strftime(SPLUNK_TIME_FORMAT)
+
+    # kept in insertion order, so trimming from the beginning drops the oldest IDs
+    seen_ids = OrderedDict((notable_id, None) for notable_id in context.get('seen_ids', []))
+
+    def checkpoint(checkpoint_time):
+        while len(seen_ids) > LONG_RUNNING_MAX_SEEN_IDS:
+            seen_ids.popitem(last=False)
+        context.update({'time': checkpoint_time, 'seen_ids': list(seen_ids.keys())})
+        set_integration_context(context)
+
+    last_checkpoint = [time.time()]
+
+    def create_incidents(incidents):
+        demisto.createIncidents(incidents)
+        context['samples'] = incidents[:LONG_RUNNING_SAMPLES_SIZE]
+        if time.time() - last_checkpoint[0] >= LONG_RUNNING_CHECKPOINT_INTERVAL:
+            checkpoint(earliest)
+            last_checkpoint[0] = time.time()
+
+    batch = []  # type: List[Dict[str, Any]]
+    fetched = 0
+    for notable in export_notables(service, build_fetch_query(demisto.params()), earliest, latest):
+        notable_id = get_notable_id(notable)
+        if notable_id in seen_ids:
+            continue
+        seen_ids[notable_id] = None
+        batch.append(notable_to_incident(notable))
+        fetched += 1
+        if len(batch) >= LONG_RUNNING_BATCH_SIZE:
+            create_incidents(batch)
+            batch = []
+
+    if batch:
+        create_incidents(batch)
+
+    checkpoint(latest)
+    demisto.debug('Fetched {} notables between {} and {}'.format(fetched, earliest, latest))
+
+
+def long_running_main(service):
+    """
+    Keeps the Splunk session open and fetches the notables in consecutive windows.
+    """
+    while True:
+        try:
+            fetch_notables_window(service)
+        except HTTPError as error:
+            demisto.error('Failed fetching notables: {}'.format(str(error)))
+            if error.status == 401:
+                service.login()  # the session expired
+        except Exception as error:
+            demisto.error('Failed fetching notables: {}'.format(str(error)))
+        time.sleep(LONG_RUNNING_FETCH_INTERVAL)
+
+
+def fetch_incidents_long_running_samples():
+    return get_integration_context().get('samples', [])
+
+
 def parse_time_to_minutes():
     """
     Calculate how much time to fetch back in minutes
@@ -1118,7 +1265,12 @@ def main():
     if demisto.command() == 'splunk-results':
         splunk_results_command(service)
     if demisto.command() == 'fetch-incidents':
-        fetch_incidents(service)
+        if demisto.params().get('longRunning'):
+            demisto.incidents(fetch_incidents_long_running_samples())
+        else:
+            fetch_incidents(service)
+    if demisto.command() == 'long-running-execution':
+        long_running_main(service)
     if demisto.command() == 'splunk-get-indexes':
         splunk_get_indexes_command(service)
     if demisto.command() == 'splunk-submit-event':
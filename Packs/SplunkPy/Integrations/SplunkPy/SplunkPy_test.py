@@ -1,3 +1,4 @@
+import json
 from copy import deepcopy
 import pytest
 import SplunkPy as splunk
@@ -276,6 +277,86 @@ def test_commands(search_result, chosen_fields, expected_result):
     assert expected_result == headers
 
 
+class SearchJob:
+    def __init__(self, num_of_results):
+        self.rows = [{'host': 'host{}'.format(i), 'index': str(i)} for i in range(num_of_results)]
+        self.requested_offsets = []
+
+    def __getitem__(self, item):
+        return str(len(self.rows))
+
+    def results(self, count, offset, output_mode):
+        assert output_mode == 'json'
+        self.requested_offsets.append(offset)
+
+        class Response:
+            def read(_):
+                return json.dumps({'messages': [], 'results': self.rows[offset:offset + count]})
+        return Response()
+
+
+def mock_search(mocker, search_job, args):
+    service = mocker.Mock()
+    service.jobs.create.return_value = search_job
+    mocker.patch.object(demisto, 'args', return_value=dict(args, query='index=main'))
+    mocker.patch.object(demisto, 'results')
+    return service
+
+
+def test_splunk_search_command_paging(mocker):
+    """
+    Given:
+        - A search with 25 results and a batch size of 10.
+    When:
+        - Running the splunk-search command without an events limit.
+    Then:
+        - All the batches are read in JSON output mode and the results are returned to the context.
+    """
+    search_job = SearchJob(25)
+    service = mock_search(mocker, search_job, {'event_limit': '0', 'batch_limit': '10'})
+
+    splunk.splunk_search_command(service)
+
+    assert search_job.requested_offsets == [0, 10, 20]
+    entry = demisto.results.call_args[0][0]
+    assert entry['EntryContext']['Splunk.Result'] == search_job.rows
+    assert len(entry['EntryContext']['DBotScore']) == 25
+
+
+def test_splunk_search_command_results_file(mocker, tmpdir):
+    """
+    Given:
+        - A search with 25 results and a results file threshold of 15.
+    When:
+        - Running the splunk-search command without an events limit.
+    Then:
+        - All the results are written to a JSONL file entry.
+        - Only a preview of the results is returned to the War Room, without context.
+    """
+    tmpdir.chdir()
+    search_job = SearchJob(25)
+    service = mock_search(mocker, search_job, {'event_limit': '0', 'batch_limit': '10',
+                                               'results_file_threshold': '15'})
+    mocker.patch.object(splunk, 'SEARCH_RESULTS_PREVIEW_SIZE', 5)
+    mocker.patch.object(demisto, 'uniqueFile', return_value='file_id')
+    mocker.patch.object(demisto, 'investigation', return_value={'id': 'inv'})
+
+    splunk.splunk_search_command(service)
+
+    file_entry, results_entry = [call[0][0] for call in demisto.results.call_args_list]
+    assert file_entry['FileID'] == 'file_id'
+    with open('inv_file_id') as results_file:
+        assert [json.loads(line) for line in results_file] == search_job.rows
+    assert results_entry['Contents'] == search_job.rows[:5]
+    assert 'EntryContext' not in results_entry
+
+
+def test_parse_batch_of_results_error_message():
+    batch = json.dumps({'messages': [{'type': 'FATAL', 'text': 'Error in search'}], 'results': []})
+    with pytest.raises(ValueError, match='Error in search'):
+        splunk.parse_batch_of_results(batch, 10, '')
+
+
 APPS = ['app']
 STORES = ['store']
 EMPTY_CASE = {}
@@ -439,6 +520,102 @@ def test_fetch_incidents(mocker):
                                    "Recurring Malware Infection - Rule"
 
 
+def test_fetch_notables_window(mocker):
+    """
+    Given:
+        - A checkpoint holding the ID of a notable that was already fetched.
+        - An export search that returns that notable and 5 new ones.
+    When:
+        - Fetching the notables window in the long running fetch.
+    Then:
+        - Incidents are created in batches, only for the new notables.
+        - The checkpoint is moved to the end of the window and holds the fetched IDs.
+    """
+    notables = [dict(SAMPLE_RESPONSE[0], event_id='id{}'.format(i)) for i in range(6)]
+    mocker.patch.object(splunk, 'LONG_RUNNING_BATCH_SIZE', 2)
+    mocker.patch.object(demisto, 'params', return_value={'fetchQuery': 'something'})
+    mocker.patch.object(demisto, 'createIncidents')
+    mocker.patch.object(splunk, 'get_fetch_end_time', return_value=('2018-10-24T15:00:00', None))
+    mocker.patch.object(splunk, 'get_integration_context', return_value={'time': '2018-10-24T14:00:00',
+                                                                         'seen_ids': ['id0']})
+    set_context_mock = mocker.patch.object(splunk, 'set_integration_context')
+    export_mock = mocker.patch.object(splunk, 'export_notables', return_value=iter(notables))
+
+    splunk.fetch_notables_window(None)
+
+    assert export_mock.call_args[0][2:] == ('2018-10-24T14:00:00', '2018-10-24T15:00:00')
+    assert [len(call[0][0]) for call in demisto.createIncidents.call_args_list] == [2, 2, 1]
+    context = set_context_mock.call_args[0][0]
+    assert context['time'] == '2018-10-24T15:00:00'
+    assert context['seen_ids'] == ['id{}'.format(i) for i in range(6)]
+    # the window is fetched within the checkpoint interval, so the context is saved only at its end
+    assert set_context_mock.call_count == 1
+
+
+def test_fetch_notables_window_checkpoint_interval(mocker):
+    """
+    Given:
+        - A checkpoint interval which passes before every batch.
+    When:
+        - Fetching the notables window in the long running fetch.
+    Then:
+        - A checkpoint with the start of the window is saved after each batch, and the end of the window at the end.
+    """
+    notables = [dict(SAMPLE_RESPONSE[0], event_id='id{}'.format(i)) for i in range(4)]
+    mocker.patch.object(splunk, 'LONG_RUNNING_BATCH_SIZE', 2)
+    mocker.patch.object(splunk, 'LONG_RUNNING_CHECKPOINT_INTERVAL', 0)
+    mocker.patch.object(demisto, 'params', return_value={'fetchQuery': 'something'})
+    mocker.patch.object(demisto, 'createIncidents')
+    mocker.patch.object(splunk, 'get_fetch_end_time', return_value=('2018-10-24T15:00:00', None))
+    mocker.patch.object(splunk, 'get_integration_context', return_value={'time': '2018-10-24T14:00:00'})
+    checkpoint_times = []
+    mocker.patch.object(splunk, 'set_integration_context',
+                        side_effect=lambda context: checkpoint_times.append(context['time']))
+    mocker.patch.object(splunk, 'export_notables', return_value=iter(notables))
+
+    splunk.fetch_notables_window(None)
+
+    assert checkpoint_times == ['2018-10-24T14:00:00', '2018-10-24T14:00:00', '2018-10-24T15:00:00']
+
+
+def test_get_notable_id():
+    """
+    Given:
+        - Notables without an event ID, with the same raw event at different times.
+    When:
+        - Getting the IDs used to dedupe the notables.
+    Then:
+        - The event ID is used when it exists, and otherwise the IDs are different.
+    """
+    assert splunk.get_notable_id({'event_id': 'id1', '_raw': 'raw'}) == 'id1'
+    first_id = splunk.get_notable_id({'_raw': 'raw', '_time': '2018-10-24T14:00:00', '_cd': '1:1'})
+    second_id = splunk.get_notable_id({'_raw': 'raw', '_time': '2018-10-24T14:01:00', '_cd': '1:1'})
+    assert first_id != second_id
+
+
+def test_fetch_notables_window_seen_ids_bounded(mocker):
+    """
+    Given:
+        - More new notables than the number of IDs kept in the checkpoint.
+    When:
+        - Fetching the notables window in the long running fetch.
+    Then:
+        - Only the newest IDs are kept in the checkpoint.
+    """
+    notables = [dict(SAMPLE_RESPONSE[0], event_id='id{}'.format(i)) for i in range(5)]
+    mocker.patch.object(splunk, 'LONG_RUNNING_MAX_SEEN_IDS', 3)
+    mocker.patch.object(demisto, 'params', return_value={'fetchQuery': 'something'})
+    mocker.patch.object(demisto, 'createIncidents')
+    mocker.patch.object(splunk, 'get_fetch_end_time', return_value=('2018-10-24T15:00:00', None))
+    mocker.patch.object(splunk, 'get_integration_context', return_value={'time': '2018-10-24T14:00:00'})
+    set_context_mock = mocker.patch.object(splunk, 'set_integration_context')
+    mocker.patch.object(splunk, 'export_notables', return_value=iter(notables))
+
+    splunk.fetch_notables_window(None)
+
+    assert set_context_mock.call_args[0][0]['seen_ids'] == ['id2', 'id3', 'id4']
+
+
 SPLUNK_RESULTS = [
     {
         "rawJSON":
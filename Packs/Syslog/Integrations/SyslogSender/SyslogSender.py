@@ -3,12 +3,13 @@ from CommonServerPython import *
 from CommonServerUserPython import *
 ''' IMPORTS '''
 
-from contextlib import contextmanager
+import select
+import socket
 from logging.handlers import SysLogHandler
 from distutils.util import strtobool
-from logging import Logger, getLogger, INFO, DEBUG, WARNING, ERROR, CRITICAL
-from socket import SOCK_STREAM
-from typing import Union, Tuple, Dict, Any, Generator
+from logging import getLevelName, INFO, DEBUG, WARNING, ERROR, CRITICAL
+from socket import SOCK_STREAM, SOCK_DGRAM
+from typing import Union, Tuple, Dict, List, Optional
 
 ''' CONSTANTS '''
 
@@ -54,15 +55,125 @@ SEVERITY_DICT = {
 
 TCP = 'tcp'
 UDP = 'udp'
+UNIX = 'unix'
 PROTOCOLS = {TCP, UDP}
+# the max number of bytes of the framed messages sent in a single write over TCP
+MAX_WRITE_SIZE = 65536
+CONNECT_RETRIES = 3
+CONNECT_BACKOFF_SECONDS = 1
+# connections which were not used for longer than this are reopened
+CONNECTION_IDLE_TIMEOUT_SECONDS = 300
+SYSLOG_CONNECTIONS_CACHE = 'syslog_connections'
 
 ''' Syslog Manager '''
 
 
+class SyslogConnection:
+    def __init__(self, address: str, port: int, protocol: str):
+        """
+        A connection to a syslog server, which is kept open between the writes.
+        :param address: The IP address of the syslog server, or the path of the unix socket.
+        :param port: The port of the syslog server.
+        :param protocol: The messaging protocol (TCP / UDP / unix).
+        """
+        self.address = address
+        self.port = port
+        self.protocol = protocol
+        self.socket: Optional[socket.socket] = None
+        self.last_used = 0.0
+
+    def connect(self):
+        """
+        Open the connection, retrying with an exponential backoff.
+        """
+        self.close()
+        for attempt in range(CONNECT_RETRIES):
+            try:
+                self.socket = self._create_socket()
+                self.last_used = time.time()
+                return
+            except OSError:
+                if attempt == CONNECT_RETRIES - 1:
+                    raise
+                time.sleep(CONNECT_BACKOFF_SECONDS * 2 ** attempt)
+
+    def _create_socket(self) -> socket.socket:
+        if self.protocol == UNIX:
+            try:
+                sock = socket.socket(socket.AF_UNIX, SOCK_DGRAM)
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                sock = socket.socket(socket.AF_UNIX, SOCK_STREAM)
+                sock.connect(self.address)
+            return sock
+        socktype = SOCK_STREAM if self.protocol == TCP else SOCK_DGRAM
+        family, _, proto, _, sockaddr = socket.getaddrinfo(self.address, self.port, 0, socktype)[0]
+        sock = socket.socket(family, socktype, proto)
+        try:
+            sock.connect(sockaddr)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def is_open(self) -> bool:
+        """
+        Check whether the connection can be used, a syslog server does not send data, so a readable stream socket was
+        closed by the server.
+        """
+        if self.socket is None or time.time() - self.last_used > CONNECTION_IDLE_TIMEOUT_SECONDS:
+            return False
+        if self.socket.type == SOCK_STREAM:
+            try:
+                readable, _, _ = select.select([self.socket], [], [], 0)
+                if readable and not self.socket.recv(1, socket.MSG_PEEK):
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def write(self, frames: List[bytes]):
+        """
+        Write the framed messages, several messages per write over a stream socket and a message per datagram.
+        :param frames: The framed messages.
+        """
+        if not self.is_open():
+            self.connect()
+        try:
+            self._write(frames)
+        except OSError:
+            # the connection may have been closed since it was last used
+            self.connect()
+            self._write(frames)
+        self.last_used = time.time()
+
+    def _write(self, frames: List[bytes]):
+        if self.socket.type == SOCK_STREAM:  # type: ignore[union-attr]
+            chunk: List[bytes] = []
+            chunk_size = 0
+            for frame in frames:
+                if chunk and chunk_size + len(frame) > MAX_WRITE_SIZE:
+                    self.socket.sendall(b''.join(chunk))  # type: ignore[union-attr]
+                    chunk, chunk_size = [], 0
+                chunk.append(frame)
+                chunk_size += len(frame)
+            if chunk:
+                self.socket.sendall(b''.join(chunk))  # type: ignore[union-attr]
+        else:
+            for frame in frames:
+                self.socket.send(frame)  # type: ignore[union-attr]
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+
 class SyslogManager:
     def __init__(self, address: str, port: int, protocol: str, logging_level: int, facility: int):
         """
-        Class for managing instances of a syslog logger.
+        Class for managing the connections to a syslog server.
         :param address: The IP address of the syslog server.
         :param port: The port of the syslog server.
         :param protocol: The messaging protocol (TCP / UDP).
@@ -74,50 +185,36 @@ class SyslogManager:
         self.logging_level = logging_level
         self.facility = facility
 
-    @contextmanager  # type: ignore[misc, arg-type]
-    def get_logger(self) -> Generator:
+    def get_connection(self) -> SyslogConnection:
         """
-        Get a new instance of a syslog logger.
-        :return: syslog logger
+        Get the open connection to the syslog server, or a new one if there is none.
+        :return: syslog connection
         """
-        handler = self._get_handler()
-        syslog_logger = self._init_logger(handler)
-        try:
-            yield syslog_logger
-        finally:
-            syslog_logger.removeHandler(handler)
-            handler.close()
+        connections: Dict[Tuple[str, int, str], SyslogConnection] = get_process_cache(SYSLOG_CONNECTIONS_CACHE)
+        key = (self.address, self.port, self.protocol)
+        if key not in connections:
+            connections[key] = SyslogConnection(self.address, self.port, self.protocol)
+        return connections[key]
 
-    def _get_handler(self) -> SysLogHandler:
+    def frame(self, message: str, log_level: str) -> bytes:
         """
-        Get a syslog handler for a logger according to provided parameters.
-        :return: syslog handler
+        Frame a message as the syslog handler of the logging module does.
+        :param message: The message to frame
+        :param log_level: The logging level
+        :return: The framed message
         """
-        address: Union[str, Tuple[str, int]] = (self.address, self.port)
-        kwargs: Dict[str, Any] = {
-            'facility': self.facility
-        }
-
-        if self.protocol == TCP:
-            kwargs['socktype'] = SOCK_STREAM
-        elif self.protocol == 'unix':
-            address = self.address
-
-        kwargs['address'] = address
+        priority = SysLogHandler.priority_names[SysLogHandler.priority_map[log_level]]
+        return f'<{(self.facility << 3) | priority}>{message}\000'.encode('utf-8')
 
-        return SysLogHandler(**kwargs)
-
-    def _init_logger(self, handler: SysLogHandler) -> Logger:
+    def send(self, messages: List[str], log_level: str):
         """
-        Initialize a logger with a syslog handler.
-        :param handler: A syslog handler
-        :return: A syslog logger
+        Send messages to syslog over the open connection, if the log level is enabled.
+        :param messages: The messages to send
+        :param log_level: The logging level
         """
-        syslog_logger = getLogger('SysLogLogger')
-        syslog_logger.setLevel(self.logging_level)
-        syslog_logger.addHandler(handler)
-
-        return syslog_logger
+        if getLevelName(log_level) < self.logging_level:
+            return
+        self.get_connection().write([self.frame(message, log_level) for message in messages])
 
 
 ''' HELPER FUNCTIONS '''
@@ -143,24 +240,16 @@ def init_manager(params: dict) -> SyslogManager:
     return SyslogManager(address, port, protocol, logging_level, facility)
 
 
-def send_log(manager: SyslogManager, message: str, log_level: str):
+def send_log(manager: SyslogManager, message: Union[str, List[str]], log_level: str):
     """
-    Use a syslog manager to get a logger and send a message to syslog.
+    Use a syslog manager to send messages to syslog.
     :param manager: The syslog manager
-    :param message: The message to send
+    :param message: The message to send, or a list of messages
     :param log_level: The logging level
     """
-    with manager.get_logger() as syslog_logger:   # type: Logger
-        if log_level == 'DEBUG':
-            syslog_logger.debug(message)
-        if log_level == 'INFO':
-            syslog_logger.info(message)
-        if log_level == 'WARNING':
-            syslog_logger.warning(message)
-        if log_level == 'ERROR':
-            syslog_logger.error(message)
-        if log_level == 'CRITICAL':
-            syslog_logger.critical(message)
+    if log_level not in SysLogHandler.priority_map:
+        return
+    manager.send(message if isinstance(message, list) else [message], log_level)
 
 
 def mirror_investigation():
@@ -243,12 +332,15 @@ def syslog_send_notification(manager: SyslogManager, min_severity: int):
 
 
 def syslog_send(manager):
-    message = demisto.args().get('message', '')
+    messages = argToList(demisto.args().get('messages'))
     log_level = demisto.args().get('level', 'INFO')
 
-    send_log(manager, message, log_level)
-
-    demisto.results('Message sent to Syslog successfully.')
+    if messages:
+        send_log(manager, [str(message) for message in messages], log_level)
+        demisto.results(f'{len(messages)} messages sent to Syslog successfully.')
+    else:
+        send_log(manager, demisto.args().get('message', ''), log_level)
+        demisto.results('Message sent to Syslog successfully.')
 
 
 ''' MAIN '''
@@ -260,8 +352,7 @@ def main():
     try:
         if demisto.command() == 'test-module':
             syslog_manager = init_manager(demisto.params())
-            with syslog_manager.get_logger() as syslog_logger:  # type: Logger
-                syslog_logger.info('This is a test')
+            syslog_manager.send(['This is a test'], 'INFO')
             demisto.results('ok')
         elif demisto.command() == 'mirror-investigation':
             mirror_investigation()
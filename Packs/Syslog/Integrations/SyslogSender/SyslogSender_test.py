@@ -1,6 +1,6 @@
 from CommonServerPython import *
 import pytest
-from contextlib import contextmanager
+import socket
 
 
 class Logger:
@@ -21,12 +21,34 @@ class Logger:
 
 
 class Manager:
-    @contextmanager
-    def get_logger(self):
-        try:
-            yield Logger()
-        finally:
-            pass
+    def send(self, messages, log_level):
+        logger = Logger()
+        for message in messages:
+            getattr(logger, log_level.lower())(message)
+
+
+@pytest.fixture
+def syslog_server():
+    """
+    A TCP syslog server, which is closed at the end of the test along with the kept connections.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(5)
+    server.settimeout(5)
+    yield server
+    connections = get_process_cache('syslog_connections')
+    for connection in connections.values():
+        connection.close()
+    connections.clear()
+    server.close()
+
+
+def receive_frames(connection, count):
+    data = b''
+    while data.count(b'\000') < count:
+        data += connection.recv(65536)
+    return data.split(b'\000')[:-1]
 
 
 def test_init_manager():
@@ -166,3 +188,91 @@ def test_send_with_non_default_log_level(mocker):
     assert debug_send_args[0] == '1, eyy https://www.eizelulz.com:8443/#/WarRoom/727'
     assert not info_send_args
     assert results == 'Message sent to Syslog successfully.'
+
+
+def test_send_over_kept_connection(syslog_server):
+    """
+    Given:
+        - A TCP syslog manager with the WARNING logging level.
+    When:
+        - Sending several batches of messages, and an INFO message.
+    Then:
+        - The messages are sent over a single connection, framed with their priority, and the INFO message is dropped.
+    """
+    from SyslogSender import init_manager
+
+    params = {'address': '127.0.0.1', 'port': syslog_server.getsockname()[1], 'protocol': 'tcp',
+              'priority': 'LOG_WARNING', 'facility': 'LOG_USER'}
+    init_manager(params).send(['first', 'second'], 'WARNING')
+    init_manager(params).send(['dropped'], 'INFO')
+    init_manager(params).send(['third'], 'ERROR')
+    connection, _ = syslog_server.accept()
+    assert receive_frames(connection, 3) == [b'<12>first', b'<12>second', b'<11>third']
+    connection.close()
+
+
+def test_send_reconnects(syslog_server):
+    """
+    Given:
+        - A kept TCP connection which was closed by the syslog server.
+    When:
+        - Sending a message.
+    Then:
+        - The message is sent over a new connection.
+    """
+    from SyslogSender import init_manager
+
+    params = {'address': '127.0.0.1', 'port': syslog_server.getsockname()[1], 'protocol': 'tcp'}
+    init_manager(params).send(['first'], 'INFO')
+    connection, _ = syslog_server.accept()
+    assert receive_frames(connection, 1) == [b'<46>first']
+    connection.close()
+
+    init_manager(params).send(['second'], 'INFO')
+    connection, _ = syslog_server.accept()
+    assert receive_frames(connection, 1) == [b'<46>second']
+    connection.close()
+
+
+def test_syslog_send_messages(mocker):
+    """
+    Given:
+        - A list of messages.
+    When:
+        - Running the syslog-send command.
+    Then:
+        - All of the messages are sent together.
+    """
+    from SyslogSender import syslog_send
+
+    mocker.patch.object(demisto, 'args', return_value={'messages': '["a, b", "c"]', 'level': 'INFO'})
+    mocker.patch.object(demisto, 'results')
+    send = mocker.patch.object(Manager, 'send')
+
+    syslog_send(Manager())
+    assert send.call_args[0] == (['a, b', 'c'], 'INFO')
+    assert demisto.results.call_args[0][0] == '2 messages sent to Syslog successfully.'
+
+
+@pytest.mark.parametrize('messages, expected', [
+    ('[ERROR] disk full', ['[ERROR] disk full']),
+    ('a,b', ['a', 'b']),
+    (['[ERROR] disk full'], ['[ERROR] disk full']),
+])
+def test_syslog_send_messages_list(mocker, messages, expected):
+    """
+    Given:
+        - Messages as a comma separated string or a list, including a message starting with '['.
+    When:
+        - Running the syslog-send command.
+    Then:
+        - The messages are split like any other list argument.
+    """
+    from SyslogSender import syslog_send
+
+    mocker.patch.object(demisto, 'args', return_value={'messages': messages})
+    mocker.patch.object(demisto, 'results')
+    send = mocker.patch.object(Manager, 'send')
+
+    syslog_send(Manager())
+    assert send.call_args[0] == (expected, 'INFO')
@@ -7,8 +7,16 @@ import sys
 from codecs import encode, decode
 import socks
 import errno
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 SHOULD_ERROR = demisto.params().get('with_error', False)
+MAX_WORKERS = int(demisto.params().get('max_workers') or 10)
+PER_SERVER_LIMIT = int(demisto.params().get('per_server_limit') or 2)
+CACHE_TTL_MINUTES = int(demisto.params().get('cache_ttl', 1440) or 0)
+CACHE_MAX_ENTRIES = 500
+WHOIS_CACHE_KEY = 'whois_cache'
 
 # flake8: noqa
 
@@ -7216,7 +7224,18 @@ def get_whois_raw(domain, server="", previous=None, rfc3490=True, never_cut=Fals
         return new_list
 
 
+# Every dble_ext entry is a two-label suffix, so the root server only depends on the last two labels of the domain.
+root_server_cache = {}  # type: dict
+
+
 def get_root_server(domain):
+    cache_key = ".".join(domain.split(".")[-2:])
+    if cache_key not in root_server_cache:
+        root_server_cache[cache_key] = find_root_server(domain)
+    return root_server_cache[cache_key]
+
+
+def find_root_server(domain):
     ext = domain.split(".")[-1]
     for dble in dble_ext:
         if domain.endswith(dble):
@@ -7235,12 +7254,7 @@ def get_root_server(domain):
                     }
                 },
             })
-            if SHOULD_ERROR:
-                return_error('The domain - {} - is not supported by the Whois service'.format(domain),
-                             outputs=context)
-            else:
-                return_warning('The domain - {} - is not supported by the Whois service'.format(domain),
-                               exit=True, outputs=context)
+            raise WhoisQueryFailed('The domain - {} - is not supported by the Whois service'.format(domain), context)
 
         return host
 
@@ -7248,7 +7262,24 @@ def get_root_server(domain):
         raise WhoisException("No root WHOIS server found for domain.")
 
 
+server_semaphores = {}  # type: dict
+server_semaphores_lock = threading.Lock()
+
+
+def get_server_semaphore(server):
+    """Returns the semaphore capping the number of concurrent queries sent to a single WHOIS server"""
+    with server_semaphores_lock:
+        if server not in server_semaphores:
+            server_semaphores[server] = threading.BoundedSemaphore(PER_SERVER_LIMIT)
+        return server_semaphores[server]
+
+
 def whois_request(domain, server, port=43):
+    with get_server_semaphore(server):
+        return send_whois_request(domain, server, port)
+
+
+def send_whois_request(domain, server, port=43):
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
         sock.connect((server, port))
@@ -7261,12 +7292,7 @@ def whois_request(domain, server, port=43):
                 }
             },
         })
-
-        if SHOULD_ERROR:
-            return_error("Whois returned - Couldn't connect with the socket-server: {}".format(msg), outputs=context)
-        else:
-            return_warning("Whois returned - Couldn't connect with the socket-server: {}".format(msg),
-                           exit=True, outputs=context)
+        raise WhoisQueryFailed("Whois returned - Couldn't connect with the socket-server: {}".format(msg), context)
 
     else:
         sock.send(("%s\r\n" % domain).encode("utf-8"))
@@ -7298,6 +7324,14 @@ class WhoisException(Exception):
     pass
 
 
+class WhoisQueryFailed(Exception):
+    """ Raised when a domain could not be queried, with the context marking its query as failed """
+
+    def __init__(self, message, outputs):
+        super(WhoisQueryFailed, self).__init__(message)
+        self.outputs = outputs
+
+
 def precompile_regexes(source, flags=0):
     return [re.compile(regex, flags) for regex in source]
 
@@ -8255,6 +8289,93 @@ def get_whois(domain, normalized=None):
 
 # Drops the mic disable-secrets-detection-end
 
+def serialize_whois_result(data):
+    """ Converts the datetime objects of a parsed whois result so it can be stored in the integration context """
+    if isinstance(data, datetime):
+        return {'$date': data.strftime('%Y-%m-%dT%H:%M:%S')}
+    if isinstance(data, dict):
+        return {key: serialize_whois_result(val) for key, val in data.items()}
+    if isinstance(data, list):
+        return [serialize_whois_result(val) for val in data]
+    return data
+
+
+def deserialize_whois_result(data):
+    """ Reverts serialize_whois_result """
+    if isinstance(data, dict):
+        if list(data.keys()) == ['$date']:
+            return datetime.strptime(data['$date'], '%Y-%m-%dT%H:%M:%S')
+        return {key: deserialize_whois_result(val) for key, val in data.items()}
+    if isinstance(data, list):
+        return [deserialize_whois_result(val) for val in data]
+    return data
+
+
+def load_whois_cache():
+    """
+    Loads the cached whois results from the integration context, dropping expired entries.
+    Returns the cache and the domains stored in the integration context, so it is saved only when it changed.
+    """
+    if CACHE_TTL_MINUTES <= 0:
+        return {}, set()
+    min_timestamp = time.time() - CACHE_TTL_MINUTES * 60
+    stored_cache = get_integration_context().get(WHOIS_CACHE_KEY) or {}
+    cache = {domain: entry for domain, entry in stored_cache.items() if entry.get('timestamp', 0) > min_timestamp}
+    return cache, set(stored_cache.keys())
+
+
+def save_whois_cache(cache, stored_domains):
+    """
+    Stores the newest CACHE_MAX_ENTRIES whois results in the integration context, when entries were added or expired.
+    A failure to store the cache is logged, so it doesn't fail a command whose queries succeeded.
+    """
+    if CACHE_TTL_MINUTES <= 0 or set(cache.keys()) == stored_domains:
+        return
+    newest = sorted(cache.items(), key=lambda item: item[1]['timestamp'], reverse=True)[:CACHE_MAX_ENTRIES]
+    try:
+        integration_context = get_integration_context()
+        integration_context[WHOIS_CACHE_KEY] = dict(newest)
+        set_integration_context(integration_context)
+    except Exception as e:
+        demisto.error('Failed to store the whois cache: {}'.format(str(e)))
+
+
+def get_whois_cached(domain, cache):
+    """ Returns the parsed whois result of the domain, querying the whois servers only on a cache miss """
+    key = domain.lower()
+    entry = cache.get(key)
+    if entry:
+        return deserialize_whois_result(entry['result'])
+    whois_result = get_whois(domain)
+    cache[key] = {'timestamp': time.time(), 'result': serialize_whois_result(whois_result)}
+    return whois_result
+
+
+def get_whois_safe(domain_and_cache):
+    domain, cache = domain_and_cache
+    try:
+        return get_whois_cached(domain, cache), None
+    except Exception as e:
+        return None, e
+
+
+def get_whois_bulk(domains, cache):
+    """
+    Queries the whois servers for several domains concurrently, at most PER_SERVER_LIMIT queries per server.
+    Returns a dict of the domain to a tuple of its whois result and the exception raised while querying it.
+    """
+    unique_domains = list(OrderedDict.fromkeys(domains))
+    if not unique_domains:
+        return {}
+    pool = ThreadPool(min(MAX_WORKERS, len(unique_domains)))
+    try:
+        results = pool.map(get_whois_safe, [(domain, cache) for domain in unique_domains])
+    finally:
+        pool.close()
+        pool.join()
+    return dict(zip(unique_domains, results))
+
+
 def get_domain_from_query(query):
     # checks for largest matching suffix inside tlds dictionary
     suffix_len = max([len(suffix) for suffix in tlds if query.endswith('.{}'.format(suffix))] or [0])
@@ -8363,10 +8484,35 @@ def create_outputs(whois_result, domain, query=None):
 '''COMMANDS'''
 
 
+def return_whois_failures(failures):
+    """
+    Returns a single entry for the domains which could not be queried, in the order of the domains. It is an error
+    entry when the with_error parameter is set or an unexpected error occurred, and a warning entry otherwise.
+    """
+    message = '\n'.join(str(failure) for failure in failures)
+    failed_domains = [failure.outputs[outputPaths['domain']] for failure in failures
+                      if isinstance(failure, WhoisQueryFailed)]
+    outputs = {outputPaths['domain']: failed_domains} if failed_domains else None
+    if SHOULD_ERROR or len(failed_domains) < len(failures):
+        return_error(message, outputs=outputs)
+    else:
+        return_warning(message, exit=True, outputs=outputs)
+
+
 def domain_command():
-    domains = demisto.args().get('domain', [])
-    for domain in argToList(domains):
-        whois_result = get_whois(domain)
+    domains = argToList(demisto.args().get('domain', []))
+    cache, stored_domains = load_whois_cache()
+    results = get_whois_bulk(domains, cache)
+    save_whois_cache(cache, stored_domains)
+    failures = []
+    reported_failures = set()
+    for domain in domains:
+        whois_result, error = results[domain]
+        if error is not None:
+            if domain not in reported_failures:
+                reported_failures.add(domain)
+                failures.append(error)
+            continue
         md, standard_ec, dbot_score = create_outputs(whois_result, domain)
         demisto.results({
             'Type': entryTypes['note'],
@@ -8379,12 +8525,19 @@ def domain_command():
                     dbot_score
             }
         })
+    if failures:
+        return_whois_failures(failures)
 
 
 def whois_command():
     query = demisto.args().get('query')
     domain = get_domain_from_query(query)
-    whois_result = get_whois(domain)
+    cache, stored_domains = load_whois_cache()
+    try:
+        whois_result = get_whois_cached(domain, cache)
+    except WhoisQueryFailed as e:
+        return_whois_failures([e])
+    save_whois_cache(cache, stored_domains)
     md, standard_ec, dbot_score = create_outputs(whois_result, domain, query)
     demisto.results({
         'Type': entryTypes['note'],
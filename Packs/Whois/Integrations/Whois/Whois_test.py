@@ -141,3 +141,129 @@ def test_query_result(whois_result, domain, expected):
     from Whois import create_outputs
     md, standard_ec, dbot_score = create_outputs(whois_result, domain)
     assert standard_ec['Whois']['QueryResult'] == expected
+
+
+def test_whois_result_serialization():
+    from Whois import serialize_whois_result, deserialize_whois_result
+    whois_result = TEST_QUERY_RESULT_INPUT[2][0]
+    serialized = serialize_whois_result(whois_result)
+    assert serialized['creation_date'] == [{'$date': '1997-09-15T00:00:00'}]
+    assert deserialize_whois_result(serialized) == whois_result
+
+
+def test_get_whois_cached(mocker):
+    whois_result = TEST_QUERY_RESULT_INPUT[2][0]
+    mocker.patch.object(Whois, 'get_whois', return_value=whois_result)
+    cache = {}
+    assert Whois.get_whois_cached('Google.com', cache) == whois_result
+    assert Whois.get_whois_cached('google.com', cache) == whois_result
+    assert Whois.get_whois.call_count == 1
+    assert list(cache.keys()) == ['google.com']
+
+
+def test_load_and_save_whois_cache(mocker):
+    now = time.time()
+    mocker.patch.object(Whois, 'get_integration_context', return_value={
+        'whois_cache': {
+            'google.com': {'timestamp': now, 'result': {}},
+            'expired.com': {'timestamp': now - Whois.CACHE_TTL_MINUTES * 60 - 1, 'result': {}}
+        }
+    })
+    mocker.patch.object(Whois, 'set_integration_context')
+    mocker.patch.object(Whois, 'CACHE_MAX_ENTRIES', 2)
+    cache, stored_domains = Whois.load_whois_cache()
+    assert list(cache.keys()) == ['google.com']
+    cache['a.com'] = {'timestamp': now + 1, 'result': {}}
+    cache['b.com'] = {'timestamp': now + 2, 'result': {}}
+    Whois.save_whois_cache(cache, stored_domains)
+    saved_cache = Whois.set_integration_context.call_args[0][0]['whois_cache']
+    assert sorted(saved_cache.keys()) == ['a.com', 'b.com']
+
+
+def test_save_whois_cache_unchanged(mocker):
+    """
+    Given: a cache in which all the queried domains were found, and no entry expired
+    When: saving the cache
+    Then: the integration context is not written
+    """
+    now = time.time()
+    mocker.patch.object(Whois, 'get_integration_context', return_value={
+        'whois_cache': {'google.com': {'timestamp': now, 'result': {}}}
+    })
+    mocker.patch.object(Whois, 'set_integration_context')
+    cache, stored_domains = Whois.load_whois_cache()
+    Whois.save_whois_cache(cache, stored_domains)
+    assert Whois.set_integration_context.call_count == 0
+
+
+def test_save_whois_cache_failure(mocker):
+    """
+    Given: an integration context which can not be written
+    When: saving a cache with a new entry
+    Then: the failure is logged and not raised
+    """
+    mocker.patch.object(Whois, 'get_integration_context', return_value={})
+    mocker.patch.object(Whois, 'set_integration_context', side_effect=Exception('context too large'))
+    mocker.patch.object(demisto, 'error')
+    Whois.save_whois_cache({'a.com': {'timestamp': time.time(), 'result': {}}}, set())
+    assert 'context too large' in demisto.error.call_args[0][0]
+
+
+def test_get_whois_bulk(mocker):
+    mocker.patch.object(Whois, 'get_whois', side_effect=lambda domain: {'raw': [domain]})
+    results = Whois.get_whois_bulk(['a.com', 'b.com', 'a.com'], {})
+    assert results == {'a.com': ({'raw': ['a.com']}, None), 'b.com': ({'raw': ['b.com']}, None)}
+    assert Whois.get_whois.call_count == 2
+
+
+def test_get_whois_bulk_failure(mocker):
+    """
+    Given: a domain whose lookup fails
+    When: querying it in bulk with other domains
+    Then: the exception is returned for that domain, and the other domains are queried
+    """
+    def get_whois(domain):
+        if domain == 'bad.com':
+            raise Whois.WhoisQueryFailed('failed', {})
+        return {'raw': [domain]}
+
+    mocker.patch.object(Whois, 'get_whois', side_effect=get_whois)
+    results = Whois.get_whois_bulk(['a.com', 'bad.com'], {})
+    assert results['a.com'] == ({'raw': ['a.com']}, None)
+    assert isinstance(results['bad.com'][1], Whois.WhoisQueryFailed)
+
+
+def test_domain_command_failures_after_results(mocker):
+    """
+    Given: domains whose lookups fail, between domains whose lookups succeed
+    When: running the domain command
+    Then: the results are returned first, followed by a single warning entry with the failures in the input order
+    """
+    def get_whois(domain):
+        if domain.startswith('bad'):
+            raise Whois.WhoisQueryFailed('{} failed'.format(domain), {'Domain(val.Name && val.Name == obj.Name)': {
+                'Name': domain, 'Whois': {'QueryStatus': 'Failed'}}})
+        return {'raw': [domain]}
+
+    mocker.patch.object(demisto, 'args', return_value={'domain': 'bad2.com,a.com,bad1.com,b.com'})
+    mocker.patch.object(Whois, 'get_whois', side_effect=get_whois)
+    mocker.patch.object(Whois, 'load_whois_cache', return_value=({}, set()))
+    mocker.patch.object(Whois, 'save_whois_cache')
+    mocker.patch.object(Whois, 'create_outputs', return_value=({}, {}, {}))
+    mocker.patch.object(Whois, 'SHOULD_ERROR', False)
+    mocker.patch.object(demisto, 'results')
+    with pytest.raises(SystemExit):
+        Whois.domain_command()
+    entries = [call[0][0] for call in demisto.results.call_args_list]
+    assert [entry['Contents'] for entry in entries] == [str({'raw': ['a.com']}), str({'raw': ['b.com']}),
+                                                        'bad2.com failed\nbad1.com failed']
+    failed_domains = entries[-1]['EntryContext']['Domain(val.Name && val.Name == obj.Name)']
+    assert [domain['Name'] for domain in failed_domains] == ['bad2.com', 'bad1.com']
+
+
+def test_get_root_server_cached(mocker):
+    mocker.patch.object(Whois, 'find_root_server', return_value='whois.nic.uk')
+    Whois.root_server_cache.clear()
+    assert Whois.get_root_server('a.co.uk') == 'whois.nic.uk'
+    assert Whois.get_root_server('b.co.uk') == 'whois.nic.uk'
+    assert Whois.find_root_server.call_count == 1
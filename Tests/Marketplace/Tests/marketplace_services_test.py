@@ -3,6 +3,7 @@ import pytest
 import json
 import os
 import random
+import logging
 from unittest.mock import mock_open
 from mock_open import MockOpen
 from google.cloud.storage.blob import Blob
@@ -1864,3 +1865,100 @@ class TestGetSuccessfulAndFailedPacks:
         private_successful_list = [*private_packs]
         ans = 'TestPack3' in private_successful_list
         assert ans
+
+
+class TestContentItemsParseCache:
+    @staticmethod
+    def create_pack(pack_path):
+        os.makedirs(os.path.join(pack_path, 'Scripts'))
+        os.makedirs(os.path.join(pack_path, 'IncidentFields'))
+        with open(os.path.join(pack_path, 'Scripts', 'script-Test.yml'), 'w') as script_file:
+            script_file.write('name: Test\ncomment: A test script\ntags:\n- test\n')
+        with open(os.path.join(pack_path, 'IncidentFields', 'incidentfield-Test.json'), 'w') as field_file:
+            json.dump({'name': 'Test', 'type': 'shortText', 'description': 'A test field'}, field_file)
+        with open(os.path.join(pack_path, 'README.md'), 'w') as readme_file:
+            readme_file.write('readme')
+
+    def test_collect_content_items_parses_once(self, mocker, tmp_path):
+        """
+        Given:
+            - Two packs with the same content items, extracted to different paths.
+        When:
+            - Collecting the content items of both packs.
+        Then:
+            - Each file content is parsed once, and both packs get the same content items.
+        """
+        from Tests.Marketplace import marketplace_services
+        parse_cache = marketplace_services.ContentItemsParseCache()
+        mocker.patch.object(marketplace_services, 'CONTENT_ITEMS_PARSE_CACHE', parse_cache)
+        mocker.patch.object(logging, 'success', create=True)
+        parse_content_item = mocker.patch.object(marketplace_services, 'parse_content_item',
+                                                 wraps=marketplace_services.parse_content_item)
+        content_items = []
+        for pack_name in ['Pack1', 'Pack2']:
+            self.create_pack(str(tmp_path / pack_name))
+            task_status, pack_content_items = Pack(pack_name, str(tmp_path / pack_name)).collect_content_items()
+            assert task_status
+            content_items.append(pack_content_items)
+
+        assert content_items[0] == content_items[1]
+        assert content_items[0]['automation'] == [{'name': 'Test', 'description': 'A test script', 'tags': ['test']}]
+        assert parse_content_item.call_count == 2
+
+    def test_file_changed(self, tmp_path):
+        """
+        Given:
+            - A content item file which is in the parse cache.
+        When:
+            - The file content changes.
+        Then:
+            - The file is parsed again.
+        """
+        from Tests.Marketplace.marketplace_services import ContentItemsParseCache
+        parse_cache = ContentItemsParseCache()
+        file_path = str(tmp_path / 'incidentfield-Test.json')
+        with open(file_path, 'w') as field_file:
+            json.dump({'name': 'Test'}, field_file)
+        assert parse_cache.get(file_path, 'json') == {'name': 'Test'}
+        with open(file_path, 'w') as field_file:
+            json.dump({'name': 'Changed'}, field_file)
+        assert parse_cache.get(file_path, 'json') == {'name': 'Changed'}
+
+    def test_save_and_load(self, mocker, tmp_path):
+        """
+        Given:
+            - A parse cache which was warmed with the files of a pack, and saved.
+        When:
+            - Loading the cache in the next build, in which one of the files changed and the other was removed.
+        Then:
+            - Only the changed file is parsed, and only the used content items are saved.
+        """
+        from Tests.Marketplace import marketplace_services
+        pack_path = str(tmp_path / 'Pack1')
+        cache_path = str(tmp_path / 'parse_cache.pickle.gz')
+        self.create_pack(pack_path)
+        pack = Pack('Pack1', pack_path)
+        content_item_files = pack.get_content_item_files()
+        assert sorted(file_format for _, file_format in content_item_files) == ['json', 'yml']
+
+        parse_cache = marketplace_services.ContentItemsParseCache()
+        parse_cache.warm(content_item_files, max_workers=2)
+        parse_cache.save(cache_path)
+
+        os.remove(os.path.join(pack_path, 'IncidentFields', 'incidentfield-Test.json'))
+        with open(os.path.join(pack_path, 'Scripts', 'script-Test.yml'), 'w') as script_file:
+            script_file.write('name: Changed\n')
+        parse_content_item = mocker.patch.object(marketplace_services, 'parse_content_item',
+                                                 wraps=marketplace_services.parse_content_item)
+        parse_cache = marketplace_services.ContentItemsParseCache()
+        parse_cache.load(cache_path)
+        script_path = os.path.join(pack_path, 'Scripts', 'script-Test.yml')
+        assert parse_cache.get(script_path, 'yml') == {'name': 'Changed'}
+        assert parse_content_item.call_count == 1
+        parse_cache.save(cache_path)
+
+        parse_cache = marketplace_services.ContentItemsParseCache()
+        parse_cache.load(cache_path)
+        assert parse_cache.get(script_path, 'yml') == {'name': 'Changed'}
+        assert parse_content_item.call_count == 1
+        assert len(parse_cache._used_items) == 1 and not parse_cache._stored_items
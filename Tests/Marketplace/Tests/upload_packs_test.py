@@ -1,5 +1,8 @@
 import copy
+import functools
+import io
 import json
+import logging
 import os
 
 import pytest
@@ -600,3 +603,142 @@ class TestUpdatedPrivatePacks:
         private_index_json.get("packs").append({"id": "new_private_pack", "contentCommitHash": "111"})
         mocker.patch('Tests.Marketplace.upload_packs.load_json', return_value=private_index_json)
         assert is_private_packs_updated(public_index_json, index_file_path)
+
+
+class LocalBlob:
+    """ A local file system stand-in for a google cloud storage blob. """
+
+    def __init__(self, bucket_path, name):
+        self.name = name
+        self.path = os.path.join(bucket_path, name)
+        self.cache_control = None
+        self.public_url = f'file://{self.path}'
+
+    def upload_from_file(self, file_obj):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'wb') as blob_file:
+            blob_file.write(file_obj.read())
+
+
+class LocalBucket:
+    """ A local file system stand-in for a google cloud storage bucket. """
+
+    def __init__(self, bucket_path):
+        self.bucket_path = bucket_path
+
+    def blob(self, name):
+        return LocalBlob(self.bucket_path, name)
+
+    def list_blobs(self, prefix):
+        blobs = []
+        for root, _, files in os.walk(self.bucket_path):
+            for file_name in files:
+                name = os.path.relpath(os.path.join(root, file_name), self.bucket_path)
+                if name.startswith(prefix):
+                    blobs.append(LocalBlob(self.bucket_path, name))
+        return blobs
+
+
+class TestPreparePacksConcurrently:
+    PACK_STAGES = {
+        'load_user_metadata': (True, {}),
+        'collect_content_items': (True, {}),
+        'upload_integration_images': (True, []),
+        'upload_author_image': (True, ''),
+        'detect_modified': (True, True),
+        'format_metadata': True,
+        'prepare_release_notes': (True, False),
+        'remove_unwanted_files': True,
+        'check_if_exists_in_index': (True, False),
+        'prepare_for_index_upload': True,
+    }
+
+    @staticmethod
+    def create_packs(packs_path, packs_count):
+        from Tests.Marketplace.marketplace_services import Pack
+
+        packs = []
+        for i in range(packs_count):
+            pack_path = os.path.join(packs_path, f'Pack{i}')
+            os.makedirs(os.path.join(pack_path, 'Scripts'))
+            with open(os.path.join(pack_path, 'Scripts', 'script.yml'), 'w') as script_file:
+                script_file.write(f'name: Script{i}\n')
+            pack = Pack(f'Pack{i}', pack_path)
+            pack.latest_version = '1.0.0'
+            packs.append(pack)
+        return packs
+
+    def test_prepare_and_upload_packs_concurrently(self, mocker, tmp_path):
+        """
+        Given:
+            - Packs to upload, and a local file system stand-in for the storage bucket.
+        When:
+            - Preparing and uploading the packs concurrently, and then updating the index with them.
+        Then:
+            - Each pack zip is uploaded to its own version path in the bucket.
+            - The index is updated with each of the packs one at a time, in the packs order.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from zipfile import ZipFile
+        from Tests.Marketplace import upload_packs
+        from Tests.Marketplace.marketplace_services import GCPConfig, Pack, PackStatus
+
+        for stage, result in self.PACK_STAGES.items():
+            mocker.patch.object(Pack, stage, return_value=result)
+        mocker.patch.object(Pack, 'cleanup')
+        mocker.patch.object(logging, 'success', create=True)
+        update_index_folder = mocker.patch.object(upload_packs, 'update_index_folder', return_value=True)
+        bucket = LocalBucket(str(tmp_path / 'bucket'))
+        packs = self.create_packs(str(tmp_path / 'packs'), 20)
+
+        prepare_pack = functools.partial(upload_packs.prepare_and_upload_pack, storage_bucket=bucket,
+                                         index_folder_path='', content_repo=None, current_commit_hash='',
+                                         previous_commit_hash='', packs_dependencies_mapping={}, build_number='1',
+                                         packs_statistic_df=None, remove_test_playbooks=True, signature_key='',
+                                         override_all_packs=False)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            upload_results = list(executor.map(prepare_pack, packs))
+        for pack, (task_status, skipped_pack_uploading) in zip(packs, upload_results):
+            assert task_status
+            assert not skipped_pack_uploading
+            upload_packs.update_index_with_pack(pack, '', skipped_pack_uploading)
+
+        for pack in packs:
+            assert pack.status == PackStatus.SUCCESS.name
+            zip_path = os.path.join(bucket.bucket_path, GCPConfig.STORAGE_BASE_PATH, pack.name, '1.0.0',
+                                    f'{pack.name}.zip')
+            with ZipFile(zip_path) as pack_zip:
+                assert pack_zip.namelist() == ['Scripts/script.yml']
+        assert [c.kwargs['pack_name'] for c in update_index_folder.call_args_list] == [p.name for p in packs]
+
+    def test_prepare_and_upload_pack_already_exists(self, mocker, tmp_path):
+        """
+        Given:
+            - A pack which already exists in the storage bucket and in the index.
+        When:
+            - Preparing and uploading the pack, and then updating the index with it.
+        Then:
+            - The upload is skipped and the pack status is PACK_ALREADY_EXISTS.
+        """
+        from Tests.Marketplace import upload_packs
+        from Tests.Marketplace.marketplace_services import GCPConfig, Pack, PackStatus
+
+        for stage, result in self.PACK_STAGES.items():
+            mocker.patch.object(Pack, stage, return_value=result)
+        mocker.patch.object(Pack, 'detect_modified', return_value=(True, False))
+        mocker.patch.object(Pack, 'check_if_exists_in_index', return_value=(True, True))
+        mocker.patch.object(Pack, 'cleanup')
+        mocker.patch.object(logging, 'success', create=True)
+        mocker.patch.object(upload_packs, 'update_index_folder', return_value=True)
+        bucket = LocalBucket(str(tmp_path / 'bucket'))
+        pack = self.create_packs(str(tmp_path / 'packs'), 1)[0]
+        bucket.blob(os.path.join(GCPConfig.STORAGE_BASE_PATH, pack.name, '1.0.0', 'Pack0.zip')).upload_from_file(
+            io.BytesIO(b'existing pack zip'))
+
+        task_status, skipped_pack_uploading = upload_packs.prepare_and_upload_pack(
+            pack, bucket, '', None, '', '', {}, '1', None, True, '', False)
+        upload_packs.update_index_with_pack(pack, '', skipped_pack_uploading)
+
+        assert task_status
+        assert skipped_pack_uploading
+        assert pack.status == PackStatus.PACK_ALREADY_EXISTS.name
@@ -1,6 +1,10 @@
 import json
 import os
 import stat
+import gzip
+import pickle
+import hashlib
+import threading
 import subprocess
 import fnmatch
 import re
@@ -20,10 +24,11 @@ from distutils.util import strtobool
 from distutils.version import LooseVersion
 from datetime import datetime
 from zipfile import ZipFile, ZIP_DEFLATED
+from concurrent.futures import ProcessPoolExecutor
 
 from Tests.scripts.utils.content_packs_util import IGNORED_FILES
 from Utils.release_notes_generator import aggregate_release_notes_for_marketplace
-from typing import Tuple, Any, Union
+from typing import Tuple, Any, Union, List, Optional
 
 CONTENT_ROOT_PATH = os.path.abspath(os.path.join(__file__, '../../..'))  # full path to content root repo
 PACKS_FOLDER = "Packs"  # name of base packs folder inside content repo
@@ -154,6 +159,165 @@ class PackStatus(enum.Enum):
                           " which should be encrypted, seems not to be encrypted."
 
 
+def get_content_item_format(folder_name: str) -> Optional[str]:
+    """ Returns the format of the content item files in a pack folder.
+
+    Args:
+        folder_name (str): The name of the pack folder of the content item.
+
+    Returns:
+        str: 'yml' or 'json', or None if the folder does not contain content items.
+
+    """
+    if folder_name in PackFolders.yml_supported_folders():
+        return 'yml'
+    if folder_name in PackFolders.json_supported_folders():
+        return 'json'
+    return None
+
+
+def parse_content_item(file_content: bytes, file_format: str) -> Any:
+    """ Parses the content of a content item file.
+
+    Args:
+        file_content (bytes): The content of the file.
+        file_format (str): 'yml' or 'json'.
+
+    Returns:
+        Any: The parsed content item.
+
+    """
+    if file_format == 'yml':
+        return yaml.safe_load(file_content)
+    return json.loads(file_content)
+
+
+def parse_content_item_file(file_path: str, file_format: str) -> Tuple[str, Any]:
+    """ Reads and parses a content item file, used by the processes which warm the parse cache.
+
+    Args:
+        file_path (str): The full path to the file.
+        file_format (str): 'yml' or 'json'.
+
+    Returns:
+        str: The key of the file in the parse cache.
+        Any: The parsed content item.
+
+    """
+    with open(file_path, 'rb') as content_item_file:
+        file_content = content_item_file.read()
+    return ContentItemsParseCache.get_key(file_content, file_format), parse_content_item(file_content, file_format)
+
+
+class ContentItemsParseCache(object):
+    """ Cache of the parsed content item files.
+
+    The parsed content items are keyed by the hash of the file content and the file format, so a file is parsed again
+    only when its content changes, even though the packs are extracted to new paths on each build. The cache can be
+    persisted between builds, and then keeps only the content items of the files which were used in the last build.
+    The parsed content items are shared between the callers, and must not be modified.
+
+    """
+
+    def __init__(self):
+        self._stored_items = {}  # type: dict
+        self._used_items = {}  # type: dict
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(file_content: bytes, file_format: str) -> str:
+        return f'{hashlib.sha1(file_content).hexdigest()}.{file_format}'
+
+    def load(self, cache_path: str):
+        """ Loads the parse cache which was persisted by a previous build.
+
+        Args:
+            cache_path (str): full path to the cache file.
+
+        """
+        if not cache_path or not os.path.exists(cache_path):
+            return
+        try:
+            with gzip.open(cache_path, 'rb') as cache_file:
+                self._stored_items = pickle.load(cache_file)
+            logging.info(f"Loaded {len(self._stored_items)} parsed content items from {cache_path}")
+        except Exception:
+            logging.exception(f"Failed loading the content items parse cache from {cache_path}, ignoring it")
+            self._stored_items = {}
+
+    def save(self, cache_path: str):
+        """ Persists the content items which were used in this build.
+
+        Args:
+            cache_path (str): full path to the cache file.
+
+        """
+        if not cache_path:
+            return
+        try:
+            with gzip.open(cache_path, 'wb') as cache_file:
+                pickle.dump(self._used_items, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            logging.info(f"Saved {len(self._used_items)} parsed content items to {cache_path}")
+        except Exception:
+            logging.exception(f"Failed saving the content items parse cache to {cache_path}")
+
+    def _get_cached_item(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            if key not in self._used_items and key in self._stored_items:
+                self._used_items[key] = self._stored_items.pop(key)
+            return key in self._used_items, self._used_items.get(key)
+
+    def get(self, file_path: str, file_format: str) -> Any:
+        """ Returns the parsed content item of a file, and parses the file only if its content is not in the cache.
+
+        Args:
+            file_path (str): The full path to the file.
+            file_format (str): 'yml' or 'json'.
+
+        Returns:
+            Any: The parsed content item.
+
+        """
+        with open(file_path, 'rb') as content_item_file:
+            file_content = content_item_file.read()
+        key = self.get_key(file_content, file_format)
+        is_cached, content_item = self._get_cached_item(key)
+        if not is_cached:
+            content_item = parse_content_item(file_content, file_format)
+            with self._lock:
+                self._used_items[key] = content_item
+        return content_item
+
+    def warm(self, content_item_files: List[Tuple[str, str]], max_workers: Optional[int] = None):
+        """ Parses the files which are not in the cache in parallel processes.
+
+        Args:
+            content_item_files (list): The full paths and formats of the content item files.
+            max_workers (int): The number of processes, defaults to the number of CPUs.
+
+        """
+        missing_files = []
+        for file_path, file_format in content_item_files:
+            with open(file_path, 'rb') as content_item_file:
+                is_cached, _ = self._get_cached_item(self.get_key(content_item_file.read(), file_format))
+            if not is_cached:
+                missing_files.append((file_path, file_format))
+
+        logging.info(f"Parsing {len(missing_files)} out of {len(content_item_files)} content items which are not "
+                     f"in the parse cache")
+        if not missing_files:
+            return
+        file_paths, file_formats = zip(*missing_files)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for key, content_item in executor.map(parse_content_item_file, file_paths, file_formats, chunksize=32):
+                with self._lock:
+                    self._used_items[key] = content_item
+
+
+# shared by the packs, so a file which is parsed by several steps is parsed once
+CONTENT_ITEMS_PARSE_CACHE = ContentItemsParseCache()
+
+
 class Pack(object):
     """ Class that manipulates and manages the upload of pack's artifact and metadata to cloud storage.
 
@@ -1362,6 +1526,23 @@ class Pack(object):
 
         return task_status and self.is_changelog_exists()
 
+    def get_content_item_files(self):
+        """ Returns the content item files of the pack which are parsed when collecting its content items.
+
+        Returns:
+            list: The full paths and formats of the content item files.
+
+        """
+        content_item_files = []
+        for root, _, pack_files_names in os.walk(self._pack_path):
+            file_format = get_content_item_format(os.path.basename(root))
+            if not file_format:
+                continue
+            content_item_files.extend((os.path.join(root, pack_file_name), file_format)
+                                      for pack_file_name in pack_files_names
+                                      if pack_file_name.endswith(('.json', '.yml')))
+        return content_item_files
+
     def collect_content_items(self):
         """ Iterates over content items folders inside pack and collects content items data.
 
@@ -1406,13 +1587,10 @@ class Pack(object):
                         logging.info(f"Deleted pack {pack_file_name} reputation file for {self._pack_name} pack")
                         continue
 
-                    with open(pack_file_path, 'r') as pack_file:
-                        if current_directory in PackFolders.yml_supported_folders():
-                            content_item = yaml.safe_load(pack_file)
-                        elif current_directory in PackFolders.json_supported_folders():
-                            content_item = json.load(pack_file)
-                        else:
-                            continue
+                    file_format = get_content_item_format(current_directory)
+                    if not file_format:
+                        continue
+                    content_item = CONTENT_ITEMS_PARSE_CACHE.get(pack_file_path, file_format)
 
                     # check if content item has to version
                     to_version = content_item.get('toversion') or content_item.get('toVersion')
@@ -1723,9 +1901,8 @@ class Pack(object):
             elif pack_file.endswith('_image.png'):
                 image_data['repo_image_path'] = os.path.join(root, pack_file)
             elif pack_file.endswith('.yml'):
-                with open(os.path.join(root, pack_file), 'r') as integration_file:
-                    integration_yml = yaml.safe_load(integration_file)
-                    image_data['display_name'] = integration_yml.get('display', '')
+                integration_yml = CONTENT_ITEMS_PARSE_CACHE.get(os.path.join(root, pack_file), 'yml')
+                image_data['display_name'] = integration_yml.get('display', '')
 
         return image_data
 
@@ -1742,8 +1919,7 @@ class Pack(object):
         image_data = {}
 
         if pack_file_path.endswith('.yml'):
-            with open(pack_file_path, 'r') as integration_file:
-                integration_yml = yaml.safe_load(integration_file)
+            integration_yml = CONTENT_ITEMS_PARSE_CACHE.get(pack_file_path, 'yml')
 
             image_data['display_name'] = integration_yml.get('display', '')
             # create temporary file of base64 decoded data
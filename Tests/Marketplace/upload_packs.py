@@ -8,17 +8,27 @@ import prettytable
 import glob
 import requests
 import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from zipfile import ZipFile
 from typing import Any, Tuple, Union
 from Tests.Marketplace.marketplace_services import init_storage_client, init_bigquery_client, Pack, PackStatus, \
     GCPConfig, PACKS_FULL_PATH, IGNORED_FILES, PACKS_FOLDER, IGNORED_PATHS, Metadata, CONTENT_ROOT_PATH, \
     get_packs_statistics_dataframe, BucketUploadFlow, load_json, get_content_git_client, get_recent_commits_data, \
-    store_successful_and_failed_packs_in_ci_artifacts
+    store_successful_and_failed_packs_in_ci_artifacts, CONTENT_ITEMS_PARSE_CACHE
 from demisto_sdk.commands.common.tools import run_command, str2bool
 
 from Tests.scripts.utils.log_util import install_logging
 
+# the zipping of the packs is CPU bound, so only a pack per CPU is zipped at a time
+ZIP_PACKS_SEMAPHORE = threading.BoundedSemaphore(os.cpu_count() or 1)
+# the packs are signed with a key file which is shared between them
+SIGN_PACKS_LOCK = threading.Lock()
+# the git repository client is not thread safe
+CONTENT_REPO_LOCK = threading.Lock()
+
 
 def get_packs_names(target_packs: str, previous_commit_hash: str = "HEAD^") -> set:
     """Detects and returns packs names to upload.
@@ -769,6 +779,11 @@ def option_handler():
     parser.add_argument('-pb', '--private_bucket_name', help="Private storage bucket name", required=False)
     parser.add_argument('-c', '--circle_branch', help="CircleCi branch of current build", required=True)
     parser.add_argument('-f', '--force_upload', help="is force upload build?", type=str2bool, required=True)
+    parser.add_argument('-w', '--max_workers', help="The number of packs to prepare and upload concurrently",
+                        type=int, default=8, required=False)
+    parser.add_argument('-pc', '--parse_cache_path',
+                        help="Full path of the content items parse cache file, which is kept between builds",
+                        required=False)
     # disable-secrets-detection-end
     return parser.parse_args()
 
@@ -872,6 +887,158 @@ def handle_private_content(public_index_folder_path, private_bucket_name, extrac
     return is_private_content_packs_updated, [], []
 
 
+def prepare_and_upload_pack(pack: Pack, storage_bucket: Any, index_folder_path: str, content_repo: Any,
+                            current_commit_hash: str, previous_commit_hash: str, packs_dependencies_mapping: dict,
+                            build_number: str, packs_statistic_df: Any, remove_test_playbooks: bool,
+                            signature_key: str, override_all_packs: bool) -> Tuple[bool, bool]:
+    """ Prepares the pack metadata, release notes and zip, and uploads the pack to the storage bucket.
+    The packs are independent of each other until the index update, so this runs for several packs concurrently.
+
+    Args:
+        pack (Pack): The pack to prepare and upload.
+        storage_bucket (google.cloud.storage.bucket.Bucket): google storage bucket where the pack is uploaded to.
+        index_folder_path (str): full path to the extracted index folder.
+        content_repo (git.repo.base.Repo): content repo object.
+        current_commit_hash (str): last commit hash of head.
+        previous_commit_hash (str): the previous commit to diff with.
+        packs_dependencies_mapping (dict): the packs dependencies mapping.
+        build_number (str): CI build number.
+        packs_statistic_df (pandas.core.frame.DataFrame): the packs downloads statistics.
+        remove_test_playbooks (bool): whether to remove the test playbooks from the pack.
+        signature_key (str): base64 encoded signature key used for signing the pack.
+        override_all_packs (bool): whether to override the existing packs in the storage bucket.
+
+    Returns:
+        bool: whether the pack was prepared and uploaded successfully, and should be updated in the index.
+        bool: True in case that the pack already existed in the storage bucket and its upload was skipped.
+
+    """
+    task_status, user_metadata = pack.load_user_metadata()
+    if not task_status:
+        pack.status = PackStatus.FAILED_LOADING_USER_METADATA.value
+        pack.cleanup()
+        return False, False
+
+    task_status, pack_content_items = pack.collect_content_items()
+    if not task_status:
+        pack.status = PackStatus.FAILED_COLLECT_ITEMS.name
+        pack.cleanup()
+        return False, False
+
+    task_status, integration_images = pack.upload_integration_images(storage_bucket)
+    if not task_status:
+        pack.status = PackStatus.FAILED_IMAGES_UPLOAD.name
+        pack.cleanup()
+        return False, False
+
+    task_status, author_image = pack.upload_author_image(storage_bucket)
+    if not task_status:
+        pack.status = PackStatus.FAILED_AUTHOR_IMAGE_UPLOAD.name
+        pack.cleanup()
+        return False, False
+
+    with CONTENT_REPO_LOCK:
+        task_status, pack_was_modified = pack.detect_modified(content_repo, index_folder_path, current_commit_hash,
+                                                              previous_commit_hash)
+    if not task_status:
+        pack.status = PackStatus.FAILED_DETECTING_MODIFIED_FILES.name
+        pack.cleanup()
+        return False, False
+
+    task_status = pack.format_metadata(user_metadata=user_metadata, pack_content_items=pack_content_items,
+                                       integration_images=integration_images, author_image=author_image,
+                                       index_folder_path=index_folder_path,
+                                       packs_dependencies_mapping=packs_dependencies_mapping,
+                                       build_number=build_number, commit_hash=current_commit_hash,
+                                       packs_statistic_df=packs_statistic_df,
+                                       pack_was_modified=pack_was_modified)
+    if not task_status:
+        pack.status = PackStatus.FAILED_METADATA_PARSING.name
+        pack.cleanup()
+        return False, False
+
+    task_status, not_updated_build = pack.prepare_release_notes(index_folder_path, build_number, pack_was_modified)
+    if not task_status:
+        pack.status = PackStatus.FAILED_RELEASE_NOTES.name
+        pack.cleanup()
+        return False, False
+
+    if not_updated_build:
+        pack.status = PackStatus.PACK_IS_NOT_UPDATED_IN_RUNNING_BUILD.name
+        pack.cleanup()
+        return False, False
+
+    task_status = pack.remove_unwanted_files(remove_test_playbooks)
+    if not task_status:
+        pack.status = PackStatus.FAILED_REMOVING_PACK_SKIPPED_FOLDERS
+        pack.cleanup()
+        return False, False
+
+    with SIGN_PACKS_LOCK:
+        task_status = pack.sign_pack(signature_key)
+    if not task_status:
+        pack.status = PackStatus.FAILED_SIGNING_PACKS.name
+        pack.cleanup()
+        return False, False
+
+    with ZIP_PACKS_SEMAPHORE:
+        task_status, zip_pack_path = pack.zip_pack()
+    if not task_status:
+        pack.status = PackStatus.FAILED_ZIPPING_PACK_ARTIFACTS.name
+        pack.cleanup()
+        return False, False
+
+    (task_status, skipped_pack_uploading, full_pack_path) = \
+        pack.upload_to_storage(zip_pack_path, pack.latest_version,
+                               storage_bucket, override_all_packs
+                               or pack_was_modified)
+
+    if not task_status:
+        pack.status = PackStatus.FAILED_UPLOADING_PACK.name
+        pack.cleanup()
+        return False, False
+
+    return True, skipped_pack_uploading
+
+
+def update_index_with_pack(pack: Pack, index_folder_path: str, skipped_pack_uploading: bool):
+    """ Updates the index folder with an uploaded pack, and sets the final status of the pack.
+    The index folder is shared between the packs, so this runs for one pack at a time.
+
+    Args:
+        pack (Pack): The uploaded pack.
+        index_folder_path (str): full path to the extracted index folder.
+        skipped_pack_uploading (bool): whether the pack already existed in the storage bucket and was not uploaded.
+
+    """
+    task_status, exists_in_index = pack.check_if_exists_in_index(index_folder_path)
+    if not task_status:
+        pack.status = PackStatus.FAILED_SEARCHING_PACK_IN_INDEX.name
+        pack.cleanup()
+        return
+
+    task_status = pack.prepare_for_index_upload()
+    if not task_status:
+        pack.status = PackStatus.FAILED_PREPARING_INDEX_FOLDER.name
+        pack.cleanup()
+        return
+
+    task_status = update_index_folder(index_folder_path=index_folder_path, pack_name=pack.name, pack_path=pack.path,
+                                      pack_version=pack.latest_version, hidden_pack=pack.hidden)
+    if not task_status:
+        pack.status = PackStatus.FAILED_UPDATING_INDEX_FOLDER.name
+        pack.cleanup()
+        return
+
+    # in case that pack already exist at cloud storage path and in index, don't show that the pack was changed
+    if skipped_pack_uploading and exists_in_index:
+        pack.status = PackStatus.PACK_ALREADY_EXISTS.name
+        pack.cleanup()
+        return
+
+    pack.status = PackStatus.SUCCESS.name
+
+
 def main():
     install_logging('Prepare_Content_Packs_For_Testing.log')
     option = option_handler()
@@ -937,116 +1104,28 @@ def main():
     # clean index and gcs from non existing or invalid packs
     clean_non_existing_packs(index_folder_path, private_packs, storage_bucket)
 
-    # starting iteration over packs
-    for pack in packs_list:
-        task_status, user_metadata = pack.load_user_metadata()
-        if not task_status:
-            pack.status = PackStatus.FAILED_LOADING_USER_METADATA.value
-            pack.cleanup()
-            continue
-
-        task_status, pack_content_items = pack.collect_content_items()
-        if not task_status:
-            pack.status = PackStatus.FAILED_COLLECT_ITEMS.name
-            pack.cleanup()
-            continue
-
-        task_status, integration_images = pack.upload_integration_images(storage_bucket)
-        if not task_status:
-            pack.status = PackStatus.FAILED_IMAGES_UPLOAD.name
-            pack.cleanup()
-            continue
-
-        task_status, author_image = pack.upload_author_image(storage_bucket)
-        if not task_status:
-            pack.status = PackStatus.FAILED_AUTHOR_IMAGE_UPLOAD.name
-            pack.cleanup()
-            continue
-
-        task_status, pack_was_modified = pack.detect_modified(content_repo, index_folder_path, current_commit_hash,
-                                                              previous_commit_hash)
-        if not task_status:
-            pack.status = PackStatus.FAILED_DETECTING_MODIFIED_FILES.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.format_metadata(user_metadata=user_metadata, pack_content_items=pack_content_items,
-                                           integration_images=integration_images, author_image=author_image,
-                                           index_folder_path=index_folder_path,
-                                           packs_dependencies_mapping=packs_dependencies_mapping,
-                                           build_number=build_number, commit_hash=current_commit_hash,
-                                           packs_statistic_df=packs_statistic_df,
-                                           pack_was_modified=pack_was_modified)
-        if not task_status:
-            pack.status = PackStatus.FAILED_METADATA_PARSING.name
-            pack.cleanup()
-            continue
-
-        task_status, not_updated_build = pack.prepare_release_notes(index_folder_path, build_number, pack_was_modified)
-        if not task_status:
-            pack.status = PackStatus.FAILED_RELEASE_NOTES.name
-            pack.cleanup()
-            continue
-
-        if not_updated_build:
-            pack.status = PackStatus.PACK_IS_NOT_UPDATED_IN_RUNNING_BUILD.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.remove_unwanted_files(remove_test_playbooks)
-        if not task_status:
-            pack.status = PackStatus.FAILED_REMOVING_PACK_SKIPPED_FOLDERS
-            pack.cleanup()
-            continue
-
-        task_status = pack.sign_pack(signature_key)
-        if not task_status:
-            pack.status = PackStatus.FAILED_SIGNING_PACKS.name
-            pack.cleanup()
-            continue
-
-        task_status, zip_pack_path = pack.zip_pack()
-        if not task_status:
-            pack.status = PackStatus.FAILED_ZIPPING_PACK_ARTIFACTS.name
-            pack.cleanup()
-            continue
-
-        (task_status, skipped_pack_uploading, full_pack_path) = \
-            pack.upload_to_storage(zip_pack_path, pack.latest_version,
-                                   storage_bucket, override_all_packs
-                                   or pack_was_modified)
-
-        if not task_status:
-            pack.status = PackStatus.FAILED_UPLOADING_PACK.name
-            pack.cleanup()
-            continue
-
-        task_status, exists_in_index = pack.check_if_exists_in_index(index_folder_path)
-        if not task_status:
-            pack.status = PackStatus.FAILED_SEARCHING_PACK_IN_INDEX.name
-            pack.cleanup()
-            continue
-
-        task_status = pack.prepare_for_index_upload()
-        if not task_status:
-            pack.status = PackStatus.FAILED_PREPARING_INDEX_FOLDER.name
-            pack.cleanup()
-            continue
-
-        task_status = update_index_folder(index_folder_path=index_folder_path, pack_name=pack.name, pack_path=pack.path,
-                                          pack_version=pack.latest_version, hidden_pack=pack.hidden)
-        if not task_status:
-            pack.status = PackStatus.FAILED_UPDATING_INDEX_FOLDER.name
-            pack.cleanup()
-            continue
-
-        # in case that pack already exist at cloud storage path and in index, don't show that the pack was changed
-        if skipped_pack_uploading and exists_in_index:
-            pack.status = PackStatus.PACK_ALREADY_EXISTS.name
-            pack.cleanup()
-            continue
-
-        pack.status = PackStatus.SUCCESS.name
+    # parse the content items which changed since the previous build
+    CONTENT_ITEMS_PARSE_CACHE.load(option.parse_cache_path)
+    CONTENT_ITEMS_PARSE_CACHE.warm([content_item_file for pack in packs_list
+                                    for content_item_file in pack.get_content_item_files()])
+
+    # prepare and upload the packs concurrently, then update the index with the results
+    prepare_pack = functools.partial(prepare_and_upload_pack, storage_bucket=storage_bucket,
+                                     index_folder_path=index_folder_path, content_repo=content_repo,
+                                     current_commit_hash=current_commit_hash,
+                                     previous_commit_hash=previous_commit_hash,
+                                     packs_dependencies_mapping=packs_dependencies_mapping, build_number=build_number,
+                                     packs_statistic_df=packs_statistic_df,
+                                     remove_test_playbooks=remove_test_playbooks, signature_key=signature_key,
+                                     override_all_packs=override_all_packs)
+    with ThreadPoolExecutor(max_workers=option.max_workers) as executor:
+        upload_results = list(executor.map(prepare_pack, packs_list))
+
+    for pack, (task_status, skipped_pack_uploading) in zip(packs_list, upload_results):
+        if task_status:
+            update_index_with_pack(pack, index_folder_path, skipped_pack_uploading)
+
+    CONTENT_ITEMS_PARSE_CACHE.save(option.parse_cache_path)
 
     # upload core packs json to bucket
     upload_core_packs_config(storage_bucket, build_number, index_folder_path)
@@ -5,6 +5,9 @@ The XSOAR Server will run the docker container with a python script which it wil
 The communication with the script is done over stdin/stdout/stderr using a json based protocol. You can use this script
 to experiment with simple scenarios to see how the exection is performed.
 
+The same script is usually executed many times in the same container, so the compiled code objects are cached by the
+hash of the template and the script. Code objects are immutable, and each execution still runs in its own new globals.
+
 For example to run a simple script which sends a log entry to the server via calling: `demisto.log(...)` run the following:
 
 echo '{"script": "demisto.log(\"this is an example entry log\")", "integration": false, "native": false}' | \
@@ -16,7 +19,9 @@ import os
 import threading
 import sys
 import json
+import hashlib
 import traceback
+from collections import OrderedDict
 
 if sys.version_info[0] < 3:
     import Queue as queue
@@ -26,6 +31,11 @@ else:
 __read_thread = None
 __input_queue = None
 
+# modules which the template and most of the scripts import, imported once when the process starts
+PRELOADED_MODULES = ['base64', 'datetime', 'json', 'logging', 're', 'time', 'uuid', 'requests']
+COMPILED_CODE_CACHE_SIZE = 100
+compiled_code_cache = OrderedDict()
+
 win = sys.platform.startswith('win')
 if win:
     __input_queue = queue.Queue()
@@ -441,6 +451,33 @@ def do_ping_pong():
             return ping
 
 
+def preload_modules():
+    for module_name in PRELOADED_MODULES:
+        try:
+            __import__(module_name)
+        except ImportError:
+            pass
+
+
+def get_compiled_code(code_string, is_integ_script):
+    """
+    Returns the compiled code object of the script within its template, compiling it only if it is not in the cache.
+    The least recently used code object is removed once the cache is full.
+    """
+    template = integ_template_code if is_integ_script else template_code
+    code_hash = hashlib.sha256(template.encode('utf-8') + code_string.encode('utf-8')).hexdigest()
+    code = compiled_code_cache.pop(code_hash, None)
+    if code is None:
+        complete_code = template.replace('###CODE_HERE###', code_string)
+        code = compile(complete_code, '<string>', 'exec')
+    compiled_code_cache[code_hash] = code
+    if len(compiled_code_cache) > COMPILED_CODE_CACHE_SIZE:
+        compiled_code_cache.popitem(last=False)
+    return code
+
+
+preload_modules()
+
 backup_env_vars = {}
 for key in os.environ.keys():
     backup_env_vars[key] = os.environ[key]
@@ -464,14 +501,9 @@ while True:
     contextJSON.pop('script', None)
 
     is_integ_script = contextJSON['integration']
-    complete_code = ''
-    if is_integ_script:
-        complete_code = integ_template_code.replace('###CODE_HERE###', code_string)
-    else:
-        complete_code = template_code.replace('###CODE_HERE###', code_string)
 
     try:
-        code = compile(complete_code, '<string>', 'exec')
+        code = get_compiled_code(code_string, is_integ_script)
 
         sub_globals = {
             '__readWhileAvailable': __readWhileAvailable,
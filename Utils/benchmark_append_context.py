@@ -0,0 +1,115 @@
+"""
+Benchmarks appending items to the investigation context in batches.
+
+The items are appended with appendContextBatch, which de-duplicates them with an index keyed on the DT fields, with a
+single ContextAppender which keeps its index between the batches, and with the former per item list scan. The
+benchmark checks that all of them result in the same context.
+
+Usage:
+    python Utils/benchmark_append_context.py --items 50000 --batch_size 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+CONTENT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+IMPORT_PATHS = [
+    os.path.join(CONTENT_ROOT, 'Tests', 'demistomock'),
+    os.path.join(CONTENT_ROOT, 'Packs', 'Base', 'Scripts', 'CommonServerPython'),
+]
+CONTEXT_KEY = 'Host(val.ID === obj.ID)'
+
+
+def import_common_server():
+    sys.path.extend(IMPORT_PATHS)
+    # provided by the server at runtime
+    sys.modules.setdefault('CommonServerUserPython', types.ModuleType('CommonServerUserPython'))
+    import demistomock
+    import CommonServerPython
+    return demistomock, CommonServerPython
+
+
+class InMemoryContext(object):
+    def __init__(self, demisto):
+        self.data = {}
+        demisto.context = lambda: self.data
+        demisto.setContext = self.set_context
+
+    def set_context(self, path, value):
+        self.data[path] = value
+
+
+def generate_batches(n_items, batch_size, duplicate_ratio, seed=0):
+    rand = random.Random(seed)
+    items = []
+    for i in range(n_items):
+        item_id = rand.randrange(i) if i and rand.random() < duplicate_ratio else i
+        items.append({'ID': item_id, 'Name': 'host{}'.format(i)})
+    return [items[i:i + batch_size] for i in range(0, n_items, batch_size)]
+
+
+def append_list_scan(context, batches):
+    for batch in batches:
+        existing = context.data.setdefault('Host', [])
+        for item in batch:
+            match = next((e for e in existing if e['ID'] == item['ID']), None)
+            if match is None:
+                existing.append(dict(item))
+            else:
+                match.update(item)
+
+
+def append_batches(common_server, batches):
+    for batch in batches:
+        common_server.appendContextBatch(CONTEXT_KEY, [dict(item) for item in batch])
+
+
+def append_batches_with_appender(common_server, batches):
+    appender = common_server.ContextAppender(CONTEXT_KEY)
+    for batch in batches:
+        appender.append([dict(item) for item in batch])
+        appender.flush()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def options_handler():
+    parser = argparse.ArgumentParser(description='Benchmarks appending items to the context in batches.')
+    parser.add_argument('--items', type=int, default=50000, help='The number of items to append')
+    parser.add_argument('--batch_size', type=int, default=500, help='The number of items in each batch')
+    parser.add_argument('--duplicate_ratio', type=float, default=0.2, help='The share of items with an existing ID')
+    return parser.parse_args()
+
+
+def main():
+    args = options_handler()
+    demisto, common_server = import_common_server()
+    batches = generate_batches(args.items, args.batch_size, args.duplicate_ratio)
+
+    context = InMemoryContext(demisto)
+    batch_time = timed(append_batches, common_server, batches)
+    batch_result = context.data['Host']
+    print('{} items: appendContextBatch {:.3f}s, {} hosts'.format(args.items, batch_time, len(batch_result)))
+
+    context = InMemoryContext(demisto)
+    appender_time = timed(append_batches_with_appender, common_server, batches)
+    if context.data['Host'] != batch_result:
+        raise AssertionError('The context differs from appendContextBatch')
+    print('{} items: ContextAppender {:.3f}s, same context'.format(args.items, appender_time))
+
+    context = InMemoryContext(demisto)
+    scan_time = timed(append_list_scan, context, batches)
+    if context.data['Host'] != batch_result:
+        raise AssertionError('The context differs from the list scan')
+    print('{} items: list scan {:.3f}s, same context'.format(args.items, scan_time))
+
+
+if __name__ == '__main__':
+    main()
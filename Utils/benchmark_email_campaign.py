@@ -0,0 +1,122 @@
+"""
+Benchmarks the email campaign detection on synthetic email corpora.
+
+The campaign members are the incidents found by FindDuplicateEmailIncidents, which compares the current incident to
+all of the existing incidents in a single sparse product. The benchmark times that step, and the blocked duplicate
+sentences removal of the FindEmailCampaign summary, against the former dense row by row calculation, and checks that
+both return the same campaign members above the similarity threshold.
+
+Usage:
+    python Utils/benchmark_email_campaign.py --sizes 1000,5000,20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+import numpy as np
+
+CONTENT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+IMPORT_PATHS = [
+    os.path.join(CONTENT_ROOT, 'Tests', 'demistomock'),
+    os.path.join(CONTENT_ROOT, 'Packs', 'Base', 'Scripts', 'CommonServerPython'),
+    os.path.join(CONTENT_ROOT, 'Packs', 'Phishing', 'Scripts', 'FindDuplicateEmailIncidents'),
+    os.path.join(CONTENT_ROOT, 'Packs', 'Campaign', 'Scripts', 'FindEmailCampaign'),
+]
+
+WORDS = ['account', 'password', 'verify', 'invoice', 'payment', 'urgent', 'click', 'link', 'bank', 'transfer',
+         'document', 'shared', 'login', 'suspended', 'confirm', 'details', 'delivery', 'package', 'refund', 'gift',
+         'meeting', 'report', 'quarter', 'budget', 'team', 'project', 'review', 'schedule', 'update', 'office']
+
+
+def import_scripts():
+    sys.path.extend(IMPORT_PATHS)
+    # provided by the server at runtime
+    sys.modules.setdefault('CommonServerUserPython', types.ModuleType('CommonServerUserPython'))
+    import FindDuplicateEmailIncidents
+    import FindEmailCampaign
+    return FindDuplicateEmailIncidents, FindEmailCampaign
+
+
+def generate_email_corpus(n_emails, n_campaigns, campaign_ratio, seed=0):
+    """
+    Generates synthetic emails. The first email and a share of the others are copies of campaign templates with a few
+    words replaced, and the rest are random emails.
+    """
+    rand = random.Random(seed)
+    vocabulary = WORDS + ['word{}'.format(i) for i in range(5000)]
+    templates = [' '.join(rand.choice(vocabulary) for _ in range(120)) for _ in range(n_campaigns)]
+    emails = []
+    for i in range(n_emails):
+        if i == 0 or rand.random() < campaign_ratio:
+            words = rand.choice(templates).split()
+            for _ in range(rand.randint(0, 3)):
+                words[rand.randrange(len(words))] = rand.choice(vocabulary)
+        else:
+            words = [rand.choice(vocabulary) for _ in range(rand.randint(30, 200))]
+        emails.append(' '.join(words))
+    return emails
+
+
+def dense_similarities(new_email, emails, vectorizer_cls):
+    vectorizer = vectorizer_cls(token_pattern=r"(?u)\b\w\w+\b|!|\?|\"|\'").fit([new_email] + emails)
+    new_vector = vectorizer.transform([new_email]).toarray()[0]
+    similarities = []
+    for email in emails:
+        vector = vectorizer.transform([email]).toarray()[0]
+        similarities.append(np.dot(vector, new_vector) / (np.linalg.norm(vector) * np.linalg.norm(new_vector)))
+    return np.array(similarities)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark_size(n_emails, args, find_duplicates, find_campaign):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    emails = generate_email_corpus(n_emails, args.campaigns, args.campaign_ratio)
+    new_email, existing_emails = emails[0], emails[1:]
+    similarities, sparse_time = timed(find_duplicates.calculate_similarities, new_email, existing_emails)
+    top_k_mask = find_duplicates.get_top_k_mask(similarities, args.top_k)
+    members = set(np.flatnonzero(top_k_mask & (similarities >= args.threshold)).tolist())
+    print('{} emails: sparse similarity {:.3f}s, {} campaign members'.format(n_emails, sparse_time, len(members)))
+
+    if n_emails <= args.max_dense_size:
+        baseline, dense_time = timed(dense_similarities, new_email, existing_emails, CountVectorizer)
+        baseline_members = set(np.flatnonzero(baseline >= args.threshold).tolist())
+        if len(baseline_members) <= args.top_k and baseline_members != members:
+            raise AssertionError('Campaign members differ from the dense calculation')
+        print('{} emails: dense similarity {:.3f}s, same campaign members'.format(n_emails, dense_time))
+
+    sentences_vectors = CountVectorizer().fit_transform(emails)
+    duplicate_sentences, blocks_time = timed(find_campaign.get_duplicate_sentences, sentences_vectors)
+    print('{} sentences: blocked duplicate sentences {:.3f}s, {} duplicates'.format(
+        n_emails, blocks_time, len(duplicate_sentences)))
+
+
+def options_handler():
+    parser = argparse.ArgumentParser(description='Benchmarks the email campaign detection on synthetic corpora.')
+    parser.add_argument('--sizes', default='1000,5000,20000', help='Comma separated numbers of emails')
+    parser.add_argument('--campaigns', type=int, default=20, help='The number of campaign templates')
+    parser.add_argument('--campaign_ratio', type=float, default=0.3, help='The share of campaign emails')
+    parser.add_argument('--threshold', type=float, default=0.8, help='The campaign similarity threshold')
+    parser.add_argument('--top_k', type=int, default=2000, help='The max number of campaign members')
+    parser.add_argument('--max_dense_size', type=int, default=5000,
+                        help='The largest corpus to also run the dense calculation on')
+    return parser.parse_args()
+
+
+def main():
+    args = options_handler()
+    find_duplicates, find_campaign = import_scripts()
+    for size in args.sizes.split(','):
+        benchmark_size(int(size), args, find_duplicates, find_campaign)
+
+
+if __name__ == '__main__':
+    main()